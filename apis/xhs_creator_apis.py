@@ -1,12 +1,13 @@
-import requests
-from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.http_util import SessionPool
+from xhs_utils.page_util import iter_cursor_pages
 from xhs_utils.xhs_creator_util import get_common_headers, generate_xs, splice_str
-from xhs_utils.xhs_util import generate_x_b3_traceid
 
 
 class XHS_Creator_Apis():
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, http2: bool = False, timeout: float = None):
         self.base_url = "https://edith.xiaohongshu.com"
+        self.session_pool = SessionPool(pool_size, http2, timeout, verify=False)
 
 
     # page: 页数
@@ -21,14 +22,14 @@ class XHS_Creator_Apis():
             params = {
                 "tab": '0',
             }
-            if page >= 0:
+            if page is not None and page >= 0:
                 params["page"] = str(page)
             splice_api = splice_str(api, params)
             headers = get_common_headers()
-            cookies = trans_cookies(cookies_str)
-            xs, xt, _ = generate_xs(cookies['a1'], splice_api, '')
+            context = get_cookie_context(cookies_str)
+            xs, xt, _ = generate_xs(context.a1, splice_api, '')
             headers['x-s'], headers['x-t'] = xs, str(xt)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, verify=False)
+            response = self.session_pool.request('GET', self.base_url + splice_api, headers=headers, cookies=context.cookies)
             res_json = response.json()
             success = res_json["success"]
         except Exception as e:
@@ -36,19 +37,21 @@ class XHS_Creator_Apis():
         return success, msg, res_json
 
 
+    # 逐页获取全部的发布信息, 每页 yield (notes, page), 中断后把 page 传回来可以接着翻
+    def iter_all_publish_note_info(self, cookies_str, page=None):
+        fetch_page = lambda page: self.get_publish_note_info(page, cookies_str)
+        parse = lambda res_json: (res_json['data']['notes'], res_json['data']['page'], res_json['data']['page'] != -1)
+        yield from iter_cursor_pages(fetch_page, parse, page)
+
+
     # 获取全部的发布信息
     def get_all_publish_note_info(self, cookies_str):
-        page = None
         notes = []
-        while True:
-            success, msg, res_json = self.get_publish_note_info(page, cookies_str)
-            print(success, msg, res_json)
-            if not success:
-                return False, msg, notes
-            notes += res_json['data']['notes']
-            page = res_json['data']['page']
-            if page == -1:
-                break
+        try:
+            for page_notes, page in self.iter_all_publish_note_info(cookies_str):
+                notes += page_notes
+        except Exception as e:
+            return False, str(e), notes
         return True, '成功', notes
 
 
@@ -1,8 +1,19 @@
 # encoding: utf-8
 import json
 import re
+import threading
+import time
 import urllib
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.http_util import SessionPool
+from xhs_utils.json_util import loads, project_response
+from xhs_utils.page_util import iter_cursor_pages, iter_numbered_pages
+from xhs_utils.proxy_util import ProxyPool
+from xhs_utils.rate_limit_util import RateLimiter, default_rate_limiter
+from xhs_utils.retry_util import RetryPolicy, check_response, default_retry_policy
+from xhs_utils.singleflight_util import REUSABLE_APIS, SHARED_APIS, SingleFlight, make_request_key
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
 from loguru import logger
 
@@ -11,8 +22,112 @@ from loguru import logger
     :param cookies_str: 你的cookies
 """
 class XHS_Apis():
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, http2: bool = False, timeout: float = None, rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None, page_prefetch: int = 1, keep_raw: bool = False, single_flight: SingleFlight = None):
+        """
+            :param pool_size: 每个代理的 keep-alive 连接数
+            :param http2: 是否使用 HTTP/2 (需要安装 httpx[http2])
+            :param timeout: 请求超时时间(秒)
+            :param rate_limiter: 按账号和接口类别限速, 默认使用全局共享的限速器 (默认开启, 见 DEFAULT_RATES), RateLimiter({}) 为不限速
+            :param retry_policy: 单个请求(一页) 的重试策略, RetryPolicy(0) 为不重试
+            :param page_prefetch: 翻页时提前发出的页数, 0 为逐页请求
+            :param keep_raw: 是否返回完整的响应, 默认按 json_util 的字段声明裁剪笔记、评论、用户列表
+            :param single_flight: 相同请求合并, 默认每个实例一个 SingleFlight(), SingleFlight(ttl=0) 为只合并在途的请求
+        """
         self.base_url = "https://edith.xiaohongshu.com"
+        self.session_pool = SessionPool(pool_size, http2, timeout)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else default_rate_limiter
+        self.retry_policy = retry_policy if retry_policy is not None else default_retry_policy
+        self.page_prefetch = page_prefetch
+        self.keep_raw = keep_raw
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+
+    def _send(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            签名并发送一次请求, 可重试的响应抛出 XhsApiError
+        """
+        self.rate_limiter.acquire(get_cookie_context(cookies_str).a1, api)
+        headers, cookies, data = generate_request_params(cookies_str, api, data)
+        body = data.encode('utf-8') if data else None
+        state = proxies.acquire() if isinstance(proxies, ProxyPool) else None
+        start = time.perf_counter()
+        try:
+            response = self.session_pool.request(method, self.base_url + api, headers=headers, cookies=cookies, data=body, proxies=state.proxies if state is not None else proxies)
+        except Exception:
+            if state is not None:
+                proxies.release(state, False)
+            raise
+        if state is not None:
+            proxies.release(state, True, time.perf_counter() - start, response.status_code)
+        try:
+            res_json = loads(response.content)
+        except ValueError:
+            res_json = None
+        res_json = check_response(response.status_code, res_json, response.headers)
+        return res_json if self.keep_raw else project_response(api, res_json)
+
+    def _request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            签名并通过连接池发送请求, 限流、验证码、5xx 和网络错误按 retry_policy 退避重试, 每次重试重新签名
+            :param method: GET 或 POST
+            :param api: 带参数的接口路径
+            :param cookies_str: 你的cookies
+            :param data: POST 的 body
+            :param proxies: 代理字典, 或者 ProxyPool 由代理池挑选代理
+            返回响应的 json
+        """
+        send = lambda: self.retry_policy.call(lambda: self._send(method, api, cookies_str, data, proxies))
+        try:
+            key = make_request_key(method, api, data, get_cookie_context(cookies_str).a1)
+        except (ValueError, KeyError, TypeError):
+            return send()
+        # 同一个笔记/同样参数的请求同时只发一次, 多个关键词搜到同一篇笔记时只取一次详细
+        path = api.split('?')[0]
+        reusable = path in REUSABLE_APIS
+        # 不同账号共用的 key 只共享成功的结果, 一个账号失败不连累其它账号
+        share_errors = path not in SHARED_APIS
+        return self.single_flight.do(key, send, reusable, lambda res_json: isinstance(res_json, dict) and res_json.get('success'), share_errors)
+
+    @staticmethod
+    def parse_user_notes_page(res_json):
+        """
+            解析用户笔记/喜欢/收藏的一页, 返回 (items, next_cursor, has_more)
+        """
+        data = res_json["data"]
+        if 'cursor' not in data:
+            return None, None, False
+        notes = data["notes"]
+        return notes, str(data["cursor"]), len(notes) > 0 and data["has_more"]
+
+    @staticmethod
+    def parse_comments_page(res_json):
+        """
+            解析一级/二级评论的一页, 返回 (items, next_cursor, has_more)
+        """
+        data = res_json["data"]
+        if 'cursor' not in data:
+            return None, None, False
+        comments = data["comments"]
+        return comments, str(data["cursor"]), len(comments) > 0 and data["has_more"]
+
+    @staticmethod
+    def count_missing_sub_comments(comment):
+        """
+            一级评论还没返回的二级评论数, sub_comment_count 缺失或不是数字时返回 None
+        """
+        try:
+            return int(comment['sub_comment_count']) - len(comment.get('sub_comments') or [])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_message_page(res_json):
+        """
+            解析消息(评论和@、赞和收藏、新增关注) 的一页, 返回 (items, next_cursor, has_more)
+        """
+        data = res_json["data"]
+        if 'cursor' not in data:
+            return None, None, False
+        return data["message_list"], str(data["cursor"]), data["has_more"]
 
     def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
         """
@@ -22,9 +137,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = "/api/sns/web/v1/homefeed/category"
-            headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -62,9 +175,7 @@ class XHS_Apis():
                 ],
                 "need_filter_image": False
             }
-            headers, cookies, trans_data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -116,9 +227,7 @@ class XHS_Apis():
                 "target_user_id": user_id
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -134,9 +243,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v1/user/selfinfo"
-            headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -144,6 +251,13 @@ class XHS_Apis():
         return success, msg, res_json
 
 
+    def check_login(self, cookies_str: str, proxies: dict = None):
+        """
+            检查账号是否登录有效, 登录失效时抛出 kind 为 AUTH_EXPIRED 的 XhsApiError
+            返回 get_user_self_info 的响应
+        """
+        return self._request('GET', "/api/sns/web/v1/user/selfinfo", cookies_str, proxies=proxies)
+
     def get_user_self_info2(self, cookies_str: str, proxies: dict = None):
         """
             获取用户自己的信息2
@@ -153,9 +267,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v2/user/me"
-            headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -182,9 +294,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -192,6 +302,28 @@ class XHS_Apis():
         return success, msg, res_json
 
 
+    @staticmethod
+    def parse_user_url(user_url: str, default_source: str):
+        """
+            从用户主页url中解析 user_id, xsec_token, xsec_source
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else default_source
+        return user_id, xsec_token, xsec_source
+
+    def iter_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户所有笔记, 每页 yield (notes, cursor)
+            中断后把最后一次 yield 的 cursor 传回来可以接着翻, 失败时抛出异常
+        """
+        user_id, xsec_token, xsec_source = self.parse_user_url(user_url, "pc_search")
+        fetch_page = lambda cursor: self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+        yield from iter_cursor_pages(fetch_page, self.parse_user_notes_page, cursor, prefetch=self.page_prefetch)
+
     def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None):
         """
            获取用户所有笔记
@@ -199,27 +331,11 @@ class XHS_Apis():
            :param cookies_str: 你的cookies
            返回用户的所有笔记
         """
-        cursor = ''
         note_list = []
         try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
-            while True:
-                success, msg, res_json = self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            for notes, cursor in self.iter_user_all_notes(user_url, cookies_str, proxies):
                 note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -245,15 +361,21 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
+    def iter_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户所有喜欢笔记, 每页 yield (notes, cursor), 用法同 iter_user_all_notes
+        """
+        user_id, xsec_token, xsec_source = self.parse_user_url(user_url, "pc_user")
+        fetch_page = lambda cursor: self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+        yield from iter_cursor_pages(fetch_page, self.parse_user_notes_page, cursor, prefetch=self.page_prefetch)
+
     def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
         """
             获取用户所有喜欢笔记
@@ -261,28 +383,11 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户的所有喜欢笔记
         """
-        cursor = ''
         note_list = []
         try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_user"
-            while True:
-                success, msg, res_json = self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                      xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            for notes, cursor in self.iter_user_all_like_note_info(user_url, cookies_str, proxies):
                 note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -308,9 +413,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -327,30 +430,41 @@ class XHS_Apis():
         cursor = ''
         note_list = []
         try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
-            while True:
-                success, msg, res_json = self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                         xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            user_id, xsec_token, xsec_source = self.parse_user_url(user_url, "pc_search")
+            success, msg = True, 'success'
+            fetch_page = lambda cursor: self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            for notes, cursor in iter_cursor_pages(fetch_page, self.parse_user_notes_page, cursor, prefetch=self.page_prefetch):
                 note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, note_list
 
+    @staticmethod
+    def build_note_info_data(url: str):
+        """
+            根据笔记url构造获取笔记详细的请求 body
+            :param url: 笔记的url
+        """
+        urlParse = urllib.parse.urlparse(url)
+        note_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        data = {
+            "source_note_id": note_id,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ],
+            "extra": {
+                "need_body_topic": "1"
+            },
+            "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
+            "xsec_token": kvDist['xsec_token']
+        }
+        return data
+
     def get_note_info(self, url: str, cookies_str: str, proxies: dict = None):
         """
             获取笔记的详细
@@ -361,27 +475,9 @@ class XHS_Apis():
         """
         res_json = None
         try:
-            urlParse = urllib.parse.urlparse(url)
-            note_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
             api = f"/api/sns/web/v1/feed"
-            data = {
-                "source_note_id": note_id,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ],
-                "extra": {
-                    "need_body_topic": "1"
-                },
-                "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
-                "xsec_token": kvDist['xsec_token']
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            data = self.build_note_info_data(url)
+            res_json = self._request('POST', api, cookies_str, data, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -403,29 +499,18 @@ class XHS_Apis():
                 "keyword": urllib.parse.quote(word)
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+    @staticmethod
+    def build_search_note_data(query: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo=""):
         """
-            获取搜索笔记的结果
-            :param query 搜索的关键词
-            :param cookies_str 你的cookies
-            :param page 搜索的页数
-            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
-            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
-            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
-            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
-            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
-            返回搜索的结果
+            构造搜索笔记的请求 body, 参数含义同 search_note
         """
-        res_json = None
         sort_type = "general"
         if sort_type_choice == 1:
             sort_type = "time_descending"
@@ -461,64 +546,92 @@ class XHS_Apis():
             filter_pos_distance = "附近"
         if geo:
             geo = json.dumps(geo, separators=(',', ':'))
+        data = {
+            "keyword": query,
+            "page": page,
+            "page_size": 20,
+            "search_id": generate_x_b3_traceid(21),
+            "sort": "general",
+            "note_type": 0,
+            "ext_flags": [],
+            "filters": [
+                {
+                    "tags": [
+                        sort_type
+                    ],
+                    "type": "sort_type"
+                },
+                {
+                    "tags": [
+                        filter_note_type
+                    ],
+                    "type": "filter_note_type"
+                },
+                {
+                    "tags": [
+                        filter_note_time
+                    ],
+                    "type": "filter_note_time"
+                },
+                {
+                    "tags": [
+                        filter_note_range
+                    ],
+                    "type": "filter_note_range"
+                },
+                {
+                    "tags": [
+                        filter_pos_distance
+                    ],
+                    "type": "filter_pos_distance"
+                }
+            ],
+            "geo": geo,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ]
+        }
+        return data
+
+    def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+        """
+            获取搜索笔记的结果
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 搜索的页数
+            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            返回搜索的结果
+        """
+        res_json = None
         try:
             api = "/api/sns/web/v1/search/notes"
-            data = {
-                "keyword": query,
-                "page": page,
-                "page_size": 20,
-                "search_id": generate_x_b3_traceid(21),
-                "sort": "general",
-                "note_type": 0,
-                "ext_flags": [],
-                "filters": [
-                    {
-                        "tags": [
-                            sort_type
-                        ],
-                        "type": "sort_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_type
-                        ],
-                        "type": "filter_note_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_time
-                        ],
-                        "type": "filter_note_time"
-                    },
-                    {
-                        "tags": [
-                            filter_note_range
-                        ],
-                        "type": "filter_note_range"
-                    },
-                    {
-                        "tags": [
-                            filter_pos_distance
-                        ],
-                        "type": "filter_pos_distance"
-                    }
-                ],
-                "geo": geo,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ]
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            data = self.build_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+            res_json = self._request('POST', api, cookies_str, data, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
+    def iter_search_note(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, page: int = 1, require_num: int = None):
+        """
+            逐页搜索笔记, 参数同 search_some_note, 每页 yield (notes, page)
+            page 为下一页的页码, 中断后传回来可以接着翻, 失败时抛出异常
+        """
+        def fetch_page(page):
+            # 直接调用 _request, 失败时抛出原来的 XhsApiError, 调用方可以按分类处理 (比如登录失效)
+            data = self.build_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+            res_json = self._request('POST', "/api/sns/web/v1/search/notes", cookies_str, data, proxies=proxies)
+            return res_json["success"], res_json["msg"], res_json
+        parse = lambda res_json: (res_json["data"].get("items"), res_json["data"].get("has_more", False))
+        yield from iter_numbered_pages(fetch_page, parse, page, require_num, self.page_prefetch, page_size=20)
+
     def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
@@ -533,20 +646,11 @@ class XHS_Apis():
             :param geo: 定位信息 经纬度
             返回搜索的结果
         """
-        page = 1
         note_list = []
         try:
-            while True:
-                success, msg, res_json = self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
+            success, msg = True, 'success'
+            for notes, page in self.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, require_num=require_num):
                 note_list.extend(notes)
-                page += 1
-                if len(note_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -575,9 +679,7 @@ class XHS_Apis():
                     "request_id": "22471139-1723999898524"
                 }
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -592,20 +694,13 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回搜索的结果
         """
-        page = 1
         user_list = []
         try:
-            while True:
-                success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "users" not in res_json["data"]:
-                    break
-                users = res_json["data"]["users"]
+            success, msg = True, 'success'
+            fetch_page = lambda page: self.search_user(query, cookies_str, page, proxies)
+            parse = lambda res_json: (res_json["data"].get("users"), res_json["data"].get("has_more", False))
+            for users, page in iter_numbered_pages(fetch_page, parse, 1, require_num, self.page_prefetch, page_size=15):
                 user_list.extend(users)
-                page += 1
-                if len(user_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -632,15 +727,20 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
+    def iter_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取笔记的一级评论, 每页 yield (comments, cursor), 中断后传回 cursor 可以接着翻
+        """
+        fetch_page = lambda cursor: self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+        yield from iter_cursor_pages(fetch_page, self.parse_comments_page, cursor, prefetch=self.page_prefetch)
+
     def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
             获取笔记的全部一级评论
@@ -648,21 +748,11 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回笔记的全部一级评论
         """
-        cursor = ''
         note_out_comment_list = []
         try:
-            while True:
-                success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            for comments, cursor in self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies):
                 note_out_comment_list.extend(comments)
-                if len(note_out_comment_list) == 0 or not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -689,68 +779,124 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None):
+    def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None, max_num: int = None):
         """
             获取笔记的全部二级评论
             :param comment 笔记的一级评论
             :param cookies_str 你的cookies
+            :param max_num 最多再获取的二级评论数量（可选）
             返回笔记的全部二级评论
         """
         try:
-            if not comment['sub_comment_has_more']:
+            if not comment['sub_comment_has_more'] or max_num == 0:
                 return True, 'success', comment
             cursor = comment['sub_comment_cursor']
-            inner_comment_list = []
-            while True:
-                success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                inner_comment_list.extend(comments)
-                if not res_json["data"]["has_more"]:
-                    break
-            comment['sub_comments'].extend(inner_comment_list)
+            success, msg = True, 'success'
+            fetch_page = lambda cursor: self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+            count = 0
+            for comments, cursor in iter_cursor_pages(fetch_page, self.parse_comments_page, cursor, max_num, self.page_prefetch):
+                if max_num is not None:
+                    comments = comments[:max_num - count]
+                count += len(comments)
+                comment['sub_comments'].extend(comments)
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, comment
 
-    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None):
+    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None, max_workers: int = 4, max_sub_per_comment: int = None, max_sub_comments: int = None):
         """
-            获取一篇文章的所有评论
+            获取一篇文章的所有评论, 一级评论继续翻页的同时用线程池并发展开二级评论
             :param note_id: 你想要获取的笔记的id
             :param cookies_str: 你的cookies
+            :param max_workers: 展开二级评论的并发数, 1 为逐个展开
+            :param max_sub_per_comment: 每条一级评论最多再获取的二级评论数量（可选）, 0 为不展开二级评论
+            :param max_sub_comments: 整篇笔记最多再获取的二级评论数量（可选）
             返回一篇文章的所有评论
         """
         out_comment_list = []
+        executor = ThreadPoolExecutor(max_workers) if max_workers > 1 else None
+        futures = []
+        deferred = []
+        budget = {'remaining': max_sub_comments}
+        budget_lock = threading.Lock()
+
+        def reserve(comment):
+            max_num = max_sub_per_comment
+            if max_sub_comments is None:
+                return max_num
+            expected = self.count_missing_sub_comments(comment)
+            with budget_lock:
+                remaining = budget['remaining']
+                # 按评论给出的二级评论数预留额度, 并发展开时总数也不会超过上限, 数量缺失或不合法时先预留剩余的全部额度
+                if expected is None:
+                    expected = remaining
+                max_num = min(remaining, max_num if max_num is not None else max(expected, 1))
+                if max_num > 0:
+                    budget['remaining'] -= max_num
+            return max_num
+
+        def expand(comment, max_num):
+            count = len(comment['sub_comments'])
+            result = self.get_note_all_inner_comment(comment, kvDist['xsec_token'], cookies_str, proxies, max_num)
+            if max_sub_comments is not None:
+                # 实际拿到的比预留的少时退回额度
+                with budget_lock:
+                    budget['remaining'] += max_num - (len(comment['sub_comments']) - count)
+            return result
+
+        def schedule(comment):
+            max_num = reserve(comment)
+            if max_num is not None and max_num <= 0:
+                deferred.append(comment)
+            elif executor is None:
+                futures.append(expand(comment, max_num))
+            else:
+                futures.append(executor.submit(expand, comment, max_num))
+
         try:
             urlParse = urllib.parse.urlparse(url)
             note_id = urlParse.path.split("/")[-1]
             kvs = urlParse.query.split('&')
             kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            success, msg, out_comment_list = self.get_note_all_out_comment(note_id, kvDist['xsec_token'], cookies_str, proxies)
-            if not success:
-                raise Exception(msg)
-            for comment in out_comment_list:
-                success, msg, new_comment = self.get_note_all_inner_comment(comment, kvDist['xsec_token'], cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
+            success, msg = True, 'success'
+            fetch_page = lambda cursor: self.get_note_out_comment(note_id, cursor, kvDist['xsec_token'], cookies_str, proxies)
+            for comments, cursor in iter_cursor_pages(fetch_page, self.parse_comments_page, prefetch=self.page_prefetch):
+                out_comment_list.extend(comments)
+                if max_sub_per_comment == 0:
+                    continue
+                for comment in comments:
+                    if comment.get('sub_comment_has_more'):
+                        schedule(comment)
         except Exception as e:
             success = False
             msg = str(e)
+        # 额度用完时跳过的评论, 等已经在展开的评论退回额度后再展开
+        results = []
+        while True:
+            results.extend(future if executor is None else future.result() for future in futures)
+            futures = []
+            pending, deferred = deferred, []
+            if not pending or max_sub_comments is None or budget['remaining'] <= 0:
+                break
+            for comment in pending:
+                schedule(comment)
+            # 这一轮一条都没能展开时放弃剩下的评论, 不会空转
+            if not futures:
+                break
+        # 二级评论展开失败不影响其它评论, 只在 msg 里记录第一个错误
+        for inner_success, inner_msg, _ in results:
+            if not inner_success and success:
+                success, msg = False, inner_msg
+        if executor is not None:
+            executor.shutdown()
         return success, msg, out_comment_list
 
     def get_unread_message(self, cookies_str: str, proxies: dict = None):
@@ -762,9 +908,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = "/api/sns/web/unread_count"
-            headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -786,36 +930,31 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
+    def iter_all_metions(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取评论和@提醒, 每页 yield (metions, cursor), 中断后传回 cursor 可以接着翻
+        """
+        fetch_page = lambda cursor: self.get_metions(cursor, cookies_str, proxies)
+        yield from iter_cursor_pages(fetch_page, self.parse_message_page, cursor, prefetch=self.page_prefetch)
+
     def get_all_metions(self, cookies_str: str, proxies: dict = None):
         """
             获取全部的评论和@提醒
             :param cookies_str: 你的cookies
             返回全部的评论和@提醒
         """
-        cursor = ''
         metions_list = []
         try:
-            while True:
-                success, msg, res_json = self.get_metions(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                metions = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            for metions, cursor in self.iter_all_metions(cookies_str, proxies):
                 metions_list.extend(metions)
-                if not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -836,9 +975,7 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -854,18 +991,10 @@ class XHS_Apis():
         cursor = ''
         likesAndcollects_list = []
         try:
-            while True:
-                success, msg, res_json = self.get_likesAndcollects(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                likesAndcollects = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            fetch_page = lambda cursor: self.get_likesAndcollects(cursor, cookies_str, proxies)
+            for likesAndcollects, cursor in iter_cursor_pages(fetch_page, self.parse_message_page, cursor, prefetch=self.page_prefetch):
                 likesAndcollects_list.extend(likesAndcollects)
-                if not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
@@ -886,9 +1015,7 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, proxies=proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -904,18 +1031,10 @@ class XHS_Apis():
         cursor = ''
         connections_list = []
         try:
-            while True:
-                success, msg, res_json = self.get_new_connections(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                connections = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
+            success, msg = True, 'success'
+            fetch_page = lambda cursor: self.get_new_connections(cursor, cookies_str, proxies)
+            for connections, cursor in iter_cursor_pages(fetch_page, self.parse_message_page, cursor, prefetch=self.page_prefetch):
                 connections_list.extend(connections)
-                if not res_json["data"]["has_more"]:
-                    break
         except Exception as e:
             success = False
             msg = str(e)
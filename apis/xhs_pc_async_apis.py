@@ -0,0 +1,465 @@
+# encoding: utf-8
+import asyncio
+import time
+import urllib
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.json_util import loads, project_response
+from xhs_utils.page_util import async_iter_cursor_pages, async_iter_numbered_pages
+from xhs_utils.proxy_util import ProxyPool
+from xhs_utils.rate_limit_util import RateLimiter, default_rate_limiter
+from xhs_utils.retry_util import RetryPolicy, check_response, default_retry_policy
+from xhs_utils.xhs_util import splice_str, generate_request_params
+
+"""
+    小红书 api 的 asyncio 版本, 方法和返回值 (success, msg, data) 与 XHS_Apis 一致
+    签名在线程池里执行, 不阻塞事件循环
+    session 和并发信号量绑定创建时的事件循环, 换了事件循环 (比如再次 asyncio.run) 时重新创建
+    用完后 await close() 或者 async with AsyncXHS_Apis() as apis
+"""
+class AsyncXHS_Apis():
+    def __init__(self, max_concurrency: int = 20, pool_size: int = 20, sign_workers: int = 4, timeout: float = None, rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None, page_prefetch: int = 1, keep_raw: bool = False):
+        """
+            :param max_concurrency: 同时在途的请求数上限
+            :param pool_size: keep-alive 连接数
+            :param sign_workers: 签名线程数
+            :param timeout: 请求超时时间(秒)
+            :param rate_limiter: 按账号和接口类别限速, 默认与 XHS_Apis 共享全局限速器 (默认开启), RateLimiter({}) 为不限速
+            :param retry_policy: 单个请求(一页) 的重试策略, RetryPolicy(0) 为不重试
+            :param page_prefetch: 翻页时提前发出的页数, 0 为逐页请求
+            :param keep_raw: 是否返回完整的响应, 默认按 json_util 的字段声明裁剪笔记、评论、用户列表
+        """
+        self.base_url = "https://edith.xiaohongshu.com"
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.sign_workers = sign_workers
+        self.semaphore = None
+        self.executor = None
+        self.session = None
+        self.loop = None
+        self.rate_limiter = rate_limiter if rate_limiter is not None else default_rate_limiter
+        self.retry_policy = retry_policy if retry_policy is not None else default_retry_policy
+        self.page_prefetch = page_prefetch
+        self.keep_raw = keep_raw
+
+    def _bind_loop(self):
+        """
+            Semaphore 和 ClientSession 只能在创建它们的事件循环里用, 事件循环变了就重新创建
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # 旧的事件循环已经结束, 它的 session 没法再关闭, 直接丢弃
+            self.loop = loop
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.session = None
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.sign_workers)
+
+    async def _get_session(self):
+        self._bind_loop()
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _send(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            签名(线程池) 并发送一次请求, 同时在途的请求数受 max_concurrency 限制
+            可重试的响应抛出 XhsApiError
+        """
+        # 先排队等令牌再占用并发名额
+        await self.rate_limiter.async_acquire(get_cookie_context(cookies_str).a1, api)
+        self._bind_loop()
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            headers, cookies, data = await loop.run_in_executor(self.executor, generate_request_params, cookies_str, api, data)
+            body = data.encode('utf-8') if data else None
+            state = proxies.acquire() if isinstance(proxies, ProxyPool) else None
+            if state is not None:
+                proxy_dict = state.proxies
+            else:
+                proxy_dict = proxies
+            proxy = (proxy_dict.get('https') or proxy_dict.get('http')) if proxy_dict else None
+            session = await self._get_session()
+            start = time.perf_counter()
+            try:
+                async with session.request(method, self.base_url + api, headers=headers, cookies=cookies, data=body, proxy=proxy) as response:
+                    if state is not None:
+                        proxies.release(state, True, time.perf_counter() - start, response.status)
+                        state = None
+                    content = await response.read()
+                    try:
+                        res_json = loads(content)
+                    except ValueError:
+                        res_json = None
+                    res_json = check_response(response.status, res_json, response.headers)
+                    return res_json if self.keep_raw else project_response(api, res_json)
+            finally:
+                if state is not None:
+                    proxies.release(state, False)
+
+    async def _request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            发送请求, 限流、验证码、5xx 和网络错误按 retry_policy 退避重试, 退避期间不占用并发名额
+            proxies 可以是代理字典, 也可以是 ProxyPool
+            返回响应的 json
+        """
+        return await self.retry_policy.async_call(lambda: self._send(method, api, cookies_str, data, proxies))
+
+    async def _call(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        res_json = None
+        try:
+            res_json = await self._request(method, api, cookies_str, data, proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    @staticmethod
+    def _parse_user_url(user_url: str, default_source: str):
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else default_source
+        return user_id, xsec_token, xsec_source
+
+    async def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
+        return await self._call('GET', "/api/sns/web/v1/homefeed/category", cookies_str, proxies=proxies)
+
+    async def get_homefeed_recommend(self, category, cursor_score, refresh_type, note_index, cookies_str: str, proxies: dict = None):
+        data = {
+            "cursor_score": cursor_score,
+            "num": 20,
+            "refresh_type": refresh_type,
+            "note_index": note_index,
+            "unread_begin_note_id": "",
+            "unread_end_note_id": "",
+            "unread_note_count": 0,
+            "category": category,
+            "search_key": "",
+            "need_num": 10,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ],
+            "need_filter_image": False
+        }
+        return await self._call('POST', "/api/sns/web/v1/homefeed", cookies_str, data, proxies)
+
+    async def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str, proxies: dict = None):
+        cursor_score, refresh_type, note_index = "", 1, 0
+        note_list = []
+        try:
+            while True:
+                success, msg, res_json = await self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
+                if not success:
+                    raise Exception(msg)
+                if "items" not in res_json["data"]:
+                    break
+                note_list.extend(res_json["data"]["items"])
+                cursor_score = res_json["data"]["cursor_score"]
+                refresh_type = 3
+                note_index += 20
+                if len(note_list) > require_num:
+                    break
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, note_list[:require_num]
+
+    async def get_user_info(self, user_id: str, cookies_str: str, proxies: dict = None):
+        splice_api = splice_str("/api/sns/web/v1/user/otherinfo", {"target_user_id": user_id})
+        return await self._call('GET', splice_api, cookies_str, proxies=proxies)
+
+    async def get_user_self_info(self, cookies_str: str, proxies: dict = None):
+        return await self._call('GET', "/api/sns/web/v1/user/selfinfo", cookies_str, proxies=proxies)
+
+    async def get_user_self_info2(self, cookies_str: str, proxies: dict = None):
+        return await self._call('GET', "/api/sns/web/v2/user/me", cookies_str, proxies=proxies)
+
+    async def _get_user_page(self, api: str, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        params = {
+            "num": "30",
+            "cursor": cursor,
+            "user_id": user_id,
+            "image_formats": "jpg,webp,avif",
+            "xsec_token": xsec_token,
+            "xsec_source": xsec_source,
+        }
+        return await self._call('GET', splice_str(api, params), cookies_str, proxies=proxies)
+
+    async def _iter_user_all_pages(self, api: str, user_url: str, cookies_str: str, default_source: str, proxies: dict = None, cursor: str = ''):
+        user_id, xsec_token, xsec_source = self._parse_user_url(user_url, default_source)
+        fetch_page = lambda cursor: self._get_user_page(api, user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+        async for notes, cursor in async_iter_cursor_pages(fetch_page, XHS_Apis.parse_user_notes_page, cursor, prefetch=self.page_prefetch):
+            yield notes, cursor
+
+    async def _get_user_all_pages(self, api: str, user_url: str, cookies_str: str, default_source: str, proxies: dict = None):
+        note_list = []
+        try:
+            success, msg = True, 'success'
+            async for notes, cursor in self._iter_user_all_pages(api, user_url, cookies_str, default_source, proxies):
+                note_list.extend(notes)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, note_list
+
+    async def get_user_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        return await self._get_user_page("/api/sns/web/v1/user_posted", user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+
+    def iter_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            异步生成器, 逐页 yield (notes, cursor), 用法同 XHS_Apis.iter_user_all_notes
+        """
+        return self._iter_user_all_pages("/api/sns/web/v1/user_posted", user_url, cookies_str, "pc_search", proxies, cursor)
+
+    async def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None):
+        return await self._get_user_all_pages("/api/sns/web/v1/user_posted", user_url, cookies_str, "pc_search", proxies)
+
+    async def get_user_like_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        return await self._get_user_page("/api/sns/web/v1/note/like/page", user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+
+    def iter_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        return self._iter_user_all_pages("/api/sns/web/v1/note/like/page", user_url, cookies_str, "pc_user", proxies, cursor)
+
+    async def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
+        return await self._get_user_all_pages("/api/sns/web/v1/note/like/page", user_url, cookies_str, "pc_user", proxies)
+
+    async def get_user_collect_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        return await self._get_user_page("/api/sns/web/v2/note/collect/page", user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+
+    async def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
+        return await self._get_user_all_pages("/api/sns/web/v2/note/collect/page", user_url, cookies_str, "pc_search", proxies)
+
+    async def get_note_info(self, url: str, cookies_str: str, proxies: dict = None):
+        try:
+            data = XHS_Apis.build_note_info_data(url)
+        except Exception as e:
+            return False, str(e), None
+        return await self._call('POST', "/api/sns/web/v1/feed", cookies_str, data, proxies)
+
+    async def get_search_keyword(self, word: str, cookies_str: str, proxies: dict = None):
+        splice_api = splice_str("/api/sns/web/v1/search/recommend", {"keyword": urllib.parse.quote(word)})
+        return await self._call('GET', splice_api, cookies_str, proxies=proxies)
+
+    async def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+        try:
+            data = XHS_Apis.build_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+        except Exception as e:
+            return False, str(e), None
+        return await self._call('POST', "/api/sns/web/v1/search/notes", cookies_str, data, proxies)
+
+    async def iter_search_note(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, page: int = 1, require_num: int = None):
+        """
+            异步生成器, 逐页 yield (notes, page), 用法同 XHS_Apis.iter_search_note
+        """
+        async def fetch_page(page):
+            # 失败时抛出原来的 XhsApiError, 同 XHS_Apis.iter_search_note
+            data = XHS_Apis.build_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+            res_json = await self._request('POST', "/api/sns/web/v1/search/notes", cookies_str, data, proxies)
+            return res_json["success"], res_json["msg"], res_json
+        parse = lambda res_json: (res_json["data"].get("items"), res_json["data"].get("has_more", False))
+        async for notes, page in async_iter_numbered_pages(fetch_page, parse, page, require_num, self.page_prefetch, page_size=20):
+            yield notes, page
+
+    async def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+        note_list = []
+        try:
+            success, msg = True, 'success'
+            async for notes, page in self.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, require_num=require_num):
+                note_list.extend(notes)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, note_list[:require_num]
+
+    async def search_user(self, query: str, cookies_str: str, page=1, proxies: dict = None):
+        data = {
+            "search_user_request": {
+                "keyword": query,
+                "search_id": "2dn9they1jbjxwawlo4xd",
+                "page": page,
+                "page_size": 15,
+                "biz_type": "web_search_user",
+                "request_id": "22471139-1723999898524"
+            }
+        }
+        return await self._call('POST', "/api/sns/web/v1/search/usersearch", cookies_str, data, proxies)
+
+    async def search_some_user(self, query: str, require_num: int, cookies_str: str, proxies: dict = None):
+        page = 1
+        user_list = []
+        try:
+            while True:
+                success, msg, res_json = await self.search_user(query, cookies_str, page, proxies)
+                if not success:
+                    raise Exception(msg)
+                if "users" not in res_json["data"]:
+                    break
+                user_list.extend(res_json["data"]["users"])
+                page += 1
+                if len(user_list) >= require_num or not res_json["data"]["has_more"]:
+                    break
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, user_list[:require_num]
+
+    async def get_note_out_comment(self, note_id: str, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+        params = {
+            "note_id": note_id,
+            "cursor": cursor,
+            "top_comment_id": "",
+            "image_formats": "jpg,webp,avif",
+            "xsec_token": xsec_token
+        }
+        return await self._call('GET', splice_str("/api/sns/web/v2/comment/page", params), cookies_str, proxies=proxies)
+
+    async def iter_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            异步生成器, 逐页 yield (comments, cursor)
+        """
+        fetch_page = lambda cursor: self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+        async for comments, cursor in async_iter_cursor_pages(fetch_page, XHS_Apis.parse_comments_page, cursor, prefetch=self.page_prefetch):
+            yield comments, cursor
+
+    async def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+        note_out_comment_list = []
+        try:
+            success, msg = True, 'success'
+            async for comments, cursor in self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies):
+                note_out_comment_list.extend(comments)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, note_out_comment_list
+
+    async def get_note_inner_comment(self, comment: dict, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+        params = {
+            "note_id": comment['note_id'],
+            "root_comment_id": comment['id'],
+            "num": "10",
+            "cursor": cursor,
+            "image_formats": "jpg,webp,avif",
+            "top_comment_id": '',
+            "xsec_token": xsec_token
+        }
+        return await self._call('GET', splice_str("/api/sns/web/v2/comment/sub/page", params), cookies_str, proxies=proxies)
+
+    async def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None):
+        try:
+            if not comment['sub_comment_has_more']:
+                return True, 'success', comment
+            cursor = comment['sub_comment_cursor']
+            inner_comment_list = []
+            while True:
+                success, msg, res_json = await self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+                if not success:
+                    raise Exception(msg)
+                comments = res_json["data"]["comments"]
+                if 'cursor' in res_json["data"]:
+                    cursor = str(res_json["data"]["cursor"])
+                else:
+                    break
+                inner_comment_list.extend(comments)
+                if not res_json["data"]["has_more"]:
+                    break
+            comment['sub_comments'].extend(inner_comment_list)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, comment
+
+    async def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None):
+        """
+            获取一篇文章的所有评论, 二级评论并发获取
+        """
+        out_comment_list = []
+        try:
+            urlParse = urllib.parse.urlparse(url)
+            note_id = urlParse.path.split("/")[-1]
+            kvs = urlParse.query.split('&')
+            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+            success, msg, out_comment_list = await self.get_note_all_out_comment(note_id, kvDist['xsec_token'], cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            results = await asyncio.gather(*[self.get_note_all_inner_comment(comment, kvDist['xsec_token'], cookies_str, proxies) for comment in out_comment_list])
+            for success, msg, _ in results:
+                if not success:
+                    raise Exception(msg)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, out_comment_list
+
+    async def get_unread_message(self, cookies_str: str, proxies: dict = None):
+        return await self._call('GET', "/api/sns/web/unread_count", cookies_str, proxies=proxies)
+
+    async def _get_message_page(self, api: str, cursor: str, cookies_str: str, proxies: dict = None):
+        params = {
+            "num": "20",
+            "cursor": cursor
+        }
+        return await self._call('GET', splice_str(api, params), cookies_str, proxies=proxies)
+
+    async def _iter_all_messages(self, api: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        fetch_page = lambda cursor: self._get_message_page(api, cursor, cookies_str, proxies)
+        async for messages, cursor in async_iter_cursor_pages(fetch_page, XHS_Apis.parse_message_page, cursor, prefetch=self.page_prefetch):
+            yield messages, cursor
+
+    async def _get_all_messages(self, api: str, cookies_str: str, proxies: dict = None):
+        message_list = []
+        try:
+            success, msg = True, 'success'
+            async for messages, cursor in self._iter_all_messages(api, cookies_str, proxies):
+                message_list.extend(messages)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, message_list
+
+    async def get_metions(self, cursor: str, cookies_str: str, proxies: dict = None):
+        return await self._get_message_page("/api/sns/web/v1/you/mentions", cursor, cookies_str, proxies)
+
+    def iter_all_metions(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            异步生成器, 逐页 yield (metions, cursor), 用法同 XHS_Apis.iter_all_metions
+        """
+        return self._iter_all_messages("/api/sns/web/v1/you/mentions", cookies_str, proxies, cursor)
+
+    async def get_all_metions(self, cookies_str: str, proxies: dict = None):
+        return await self._get_all_messages("/api/sns/web/v1/you/mentions", cookies_str, proxies)
+
+    async def get_likesAndcollects(self, cursor: str, cookies_str: str, proxies: dict = None):
+        return await self._get_message_page("/api/sns/web/v1/you/likes", cursor, cookies_str, proxies)
+
+    async def get_all_likesAndcollects(self, cookies_str: str, proxies: dict = None):
+        return await self._get_all_messages("/api/sns/web/v1/you/likes", cookies_str, proxies)
+
+    async def get_new_connections(self, cursor: str, cookies_str: str, proxies: dict = None):
+        return await self._get_message_page("/api/sns/web/v1/you/connections", cursor, cookies_str, proxies)
+
+    async def get_all_new_connections(self, cookies_str: str, proxies: dict = None):
+        return await self._get_all_messages("/api/sns/web/v1/you/connections", cookies_str, proxies)
@@ -0,0 +1,206 @@
+"""
+    签名吞吐基准: 对比 execjs / 常驻 node 进程 / 多进程池 生成请求签名的速度, 以及 traceid 的 js 和 python 实现
+    进程池和 generate_request_params 跟线上一样按 a1 路由, --accounts 个账号轮流签名
+    签名不需要网络, 全程离线运行, 结果输出 json
+    python benchmarks/sign_bench.py --iterations 200 --threads 4 --accounts 4 --out sign_bench.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, root_dir)
+
+from xhs_utils import xhs_util
+from xhs_utils.js_util import compile_js, JsContextPool
+from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, generate_x_b3_traceids
+from xhs_utils.traceid_util import XrayTraceIdGenerator
+
+a1 = '187d2defea8dz1fgwydnci40kw265ikh9fsxn66qs50000726043'
+
+# 有代表性的接口和参数
+cases = {
+    'search_notes': ('/api/sns/web/v1/search/notes', {
+        "keyword": "榴莲", "page": 1, "page_size": 20, "search_id": "2dn9they1jbjxwawlo4xd", "sort": "general",
+        "note_type": 0, "ext_flags": [], "filters": [{"tags": ["general"], "type": "sort_type"}],
+        "geo": "", "image_formats": ["jpg", "webp", "avif"],
+    }),
+    'feed': ('/api/sns/web/v1/feed', {
+        "source_note_id": "67d7c713000000000900e391", "image_formats": ["jpg", "webp", "avif"],
+        "extra": {"need_body_topic": "1"}, "xsec_source": "pc_search", "xsec_token": "AB1ACxbo5cevHxV_bWibTmK8R1DDz0NnAW1PbFZLABXtE=",
+    }),
+    'comment_page': (splice_str('/api/sns/web/v2/comment/page', {
+        "note_id": "67d7c713000000000900e391", "cursor": "", "top_comment_id": "", "image_formats": "jpg,webp,avif",
+        "xsec_token": "AB1ACxbo5cevHxV_bWibTmK8R1DDz0NnAW1PbFZLABXtE=",
+    }), ''),
+    'user_posted': (splice_str('/api/sns/web/v1/user_posted', {
+        "num": "30", "cursor": "", "user_id": "64c3f392000000002b009e45", "image_formats": "jpg,webp,avif",
+        "xsec_token": "", "xsec_source": "pc_feed",
+    }), ''),
+}
+
+
+def get_rss_kb(pid):
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+
+    def p(q):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 3)
+
+    return {'p50_ms': p(0.5), 'p90_ms': p(0.9), 'p99_ms': p(0.99), 'max_ms': round(latencies[-1] * 1000, 3), 'mean_ms': round(statistics.mean(latencies) * 1000, 3)}
+
+
+def get_a1_list(accounts):
+    # 改 a1 的末尾生成多个账号, 按 crc32(a1) 路由到不同的进程
+    return [a1] + [f'{a1[:-4]}{i:04d}' for i in range(1, accounts)]
+
+
+def run_sign(call, iterations, threads, a1_list):
+    latencies = []
+    lock = threading.Lock()
+    jobs = [case for _ in range(iterations) for case in cases.values()]
+    jobs = [(case, a1_list[i % len(a1_list)]) for i, case in enumerate(jobs)]
+
+    def sign(job):
+        (api, data), account = job
+        start = time.perf_counter()
+        call(api, data, account)
+        cost = time.perf_counter() - start
+        with lock:
+            latencies.append(cost)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(sign, jobs))
+    else:
+        for job in jobs:
+            sign(job)
+    total = time.perf_counter() - start
+    return {'signs': len(jobs), 'signs_per_sec': round(len(jobs) / total, 2), **percentiles(latencies)}
+
+
+def sign_ctx(ctx, api, data, account):
+    return ctx.call('get_request_headers_params', api, data, account)
+
+
+def sign_pool(ctx, api, data, account):
+    return ctx.call('get_request_headers_params', api, data, account, key=account)
+
+
+def sign_request_params(ctx, api, data, account):
+    # 线上的调用路径: cookie 解析、签名缓存(XHS_SIGN_CACHE_TTL)、请求头模板和 data 序列化都算在内
+    return generate_request_params(f'a1={account}', api, data)
+
+
+def bench_impl(name, make_ctx, iterations, threads, a1_list, sign=sign_ctx, pids=lambda ctx: []):
+    result = {'impl': name, 'threads': threads, 'accounts': len(a1_list)}
+    try:
+        start = time.perf_counter()
+        ctx = make_ctx()
+        api, data = cases['feed']
+        sign(ctx, api, data, a1_list[0])
+        result['cold_start_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        result.update(run_sign(lambda api, data, account: sign(ctx, api, data, account), iterations, threads, a1_list))
+        rss = [get_rss_kb(pid) for pid in pids(ctx)]
+        result['js_rss_kb'] = sum(r for r in rss if r) if any(rss) else None
+        if hasattr(ctx, 'close'):
+            ctx.close()
+    except Exception as e:
+        result['error'] = str(e)[:300]
+    return result
+
+
+def bench_traceid(iterations):
+    results = []
+    generator = XrayTraceIdGenerator()
+    impls = [
+        ('xray_native', lambda: generator.generate()),
+        ('b3_single', lambda: generate_x_b3_traceid()),
+    ]
+    for name, fn in impls:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        total = time.perf_counter() - start
+        results.append({'impl': name, 'ids_per_sec': round(iterations / total, 2)})
+    start = time.perf_counter()
+    generate_x_b3_traceids(iterations)
+    results.append({'impl': 'b3_bulk', 'ids_per_sec': round(iterations / (time.perf_counter() - start), 2)})
+    try:
+        xray_js = compile_js('xhs_xray.js')
+        start = time.perf_counter()
+        xray_js.call('traceIds', iterations)
+        results.append({'impl': 'xray_js_batch', 'ids_per_sec': round(iterations / (time.perf_counter() - start), 2)})
+        xray_js.close()
+    except Exception as e:
+        results.append({'impl': 'xray_js_batch', 'error': str(e)[:300]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='xhs 签名吞吐基准')
+    parser.add_argument('--iterations', type=int, default=100, help='每个接口签名的次数')
+    parser.add_argument('--threads', type=int, default=4, help='进程池并发测试的线程数')
+    parser.add_argument('--workers', type=int, default=None, help='进程池的进程数, 默认 cpu 核数')
+    parser.add_argument('--accounts', type=int, default=4, help='轮流签名的账号(a1) 数量, 进程池按 a1 路由')
+    parser.add_argument('--script', default='xhs_xs_xsc_56.js', help='static 目录下的签名脚本')
+    parser.add_argument('--skip-execjs', action='store_true', help='跳过 execjs (每次调用都新起进程, 很慢)')
+    parser.add_argument('--out', default=None, help='结果写入的 json 文件')
+    args = parser.parse_args()
+
+    a1_list = get_a1_list(max(1, args.accounts))
+    sign_results = []
+    if not args.skip_execjs:
+        # execjs 每次调用都要新起进程, 次数减少到 1/10
+        sign_results.append(bench_impl('execjs', lambda: compile_js(args.script, 'execjs'), max(1, args.iterations // 10), 1, a1_list))
+    sign_results.append(bench_impl('daemon', lambda: compile_js(args.script, 'daemon'), args.iterations, 1, a1_list, pids=lambda ctx: [ctx.pid]))
+    sign_results.append(bench_impl(
+        'pool', lambda: JsContextPool(lambda: compile_js(args.script, 'daemon'), args.workers), args.iterations, args.threads, a1_list,
+        sign=sign_pool, pids=lambda ctx: [worker['pid'] for worker in ctx.stats()],
+    ))
+    # xhs_util 全局的签名池, 进程数由 XHS_SIGN_WORKERS 决定, 脚本固定为 xhs_xs_xsc_56.js
+    sign_results.append(bench_impl(
+        'generate_request_params', lambda: xhs_util.js, args.iterations, args.threads, a1_list,
+        sign=sign_request_params, pids=lambda ctx: [worker['pid'] for worker in ctx.stats()],
+    ))
+
+    report = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'script': args.script,
+        'iterations': args.iterations,
+        'accounts': len(a1_list),
+        'cases': list(cases.keys()),
+        'sign': sign_results,
+        'traceid': bench_traceid(args.iterations * 100),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
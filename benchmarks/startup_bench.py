@@ -0,0 +1,69 @@
+"""
+    启动耗时基准: 新开 python 进程测量 import 耗时和第一次生成签名请求参数的耗时 (time to first request)
+    不访问网络, 输出 json
+    python benchmarks/startup_bench.py --runs 5 --max-ms 3000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+probe = r'''
+import json, sys, time
+start = time.perf_counter()
+from apis.xhs_pc_apis import XHS_Apis
+import_ms = (time.perf_counter() - start) * 1000
+heavy = {name: name in sys.modules for name in ('execjs', 'openpyxl')}
+first_request_ms, error = None, None
+try:
+    from xhs_utils.xhs_util import generate_request_params
+    generate_request_params('a1=187d2defea8dz1fgwydnci40kw265ikh9fsxn66qs50000726043; webId=bench', '/api/sns/web/v1/search/notes', {'keyword': 'bench', 'page': 1})
+    first_request_ms = (time.perf_counter() - start) * 1000
+except Exception as e:
+    error = str(e)[:200]
+print(json.dumps({'import_ms': import_ms, 'first_request_ms': first_request_ms, 'heavy_modules_loaded': heavy, 'error': error}))
+'''
+
+
+def run_once():
+    res = subprocess.run([sys.executable, '-c', probe], cwd=root_dir, capture_output=True, text=True)
+    lines = res.stdout.strip().splitlines()
+    if not lines:
+        return {'import_ms': None, 'first_request_ms': None, 'heavy_modules_loaded': {}, 'error': res.stderr.strip()[-200:]}
+    return json.loads(lines[-1])
+
+
+def summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {'min': round(min(values), 3), 'median': round(statistics.median(values), 3), 'max': round(max(values), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='xhs 启动耗时基准')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None, help='time to first request 中位数超过该值时返回非 0')
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    report = {
+        'runs': args.runs,
+        'import_ms': summary([r['import_ms'] for r in results]),
+        'first_request_ms': summary([r['first_request_ms'] for r in results]),
+        'heavy_modules_loaded': results[-1]['heavy_modules_loaded'],
+        'errors': sorted({r['error'] for r in results if r['error']}),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.max_ms is not None:
+        first = report['first_request_ms']
+        if first is None or first['median'] > args.max_ms or any(report['heavy_modules_loaded'].values()):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,75 @@
-import json
+import asyncio
+import contextlib
 import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.common_util import init
-from xhs_utils.data_util import handle_note_info, download_note, save_to_xlsx
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.data_util import handle_note_info, handle_user_info, download_note, save_to_xlsx
+from xhs_utils.disk_cache_util import DiskCache
 
 
 class Data_Spider():
-    def __init__(self):
+    def __init__(self, cache: DiskCache = None):
+        """
+            :param cache: 笔记详细和用户信息的本地缓存（可选）, 不传时看环境变量 XHS_CACHE_FILE
+        """
         self.xhs_apis = XHS_Apis()
+        if cache is None and os.getenv('XHS_CACHE_FILE'):
+            cache = DiskCache(os.getenv('XHS_CACHE_FILE'), stale_while_revalidate=os.getenv('XHS_CACHE_SWR', '0') == '1')
+        self.cache = cache
+        # 事件循环 -> [AsyncXHS_Apis, 使用中的数量]
+        self.async_clients = {}
+        self.account_semaphores = {}
+        self.account_lock = threading.Lock()
+
+    @contextlib.asynccontextmanager
+    async def open_async_apis(self):
+        """
+            当前事件循环的异步客户端, 嵌套使用时共用一个, 最外层退出时关闭
+            aiohttp 的 session 绑定事件循环, 每次 asyncio.run 都会新建
+        """
+        # 异步客户端依赖 aiohttp, 用到时才加载
+        from apis.xhs_pc_async_apis import AsyncXHS_Apis
+        loop = asyncio.get_running_loop()
+        entry = self.async_clients.get(loop)
+        if entry is None:
+            entry = [AsyncXHS_Apis(), 0]
+            self.async_clients[loop] = entry
+        entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.async_clients[loop]
+                await entry[0].close()
 
     def spider_note(self, note_url: str, cookies_str: str, proxies=None):
         """
-        爬取一个笔记的信息
+        爬取一个笔记的信息, 有缓存时先查缓存
         :param note_url:
         :param cookies_str:
         :return:
         """
+        if self.cache is None:
+            return self.fetch_note(note_url, cookies_str, proxies)
+        note_id = urllib.parse.urlparse(note_url).path.split("/")[-1]
+        success, msg, note_info = self.cache.get_or_fetch('note', note_id, lambda: self.fetch_note(note_url, cookies_str, proxies))
+        if success and note_info is not None:
+            note_info['note_url'] = note_url
+        if msg and str(msg).startswith('缓存'):
+            logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
+        return success, msg, note_info
+
+    def fetch_note(self, note_url: str, cookies_str: str, proxies=None):
+        """
+        从接口获取一个笔记的信息, 不经过缓存
+        """
         note_info = None
         try:
             success, msg, note_info = self.xhs_apis.get_note_info(note_url, cookies_str, proxies)
@@ -31,16 +84,129 @@ class Data_Spider():
         logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
         return success, msg, note_info
 
-    def spider_some_note(self, notes: list, cookies_str: str, base_path: dict = None, save_choice: str = 'none', excel_name: str = '', proxies=None):
+    def spider_user_info(self, user_url: str, cookies_str: str, proxies=None):
+        """
+        爬取一个用户的信息, 有缓存时先查缓存
+        :param user_url: 用户主页url或用户id
+        :return: (success, msg, user_info)
+        """
+        user_id = urllib.parse.urlparse(user_url).path.split("/")[-1]
+
+        def fetch():
+            user_info = None
+            try:
+                success, msg, res_json = self.xhs_apis.get_user_info(user_id, cookies_str, proxies)
+                if success:
+                    user_info = handle_user_info(res_json['data'], user_id)
+            except Exception as e:
+                success = False
+                msg = e
+            logger.info(f'爬取用户信息 {user_id}: {success}, msg: {msg}')
+            return success, msg, user_info
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch('user', user_id, fetch)
+
+    @staticmethod
+    def filter_note_cards(notes: list, skip_note=None, seen: set = None):
+        """
+            过滤搜索结果: 只保留笔记, 去掉重复的 note_id 和 skip_note(note_id) 为 True 的笔记
+            :param skip_note: 跳过判断, 比如已经看过的笔记（可选）
+            :param seen: 本次已经出现过的 note_id, 多页之间共用（可选）
+            :return: (保留的笔记, 跳过的数量)
+        """
+        seen = set() if seen is None else seen
+        kept = []
+        skipped = 0
+        for note in notes:
+            if note['model_type'] != "note":
+                continue
+            if note['id'] in seen or (skip_note is not None and skip_note(note['id'])):
+                skipped += 1
+                continue
+            seen.add(note['id'])
+            kept.append(note)
+        return kept, skipped
+
+    def get_account_semaphore(self, cookies_str: str, limit: int):
+        """
+            同一个账号(a1) 共用的并发上限, 多个批次同时跑时也不会超过
+            上限以这个账号第一次设置的为准, 之后传入不同的 limit 不会生效
+        """
+        a1 = get_cookie_context(cookies_str).a1
+        with self.account_lock:
+            if a1 not in self.account_semaphores:
+                self.account_semaphores[a1] = (threading.BoundedSemaphore(limit), limit)
+            semaphore, account_limit = self.account_semaphores[a1]
+        if account_limit != limit:
+            logger.warning(f'账号 {a1} 的并发上限已经是 {account_limit}, 忽略 {limit}')
+        return semaphore
+
+    def spider_notes(self, notes: list, cookies_str: str, proxies=None, max_workers: int = 1, per_account_limit: int = None, deadline: float = None):
+        """
+        爬取多个笔记, 可并发
+        :param notes: 笔记URL列表, 也可以是逐页产出URL的生成器, 边迭代边提交
+        :param max_workers: 并发数, 1 为逐个爬取
+        :param per_account_limit: 同一账号同时在途的请求上限（可选）
+        :param deadline: 整批的截止时间(秒), 超时未完成的笔记记为失败（可选）
+        :return: 与 notes 顺序一致的 (success, msg, note_info) 列表
+        """
+        end_time = time.monotonic() + deadline if deadline else None
+        timeout_result = (False, '超过截止时间', None)
+        semaphore = self.get_account_semaphore(cookies_str, per_account_limit) if per_account_limit else None
+        # 返回后设置, 还没开始的任务不再发请求
+        stopped = threading.Event()
+
+        def task(note_url):
+            if stopped.is_set() or (end_time is not None and time.monotonic() > end_time):
+                return timeout_result
+            if semaphore is None:
+                return self.spider_note(note_url, cookies_str, proxies)
+            # 等账号名额时也不超过截止时间
+            timeout = max(0.0, end_time - time.monotonic()) if end_time is not None else None
+            if not semaphore.acquire(timeout=timeout):
+                return timeout_result
+            try:
+                if stopped.is_set():
+                    return timeout_result
+                return self.spider_note(note_url, cookies_str, proxies)
+            finally:
+                semaphore.release()
+
+        if max_workers <= 1:
+            return [task(note_url) for note_url in notes]
+        executor = ThreadPoolExecutor(max_workers)
+        futures = [executor.submit(task, note_url) for note_url in notes]
+        results = []
+        for future in futures:
+            try:
+                timeout = max(0.0, end_time - time.monotonic()) if end_time is not None else None
+                results.append(future.result(timeout=timeout))
+            except TimeoutError:
+                future.cancel()
+                results.append(timeout_result)
+            except Exception as e:
+                results.append((False, e, None))
+        # 超时的任务不再等待, 已经在跑的任务做完当前这个请求就结束
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def spider_some_note(self, notes: list, cookies_str: str, base_path: dict = None, save_choice: str = 'none', excel_name: str = '', proxies=None, max_workers: int = 1, per_account_limit: int = None, deadline: float = None, errors: list = None):
         """
         爬取一些笔记的信息
-        :param notes: 笔记URL列表
+        :param notes: 笔记URL列表, 也可以是生成器
         :param cookies_str: Cookie字符串
         :param base_path: 保存路径（可选）
         :param save_choice: 保存选择 ('all', 'excel', 'media', 'none')
         :param excel_name: Excel文件名（可选）
         :param proxies: 代理设置（可选）
-        :return: note_list 笔记数据列表
+        :param max_workers: 并发数, 默认 1 逐个爬取
+        :param per_account_limit: 同一账号同时在途的请求上限（可选）
+        :param deadline: 整批的截止时间(秒)（可选）
+        :param errors: 传入列表时, 失败的笔记以 (note_url, msg) 追加进去（可选）
+        :return: note_list 笔记数据列表, 顺序与 notes 一致
         """
         # 只有在需要保存文件时才检查参数
         if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
@@ -49,14 +215,29 @@ class Data_Spider():
             raise ValueError('保存文件时 base_path 不能为空')
 
         note_list = []
-        for note_url in notes:
-            success, msg, note_info = self.spider_note(note_url, cookies_str, proxies)
+        note_urls = []
+
+        def iter_note_urls():
+            # notes 可能是生成器, 迭代时记下url, 用来和结果对齐
+            for note_url in notes:
+                note_urls.append(note_url)
+                yield note_url
 
+        results = self.spider_notes(iter_note_urls(), cookies_str, proxies, max_workers, per_account_limit, deadline)
+        for note_url, (success, msg, note_info) in zip(note_urls, results):
             if note_info is not None and success:
                 note_list.append(note_info)
+            elif errors is not None:
+                errors.append((note_url, msg))
 
         # 只有在需要保存时才执行保存操作
-        if save_choice != 'none' and base_path:
+        self.save_note_list(note_list, base_path, save_choice, excel_name)
+
+        return note_list
+
+
+    def save_note_list(self, note_list: list, base_path: dict, save_choice: str, excel_name: str):
+        if save_choice != 'none' and base_path and note_list:
             for note_info in note_list:
                 if save_choice == 'all' or 'media' in save_choice:
                     download_note(note_info, base_path['media'], save_choice)
@@ -64,8 +245,67 @@ class Data_Spider():
                 file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
                 save_to_xlsx(note_list, file_path)
 
+    async def async_spider_note(self, note_url: str, cookies_str: str, proxies=None):
+        """
+            spider_note 的异步版本
+        """
+        note_info = None
+        try:
+            async with self.open_async_apis() as async_xhs_apis:
+                success, msg, note_info = await async_xhs_apis.get_note_info(note_url, cookies_str, proxies)
+            if success:
+                note_info = note_info['data']['items'][0]
+                note_info['url'] = note_url
+                note_info = handle_note_info(note_info)
+        except Exception as e:
+            success = False
+            msg = e
+        logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
+        return success, msg, note_info
+
+    async def async_spider_some_note(self, notes: list, cookies_str: str, base_path: dict = None, save_choice: str = 'none', excel_name: str = '', proxies=None):
+        """
+            spider_some_note 的异步版本, 所有笔记同时发起, 在途数量由 AsyncXHS_Apis 的 max_concurrency 限制
+            返回的 note_list 保持输入顺序
+        """
+        if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
+            raise ValueError('excel_name 不能为空')
+        if (save_choice != 'none') and (base_path is None):
+            raise ValueError('保存文件时 base_path 不能为空')
+        async with self.open_async_apis():
+            results = await asyncio.gather(*[self.async_spider_note(note_url, cookies_str, proxies) for note_url in notes])
+        note_list = [note_info for success, msg, note_info in results if success and note_info is not None]
+        # 保存文件是阻塞操作, 放到线程里
+        await asyncio.to_thread(self.save_note_list, note_list, base_path, save_choice, excel_name)
         return note_list
 
+    async def async_spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict = None, save_choice: str = 'none', sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None, skip_note=None):
+        """
+            spider_some_search_note 的异步版本
+            :param skip_note: skip_note(note_id) 为 True 的搜索结果不获取详细（可选）
+            :return: (note_data_list, success, msg)
+        """
+        note_data_list = []
+        try:
+            async with self.open_async_apis() as async_xhs_apis:
+                success, msg, notes = await async_xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+                if not success and notes:
+                    # 某一页重试用尽时, 之前已经拿到的页照常爬取
+                    logger.warning(f'搜索关键词 {query} 中途失败, 保留已获取的 {len(notes)} 条: {msg}')
+                    success, msg = True, f'部分成功: {msg}'
+                if success:
+                    notes, skipped = self.filter_note_cards(notes, skip_note)
+                    logger.info(f'搜索关键词 {query} 笔记数量: {len(notes)}, 跳过: {skipped}')
+                    note_urls = [f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}" for note in notes]
+                    if save_choice == 'all' or save_choice == 'excel':
+                        excel_name = query
+                    note_data_list = await self.async_spider_some_note(note_urls, cookies_str, base_path, save_choice, excel_name, proxies)
+        except Exception as e:
+            success = False
+            msg = e
+            note_data_list = []
+        logger.info(f'搜索关键词 {query} 笔记: {success}, msg: {msg}')
+        return note_data_list, success, msg
 
     def spider_user_all_note(self, user_url: str, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None):
         """
@@ -78,6 +318,10 @@ class Data_Spider():
         note_list = []
         try:
             success, msg, all_note_info = self.xhs_apis.get_user_all_notes(user_url, cookies_str, proxies)
+            if not success and all_note_info:
+                # 某一页重试用尽时, 之前已经拿到的页照常爬取
+                logger.warning(f'用户 {user_url} 作品列表中途失败, 保留已获取的 {len(all_note_info)} 条: {msg}')
+                success, msg = True, f'部分成功: {msg}'
             if success:
                 logger.info(f'用户 {user_url} 作品数量: {len(all_note_info)}')
                 for simple_note_info in all_note_info:
@@ -92,7 +336,7 @@ class Data_Spider():
         logger.info(f'爬取用户所有视频 {user_url}: {success}, msg: {msg}')
         return note_list, success, msg
 
-    def spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict = None, save_choice: str = 'none', sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None):
+    def spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict = None, save_choice: str = 'none', sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None, max_workers: int = 1, deadline: float = None, skip_note=None, per_account_limit: int = None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
             :param query 搜索的关键词
@@ -105,24 +349,41 @@ class Data_Spider():
             :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
             :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
             :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            :param max_workers 获取笔记详细的并发数
+            :param per_account_limit 同一账号同时在途的请求上限（可选）
+            :param deadline 获取笔记详细的截止时间(秒)
+            :param skip_note 跳过判断, skip_note(note_id) 为 True 的搜索结果在获取详细前就被过滤（可选）
+                require_num 仍然是扫描的搜索结果数量, 跳过的笔记不会触发多翻页
             :return: (note_data_list, success, msg) 返回笔记数据列表、成功状态和消息
         """
         note_data_list = []
-        try:
-            success, msg, notes = self.xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
-            if success:
-                notes = list(filter(lambda x: x['model_type'] == "note", notes))
-                logger.info(f'搜索关键词 {query} 笔记数量: {len(notes)}')
-                note_urls = []
-                for note in notes:
-                    note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
-                    note_urls.append(note_url)
-
-                # 获取笔记详细数据
-                if save_choice == 'all' or save_choice == 'excel':
-                    excel_name = query
-                note_data_list = self.spider_some_note(note_urls, cookies_str, base_path, save_choice, excel_name, proxies)
+        status = {'success': True, 'msg': 'success', 'count': 0, 'skipped': 0}
+        seen = set()
+
+        def iter_note_urls():
+            # 每拿到一页搜索结果就产出url, 笔记详细不用等所有页都翻完
+            try:
+                for notes, page in self.xhs_apis.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, require_num=require_num):
+                    notes = notes[:require_num - status['count']]
+                    status['count'] += len(notes)
+                    notes, skipped = self.filter_note_cards(notes, skip_note, seen)
+                    status['skipped'] += skipped
+                    for note in notes:
+                        yield f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
+            except Exception as e:
+                status['success'], status['msg'] = False, e
 
+        try:
+            # 获取笔记详细数据
+            if save_choice == 'all' or save_choice == 'excel':
+                excel_name = query
+            note_data_list = self.spider_some_note(iter_note_urls(), cookies_str, base_path, save_choice, excel_name, proxies, max_workers=max_workers, per_account_limit=per_account_limit, deadline=deadline)
+            success, msg = status['success'], status['msg']
+            if not success and status['count']:
+                # 某一页重试用尽时, 之前已经拿到的页照常爬取
+                logger.warning(f'搜索关键词 {query} 中途失败, 保留已获取的 {status["count"]} 条: {msg}')
+                success, msg = True, f'部分成功: {msg}'
+            logger.info(f'搜索关键词 {query} 笔记数量: {status["count"]}, 跳过: {status["skipped"]}')
         except Exception as e:
             success = False
             msg = e
@@ -0,0 +1,53 @@
+// 常驻的 js 执行进程, 脚本只加载一次, 之后通过 stdin/stdout 按行收发 json
+// 用法: node xhs_js_server.js <脚本路径>
+// 请求: {"id": 1, "fn": "get_request_headers_params", "args": [...]}
+// 响应: {"id": 1, "result": ...} 或 {"id": 1, "error": "..."}
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const { createRequire } = require('module');
+
+// 脚本里的 console.log 会污染 stdout, 统一转到 stderr
+const stdoutWrite = process.stdout.write.bind(process.stdout);
+console.log = console.info = console.warn = console.debug = console.error;
+
+function send(msg) {
+    stdoutWrite(JSON.stringify(msg) + '\n');
+}
+
+const scriptPath = path.resolve(process.argv[2]);
+let lookup;
+try {
+    const src = fs.readFileSync(scriptPath, 'utf-8');
+    // 和 execjs 一样把脚本包进函数里执行, 用 eval 取出脚本内声明的函数
+    const wrapper = new Function('require', '__filename', '__dirname', src + '\n;return function (__name) { return eval(__name); };');
+    lookup = wrapper(createRequire(scriptPath), scriptPath, path.dirname(scriptPath));
+} catch (e) {
+    send({ ready: false, error: String(e && e.stack || e) });
+    process.exit(1);
+}
+send({ ready: true, pid: process.pid });
+
+const rl = readline.createInterface({ input: process.stdin });
+rl.on('line', (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let req;
+    try {
+        req = JSON.parse(line);
+    } catch (e) {
+        send({ id: null, error: 'bad request: ' + e });
+        return;
+    }
+    try {
+        const fn = lookup(req.fn);
+        if (typeof fn !== 'function') {
+            throw new Error(req.fn + ' is not a function');
+        }
+        send({ id: req.id, result: fn.apply(null, req.args || []) });
+    } catch (e) {
+        send({ id: req.id, error: String(e && e.stack || e) });
+    }
+});
+rl.on('close', () => process.exit(0));
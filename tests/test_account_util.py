@@ -0,0 +1,50 @@
+import pytest
+
+from xhs_utils.account_util import AccountPool
+from xhs_utils.common_util import load_cookies_list
+from xhs_utils.retry_util import AUTH_EXPIRED, CAPTCHA, XhsApiError, check_response
+
+
+class FakeApis():
+    def __init__(self, errors):
+        self.errors = errors
+
+    def check_login(self, cookies_str, proxies=None):
+        error = self.errors.get(cookies_str.split('=')[1])
+        if error is not None:
+            raise error
+        return {'success': True, 'msg': '成功'}
+
+
+def test_only_auth_expired_disables_account():
+    pool = AccountPool(['a1=expired', 'a1=captcha', 'a1=proxy', 'a1=ok'])
+    errors = {
+        'expired': XhsApiError(AUTH_EXPIRED, '登录已过期'),
+        'captcha': XhsApiError(CAPTCHA, 'captcha: HTTP 403 Forbidden', 403),
+        'proxy': OSError('ProxyError: 403 Forbidden, cookie login'),
+    }
+    assert pool.validate(FakeApis(errors)) == 3
+    assert [account.a1 for account in pool.active_accounts()] == ['captcha', 'proxy', 'ok']
+
+    account = pool.acquire()
+    pool.release(account, False, '403 forbidden login cookie')
+    assert not account.disabled
+    account = pool.acquire()
+    pool.release(account, False, XhsApiError(AUTH_EXPIRED, '登录已过期'))
+    assert account.disabled
+    assert len(pool) == 2
+
+
+def test_check_response_raises_auth_expired():
+    with pytest.raises(XhsApiError) as info:
+        check_response(200, {'success': False, 'code': -100, 'msg': '登录已过期'})
+    assert info.value.kind == AUTH_EXPIRED
+
+
+def test_load_cookies_list(monkeypatch):
+    monkeypatch.setattr('xhs_utils.common_util.load_dotenv', lambda: None)
+    monkeypatch.delenv('XHS_BEAUTY_COOKIES', raising=False)
+    monkeypatch.setenv('XHS_BEAUTY_COOKIE', 'a1=x; web_session=a&b')
+    assert load_cookies_list() == ['a1=x; web_session=a&b']
+    monkeypatch.setenv('XHS_BEAUTY_COOKIES', 'a1=x; web_session=a&b\r\n\na1=y\n')
+    assert load_cookies_list() == ['a1=x; web_session=a&b', 'a1=y']
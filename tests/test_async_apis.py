@@ -0,0 +1,73 @@
+import asyncio
+
+from apis.xhs_pc_async_apis import AsyncXHS_Apis
+from main import Data_Spider
+
+
+def test_async_client_per_event_loop(monkeypatch):
+    sessions = []
+
+    async def get_note_info(self, note_url, cookies_str, proxies=None):
+        session = await self._get_session()
+        sessions.append(session)
+        # 信号量必须属于当前事件循环, 否则竞争时会抛 RuntimeError
+        await asyncio.gather(*[self.semaphore.acquire() for _ in range(self.max_concurrency)])
+        for _ in range(self.max_concurrency):
+            self.semaphore.release()
+        return False, 'fake', None
+
+    monkeypatch.setattr(AsyncXHS_Apis, 'get_note_info', get_note_info)
+    spider = Data_Spider()
+    for _ in range(2):
+        note_list = asyncio.run(spider.async_spider_some_note(['https://www.xiaohongshu.com/explore/n1', 'https://www.xiaohongshu.com/explore/n2'], ''))
+        assert note_list == []
+        assert spider.async_clients == {}
+    # 同一次运行共用一个 session, 运行结束后关闭
+    assert sessions[0] is sessions[1]
+    assert sessions[2] is not sessions[0]
+    assert all(session.closed for session in sessions)
+
+
+def test_async_apis_reused_across_event_loops():
+    apis = AsyncXHS_Apis(max_concurrency=1)
+
+    async def use():
+        session = await apis._get_session()
+        async with apis.semaphore:
+            await asyncio.sleep(0)
+        return session
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+    assert first is not second
+    asyncio.run(apis.close())
+
+
+def test_message_endpoints(monkeypatch):
+    requests = []
+
+    async def request(self, method, api, cookies_str, data='', proxies=None):
+        requests.append(api)
+        if api.startswith('/api/sns/web/unread_count'):
+            return {'success': True, 'msg': '成功', 'data': {'unread_count': 3}}
+        cursor = api.split('cursor=')[1]
+        page = int(cursor or 0)
+        return {'success': True, 'msg': '成功', 'data': {'cursor': str(page + 1), 'has_more': page < 2, 'message_list': [f'{api.split("?")[0]}-{page}']}}
+
+    monkeypatch.setattr(AsyncXHS_Apis, '_request', request)
+
+    async def run():
+        async with AsyncXHS_Apis() as apis:
+            unread = await apis.get_unread_message('a1=x')
+            metions = await apis.get_all_metions('a1=x')
+            likes = await apis.get_all_likesAndcollects('a1=x')
+            connections = await apis.get_all_new_connections('a1=x')
+            pages = [cursor async for _, cursor in apis.iter_all_metions('a1=x', cursor='1')]
+            return unread, metions, likes, connections, pages
+
+    unread, metions, likes, connections, pages = asyncio.run(run())
+    assert unread[0] and unread[2]['data']['unread_count'] == 3
+    assert metions == (True, 'success', [f'/api/sns/web/v1/you/mentions-{i}' for i in range(3)])
+    assert likes[2] == [f'/api/sns/web/v1/you/likes-{i}' for i in range(3)]
+    assert connections[2] == [f'/api/sns/web/v1/you/connections-{i}' for i in range(3)]
+    assert pages == ['2', '3']
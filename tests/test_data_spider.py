@@ -0,0 +1,36 @@
+import threading
+import time
+
+from main import Data_Spider
+
+COOKIES = 'a1=account; web_session=x'
+
+
+def test_account_semaphore_shared_across_limits():
+    spider = Data_Spider()
+    assert spider.get_account_semaphore(COOKIES, 2) is spider.get_account_semaphore(COOKIES, 5)
+    assert spider.get_account_semaphore('a1=other', 2) is not spider.get_account_semaphore(COOKIES, 2)
+
+
+def test_no_requests_after_deadline(monkeypatch):
+    spider = Data_Spider()
+    started = []
+    lock = threading.Lock()
+
+    def spider_note(note_url, cookies_str, proxies=None):
+        with lock:
+            started.append(time.monotonic())
+        time.sleep(0.2)
+        return True, 'success', {'note_url': note_url}
+
+    monkeypatch.setattr(spider, 'spider_note', spider_note)
+    start = time.monotonic()
+    results = spider.spider_notes([f'url{i}' for i in range(20)], COOKIES, max_workers=4, per_account_limit=2, deadline=0.5)
+    returned = time.monotonic()
+    assert returned - start < 0.8
+    assert len(results) == 20
+    assert results[-1] == (False, '超过截止时间', None)
+    time.sleep(0.6)
+    # 截止后已经在跑的请求做完就结束, 不再开始新的请求
+    assert all(t <= returned for t in started)
+    assert len(started) <= 6
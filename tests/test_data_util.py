@@ -0,0 +1,55 @@
+import http.server
+import os
+import threading
+
+import pytest
+
+from xhs_utils import data_util
+from xhs_utils.retry_util import RetryPolicy
+
+
+class MediaHandler(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        MediaHandler.requests.append(self.path)
+        status = {'/missing.jpg': 404, '/broken.jpg': 503}.get(self.path, 200)
+        body = b'media' if status == 200 else b''
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def media_url(monkeypatch):
+    MediaHandler.requests = []
+    monkeypatch.setattr(data_util, 'media_retry_policy', RetryPolicy(max_retries=2, base_delay=0, max_delay=0))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_media_is_skipped(media_url, tmp_path):
+    note_info = {
+        'note_id': 'n1', 'note_url': '', 'note_type': '图集', 'user_id': 'u1', 'home_url': '', 'nickname': '作者', 'avatar': '',
+        'title': '标题', 'desc': '', 'liked_count': 0, 'collected_count': 0, 'comment_count': 0, 'share_count': 0,
+        'video_cover': None, 'video_addr': None, 'tags': [], 'upload_time': '', 'ip_location': '',
+        'image_list': [f'{media_url}/missing.jpg', f'{media_url}/broken.jpg', f'{media_url}/ok.jpg'],
+    }
+    save_path = data_util.download_note(note_info, str(tmp_path), 'media')
+    # 404 不重试, 503 重试后放弃, 其它图片照常下载
+    assert MediaHandler.requests.count('/missing.jpg') == 1
+    assert MediaHandler.requests.count('/broken.jpg') == 3
+    assert sorted(os.listdir(save_path)) == ['detail.txt', 'image_2.jpg', 'info.json']
+
+
+def test_download_media_result(media_url, tmp_path):
+    assert data_util.download_media(str(tmp_path), 'ok', f'{media_url}/ok.jpg', 'image')
+    assert not data_util.download_media(str(tmp_path), 'video', f'{media_url}/missing.jpg', 'video')
+    assert os.listdir(tmp_path) == ['ok.jpg']
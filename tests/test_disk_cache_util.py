@@ -0,0 +1,69 @@
+import sqlite3
+
+from xhs_utils.disk_cache_util import DiskCache
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_set_get_and_size(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = DiskCache(path)
+    cache.set('note', 'n1', {'title': 'a'})
+    cache.set('note', 'n1', {'title': 'b'})
+    cache.set('user', 'u1', {'nickname': 'c'})
+    assert cache.get('note', 'n1') == ({'title': 'b'}, True)
+    assert cache.get('note', 'missing') == (None, False)
+    assert cache.stats()['size'] == 2
+    cache.delete('note', 'n1')
+    cache.delete('note', 'n1')
+    assert cache.stats()['size'] == 1
+    cache.close()
+    # 重新打开时从数据库数一次
+    cache = DiskCache(path)
+    assert cache.stats()['size'] == 1
+    cache.close()
+
+
+def test_set_does_not_count_rows(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.db'), max_entries=100)
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+    for i in range(50):
+        cache.set('note', str(i), i)
+    assert not [sql for sql in statements if 'COUNT' in sql]
+    cache.close()
+
+
+def test_evicts_least_recently_accessed(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = DiskCache(path, max_entries=10)
+    for i in range(10):
+        cache.set('note', str(i), i)
+    cache.get('note', '0')
+    cache.set('note', '10', 10)
+    # 超过 10 条时多删 10%, 剩 9 条, 刚访问过的 0 保留
+    assert cache.stats()['size'] == count_rows(path) == 9
+    assert cache.get('note', '0') == (0, True)
+    assert cache.get('note', '1') == (None, False)
+    cache.close()
+
+
+def test_get_or_fetch(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.db'))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return True, '成功', {'id': 'n1'}
+
+    assert cache.get_or_fetch('note', 'n1', fetch) == (True, '成功', {'id': 'n1'})
+    assert cache.get_or_fetch('note', 'n1', fetch) == (True, '缓存', {'id': 'n1'})
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    cache.close()
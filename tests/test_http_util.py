@@ -0,0 +1,82 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from xhs_utils.http_util import SessionPool
+
+
+class CookieHandler(http.server.BaseHTTPRequestHandler):
+    # 返回收到的 Cookie, 同时下发一个 session cookie
+    def do_GET(self):
+        body = json.dumps({'cookie': self.headers.get('Cookie')}).encode()
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'web_session=from_server; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CookieHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_does_not_leak_cookies_between_accounts(server_url):
+    pool = SessionPool()
+    assert pool.request('GET', server_url, cookies={'a1': 'A'}).json()['cookie'] == 'a1=A'
+    assert pool.request('GET', server_url, cookies={'a1': 'B'}).json()['cookie'] == 'a1=B'
+    assert len(pool.get_session().cookies) == 0
+    pool.close()
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    ports = []
+
+    def do_GET(self):
+        KeepAliveHandler.ports.append(self.client_address[1])
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_reuses_connections():
+    KeepAliveHandler.ports = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = SessionPool()
+    try:
+        for _ in range(5):
+            assert pool.request('GET', f'http://127.0.0.1:{server.server_port}/').status_code == 200
+        # 同一个 session 复用同一条 TCP 连接
+        assert len(set(KeepAliveHandler.ports)) == 1
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_one_session_per_proxy():
+    pool = SessionPool()
+    proxy_a = {'http': 'http://127.0.0.1:1', 'https': 'http://127.0.0.1:1'}
+    proxy_b = {'https': 'http://127.0.0.1:2'}
+    assert pool.get_session() is pool.get_session(None)
+    assert pool.get_session(proxy_a) is pool.get_session(dict(reversed(list(proxy_a.items()))))
+    assert pool.get_session(proxy_a) is not pool.get_session(proxy_b)
+    assert pool.get_session(proxy_b).proxies == proxy_b
+    pool.close()
+    assert pool.sessions == {}
@@ -0,0 +1,203 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xhs_utils.js_util import JsCallError, JsContextPool, NodeJsContext
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+needs_node = pytest.mark.skipif(shutil.which('node') is None, reason='没有安装 node')
+
+SCRIPT = '''
+var counter = 0;
+function add(a, b) {
+    console.log('不会写到 stdout');
+    return a + b;
+}
+function incr() {
+    counter += 1;
+    return counter;
+}
+function fail() {
+    throw new Error('boom');
+}
+'''
+
+
+@pytest.fixture
+def ctx(tmp_path):
+    if shutil.which('node') is None:
+        pytest.skip('没有安装 node')
+    script_path = tmp_path / 'script.js'
+    script_path.write_text(SCRIPT, encoding='utf-8')
+    ctx = NodeJsContext(str(script_path))
+    yield ctx
+    ctx.close()
+
+
+def test_call_keeps_script_state(ctx):
+    assert ctx.call('add', 1, 2) == 3
+    assert ctx.call('add', '中', '文') == '中文'
+    # 脚本只加载一次, 全局状态在调用之间保留
+    assert [ctx.call('incr') for _ in range(3)] == [1, 2, 3]
+
+
+def test_js_error(ctx):
+    with pytest.raises(JsCallError, match='boom'):
+        ctx.call('fail')
+    with pytest.raises(JsCallError, match='missing'):
+        ctx.call('missing')
+    assert ctx.call('add', 1, 1) == 2
+
+
+def test_restart_after_crash(ctx):
+    pid = ctx.pid
+    ctx.process.kill()
+    ctx.process.wait()
+    assert ctx.call('add', 2, 3) == 5
+    assert ctx.pid != pid
+    assert ctx.restarts == 1
+
+
+def test_concurrent_calls(ctx):
+    results = {}
+
+    def worker(i):
+        results[i] = ctx.call('add', i, i)
+
+    threads = [threading.Thread(target=worker, args=(i, )) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: 2 * i for i in range(20)}
+
+
+@needs_node
+def test_load_error(tmp_path):
+    script_path = tmp_path / 'bad.js'
+    script_path.write_text('function (', encoding='utf-8')
+    with pytest.raises(JsCallError, match='加载'):
+        NodeJsContext(str(script_path))
+
+
+class FakeContext():
+    """
+        记录调用线程的假 js context, 同一个 context 被并发调用时报错
+    """
+    created = []
+
+    def __init__(self):
+        self.busy = False
+        self.calls = []
+        self.closed = False
+        FakeContext.created.append(self)
+
+    def call(self, fn, *args):
+        assert not self.busy, '同一个进程被并发调用'
+        self.busy = True
+        try:
+            time.sleep(0.001)
+            self.calls.append((fn, args))
+            return id(self)
+        finally:
+            self.busy = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_routes_by_key():
+    FakeContext.created = []
+    pool = JsContextPool(FakeContext, 4)
+    # 进程在第一次被路由到时才启动
+    assert FakeContext.created == []
+    a1_list = [f'a1_{i}' for i in range(20)]
+    first = {a1: pool.call('sign', a1, key=a1) for a1 in a1_list}
+    for a1 in a1_list:
+        assert pool.call('sign', a1, key=a1) == first[a1]
+        assert pool.get_worker(a1).index == zlib.crc32(a1.encode('utf-8')) % 4
+    assert len(FakeContext.created) == len(set(first.values())) > 1
+    pool.close()
+    assert all(ctx.closed for ctx in FakeContext.created)
+    assert all(not worker['started'] for worker in pool.stats())
+
+
+def test_pool_concurrent_calls():
+    FakeContext.created = []
+    pool = JsContextPool(FakeContext, 3)
+    a1_list = [f'a1_{i}' for i in range(9)]
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: pool.call('sign', i, key=a1_list[i % 9]), range(200)))
+        # 没有 key 时选排队最少的, 三个进程都会用上
+        list(executor.map(lambda i: pool.call('sign', i), range(60)))
+    stats = pool.stats()
+    assert sum(worker['calls'] for worker in stats) == 260
+    assert all(worker['queue_depth'] == 0 for worker in stats)
+    assert all(worker['started'] for worker in stats)
+
+
+def test_xhs_util_routes_by_a1(monkeypatch):
+    from xhs_utils import xhs_util
+
+    keys = []
+
+    class FakePool():
+        def call(self, fn, api, data, a1, key=None):
+            keys.append((a1, key))
+            return {'xs': 'xs', 'xt': 1, 'xs_common': 'common'}
+
+    monkeypatch.setattr(xhs_util, 'js', FakePool())
+    monkeypatch.setattr(xhs_util, 'sign_cache', None)
+    headers, cookies, data = xhs_util.generate_request_params('a1=account_a; web_session=x', '/api/test', {'k': 'v'})
+    assert headers['x-s'] == 'xs' and headers['x-t'] == '1'
+    assert data == '{"k":"v"}'
+    assert keys == [('account_a', 'account_a')]
+
+
+def test_lazy_context_compiles_on_first_call(monkeypatch):
+    from xhs_utils import js_util
+
+    compiled = []
+
+    class Context():
+        def call(self, fn, *args):
+            return id(self)
+
+    def compile_js(name, backend=None):
+        compiled.append((name, backend))
+        time.sleep(0.01)
+        return Context()
+
+    monkeypatch.setattr(js_util, 'compile_js', compile_js)
+    ctx = js_util.LazyJsContext('xhs_xray.js')
+    assert compiled == [] and ctx.pid is None
+    with ThreadPoolExecutor(8) as executor:
+        results = set(executor.map(lambda i: ctx.call('traceIds', i), range(20)))
+    # 多线程同时第一次调用也只编译一次
+    assert compiled == [('xhs_xray.js', None)]
+    assert len(results) == 1
+    ctx.close()
+    assert ctx.ctx is None
+
+
+def test_import_does_not_start_js():
+    code = '''
+import sys
+import main
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils import xhs_creator_util, xhs_util
+assert xhs_util.xray_js.ctx is None
+assert xhs_creator_util.js.ctx is None
+assert not any(worker['started'] for worker in xhs_util.get_sign_stats())
+assert 'execjs' not in sys.modules and 'openpyxl' not in sys.modules
+'''
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,80 @@
+import copy
+import json
+
+from xhs_utils.data_util import handle_comment_info, handle_note_info, handle_user_info
+from xhs_utils.json_util import loads, project_response
+
+USER = {'user_id': 'u1', 'nickname': '用户', 'avatar': 'https://a/avatar', 'image': 'https://a/image', 'xsec_token': 't', 'extra': 1}
+PICTURE = {
+    'height': 100,
+    'url_default': 'https://p/default',
+    'info_list': [{'image_scene': 'WB_PRV', 'url': 'https://p/prv'}, {'image_scene': 'WB_DFT', 'url': 'https://p/dft'}],
+}
+
+
+def make_comment(comment_id, sub_comments=()):
+    return {
+        'id': comment_id,
+        'note_id': 'n1',
+        'content': '内容',
+        'show_tags': ['is_author'],
+        'create_time': 1700000000000,
+        'ip_location': '四川',
+        'like_count': '3',
+        'liked': False,
+        'status': 0,
+        'user_info': dict(USER),
+        'target_comment': {'id': 'c0', 'user_info': dict(USER)},
+        'pictures': [copy.deepcopy(PICTURE)],
+        'sub_comment_count': str(len(sub_comments)),
+        'sub_comment_cursor': 'cursor',
+        'sub_comment_has_more': False,
+        'sub_comments': list(sub_comments),
+        'at_users': [],
+    }
+
+
+def test_projected_comment_matches_raw():
+    res_json = {
+        'success': True, 'code': 0, 'msg': '成功',
+        'data': {'cursor': 'c', 'has_more': False, 'time': 1, 'comments': [make_comment('c1', [make_comment('c2')])]},
+    }
+    projected = project_response('/api/sns/web/v2/comment/page?note_id=n1', copy.deepcopy(res_json))
+    assert 'status' not in projected['data']['comments'][0]
+    for raw, comment in [(res_json['data']['comments'][0], projected['data']['comments'][0]),
+                         (res_json['data']['comments'][0]['sub_comments'][0], projected['data']['comments'][0]['sub_comments'][0])]:
+        raw = dict(raw, note_url='https://www.xiaohongshu.com/explore/n1')
+        comment = dict(comment, note_url='https://www.xiaohongshu.com/explore/n1')
+        result = handle_comment_info(comment)
+        assert result == handle_comment_info(raw)
+        assert result['pictures'] == ['https://p/dft']
+        assert result['avatar'] == 'https://a/image'
+
+
+def test_projected_note_matches_raw():
+    for note_type, extra in [('normal', {}), ('video', {'video': {'consumer': {'origin_video_key': 'key'}, 'media': {}}})]:
+        note_card = {
+            'note_id': 'n1', 'type': note_type, 'title': '标题', 'desc': '描述', 'user': dict(USER),
+            'interact_info': {'liked_count': '1', 'collected_count': '2', 'comment_count': '3', 'share_count': '4', 'followed': False},
+            'image_list': [copy.deepcopy(PICTURE)],
+            'tag_list': [{'id': 't1', 'name': '标签', 'type': 'topic'}],
+            'time': 1700000000000, 'last_update_time': 1700000000000, 'ip_location': '四川', 'at_user_list': [],
+            **extra,
+        }
+        res_json = {'success': True, 'code': 0, 'data': {'items': [{'id': 'n1', 'model_type': 'note', 'note_card': note_card}]}}
+        projected = project_response('/api/sns/web/v1/feed', loads(json.dumps(res_json)))
+        raw = dict(res_json['data']['items'][0], url='https://www.xiaohongshu.com/explore/n1')
+        note = dict(projected['data']['items'][0], url='https://www.xiaohongshu.com/explore/n1')
+        assert 'at_user_list' not in note['note_card']
+        assert handle_note_info(note) == handle_note_info(raw)
+
+
+def test_projected_user_matches_raw():
+    data = {
+        'basic_info': {'nickname': '用户', 'imageb': 'https://a/b', 'red_id': '1', 'gender': 1, 'ip_location': '四川', 'desc': ''},
+        'interactions': [{'count': '1'}, {'count': '2'}, {'count': '3'}],
+        'tags': [{'name': '标签'}],
+    }
+    res_json = {'success': True, 'code': 0, 'data': data}
+    projected = project_response('/api/sns/web/v1/user/otherinfo?target_user_id=u1', copy.deepcopy(res_json))
+    assert handle_user_info(projected['data'], 'u1') == handle_user_info(data, 'u1')
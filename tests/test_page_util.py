@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from xhs_utils.page_util import async_iter_cursor_pages, async_iter_numbered_pages, iter_cursor_pages, iter_numbered_pages
+
+PAGE_SIZE = 10
+TOTAL_PAGES = 5
+
+
+class FakePages():
+    """
+        一共 TOTAL_PAGES 页, 每页 PAGE_SIZE 条, 记录请求的页和同时在途的最大数量
+    """
+    def __init__(self, delay=0.02, fail_page=None):
+        self.delay = delay
+        self.fail_page = fail_page
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def response(self, page):
+        if page == self.fail_page:
+            return False, f'第 {page} 页失败', None
+        items = [f'{page}-{i}' for i in range(PAGE_SIZE)]
+        return True, 'success', {'items': items, 'cursor': str(page + 1), 'has_more': page < TOTAL_PAGES}
+
+    def fetch(self, page):
+        page = int(page or 1)
+        with self.lock:
+            self.requested.append(page)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return self.response(page)
+
+    async def async_fetch(self, page):
+        page = int(page or 1)
+        self.requested.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return self.response(page)
+
+
+def parse_numbered(res_json):
+    return res_json['items'], res_json['has_more']
+
+
+def parse_cursor(res_json):
+    return res_json['items'], res_json['cursor'], res_json['has_more']
+
+
+def collect(pages):
+    return [item for items, _ in pages for item in items]
+
+
+EXPECTED = [f'{page}-{i}' for page in range(1, TOTAL_PAGES + 1) for i in range(PAGE_SIZE)]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_numbered_pages_in_order(prefetch):
+    pages = FakePages()
+    assert collect(iter_numbered_pages(pages.fetch, parse_numbered, prefetch=prefetch)) == EXPECTED
+    # 预取时多页同时在途, 最多 prefetch + 1 页
+    assert pages.max_in_flight == 1 if prefetch == 0 else 1 < pages.max_in_flight <= prefetch + 1
+
+
+def test_numbered_pages_prefetch_is_faster():
+    start = time.perf_counter()
+    collect(iter_numbered_pages(FakePages(0.05).fetch, parse_numbered, prefetch=0))
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    collect(iter_numbered_pages(FakePages(0.05).fetch, parse_numbered, prefetch=4))
+    assert time.perf_counter() - start < serial * 0.6
+
+
+def test_numbered_pages_stop_at_require_num():
+    pages = FakePages()
+    items = collect(iter_numbered_pages(pages.fetch, parse_numbered, require_num=25, prefetch=3, page_size=PAGE_SIZE))
+    assert items == EXPECTED[:30]
+    # 已经够数的页不再预取
+    assert sorted(pages.requested) == [1, 2, 3]
+
+
+def test_numbered_pages_failure_keeps_previous_pages():
+    pages = FakePages(fail_page=3)
+    items = []
+    with pytest.raises(Exception, match='第 3 页失败'):
+        for page_items, _ in iter_numbered_pages(pages.fetch, parse_numbered, prefetch=2):
+            items.extend(page_items)
+    assert items == EXPECTED[:20]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1])
+def test_cursor_pages(prefetch):
+    pages = FakePages()
+    result = list(iter_cursor_pages(pages.fetch, parse_cursor, prefetch=prefetch))
+    assert collect(result) == EXPECTED
+    assert [cursor for _, cursor in result] == [str(page + 1) for page in range(1, TOTAL_PAGES + 1)]
+    # cursor 翻页一次只有一页在途
+    assert pages.max_in_flight == 1
+
+
+def test_cursor_pages_prefetch_overlaps_consumer():
+    pages = FakePages(0.05)
+    start = time.perf_counter()
+    for _ in iter_cursor_pages(pages.fetch, parse_cursor, prefetch=1):
+        # 调用方处理当前页时下一页已经发出
+        time.sleep(0.05)
+    assert time.perf_counter() - start < 0.05 * TOTAL_PAGES * 2 * 0.8
+
+
+def test_cursor_pages_resume():
+    pages = FakePages()
+    assert collect(iter_cursor_pages(pages.fetch, parse_cursor, cursor='4')) == EXPECTED[30:]
+    assert collect(iter_cursor_pages(pages.fetch, parse_cursor, require_num=15, prefetch=1)) == EXPECTED[:20]
+
+
+def test_async_pages():
+    async def run():
+        numbered = FakePages()
+        numbered_items = [item async for items, _ in async_iter_numbered_pages(numbered.async_fetch, parse_numbered, prefetch=2) for item in items]
+        cursor = FakePages(fail_page=4)
+        cursor_items = []
+        with pytest.raises(Exception, match='第 4 页失败'):
+            async for items, _ in async_iter_cursor_pages(cursor.async_fetch, parse_cursor, prefetch=1):
+                cursor_items.extend(items)
+        return numbered, numbered_items, cursor_items
+
+    numbered, numbered_items, cursor_items = asyncio.run(run())
+    assert numbered_items == EXPECTED
+    assert numbered.max_in_flight == 3
+    assert cursor_items == EXPECTED[:30]
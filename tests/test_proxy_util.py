@@ -0,0 +1,112 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from xhs_utils.http_util import SessionPool
+from xhs_utils.proxy_util import ProxyPool, resolve_proxies
+
+TARGET = 'http://edith.test/api'
+
+
+class ProxyHandler(http.server.BaseHTTPRequestHandler):
+    # 本地代理替身, server.mode 为 ok 返回 200, block 返回 461, hang 不响应
+    def do_GET(self):
+        mode = self.server.mode
+        if mode == 'hang':
+            time.sleep(1)
+            return
+        status = 200 if mode == 'ok' else 461
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def proxy_servers():
+    servers = {}
+    for mode in ('ok', 'block', 'hang'):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+        server.daemon_threads = True
+        server.mode = mode
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[mode] = server
+    yield servers
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+def proxy_url(server):
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def send(pool: ProxyPool, session_pool: SessionPool):
+    # 和 XHS_Apis._send 一样: 选代理、请求、上报结果
+    state = pool.acquire()
+    start = time.perf_counter()
+    try:
+        response = session_pool.request('GET', TARGET, proxies=state.proxies, timeout=0.3)
+    except Exception:
+        pool.release(state, False)
+        return state, None
+    pool.release(state, True, time.perf_counter() - start, response.status_code)
+    return state, response.status_code
+
+
+def test_selection_quarantine_and_recovery(proxy_servers):
+    ok, block, hang = (proxy_url(proxy_servers[mode]) for mode in ('ok', 'block', 'hang'))
+    pool = ProxyPool([block, hang, ok], base_cooldown=0.5, max_cooldown=10)
+    session_pool = SessionPool()
+
+    picks = {}
+    for _ in range(20):
+        state, status = send(pool, session_pool)
+        picks[state.name] = picks.get(state.name, 0) + 1
+    # 每个代理都试过一次, 之后只选健康的代理
+    assert picks[block] == 1 and picks[hang] == 1
+    assert picks[ok] == 18
+    states = {state.name: state for state in pool.states}
+    now = time.monotonic()
+    assert states[block].cooldown_until > now and states[block].recent_blocks(300) == 1
+    assert states[hang].cooldown_until > now and states[hang].failures == 1
+    assert states[ok].successes == 18 and states[ok].cooldown_until == 0.0
+    assert resolve_proxies(pool) == states[ok].proxies
+
+    # 隔离结束后再试, 仍然失败时隔离时间翻倍
+    proxy_servers['ok'].mode = 'block'
+    time.sleep(0.6)
+    for _ in range(3):
+        send(pool, session_pool)
+    assert states[hang].consecutive_failures == 2
+    assert states[hang].cooldown_until - time.monotonic() > 0.5
+
+    # 全部被隔离时选最快解除隔离的
+    assert all(state.cooldown_until > time.monotonic() for state in pool.states)
+    earliest = min(pool.states, key=lambda s: s.cooldown_until)
+    state = pool.acquire()
+    assert state is earliest
+    pool.release(state, True, 0.01, 200)
+
+    # 代理恢复后重新被选中, 成功一次就解除隔离
+    proxy_servers['hang'].mode = 'ok'
+    time.sleep(1.1)
+    for _ in range(5):
+        send(pool, session_pool)
+    assert states[hang].successes >= 1
+    assert states[hang].consecutive_failures == 0 and states[hang].cooldown_until == 0.0
+    session_pool.close()
+
+
+def test_in_flight_spreads_load():
+    pool = ProxyPool(['http://127.0.0.1:1', 'http://127.0.0.1:2'])
+    for state in pool.states:
+        pool.release(pool.acquire(), True, 0.1, 200)
+    held = [pool.acquire() for _ in range(2)]
+    assert {state.name for state in held} == {'http://127.0.0.1:1', 'http://127.0.0.1:2'}
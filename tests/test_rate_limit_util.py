@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from xhs_utils.rate_limit_util import RateLimiter, TokenBucket
+
+
+def test_zero_rate_is_unlimited():
+    bucket = TokenBucket(0, 1)
+    start = time.monotonic()
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert time.monotonic() - start < 0.1
+    assert bucket.stats()['count'] == 5
+    limiter = RateLimiter({'search': (0, 1)})
+    assert limiter.acquire('a1', '/api/sns/web/v1/search/notes') == 0.0
+    assert limiter.acquire('a1', '/api/sns/web/v1/search/notes') == 0.0
+
+
+def test_bucket_waits_after_burst():
+    bucket = TokenBucket(10, 2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.05 < waits[2] <= 0.1 < waits[3] <= 0.2
+
+
+def test_request_count_per_account():
+    limiter = RateLimiter({'search': (0, 1)})
+    for _ in range(3):
+        limiter.acquire('a', '/api/sns/web/v1/search/notes')
+    # 不限速的类别也计入
+    limiter.acquire('a', '/api/sns/web/v1/feed')
+    asyncio.run(limiter.async_acquire('b', '/api/sns/web/v1/feed'))
+    assert limiter.get_request_count('a') == 4
+    assert limiter.get_request_count('b') == 1
+    assert limiter.get_request_count('c') == 0
@@ -0,0 +1,41 @@
+import errno
+
+import aiohttp
+import requests
+
+from xhs_utils.retry_util import CLIENT_ERROR, NETWORK, THROTTLED, RetryPolicy, classify_exception
+
+
+def test_classify_exception():
+    for e in [ConnectionResetError(), TimeoutError(), requests.exceptions.ConnectionError(), requests.exceptions.ProxyError(),
+              requests.exceptions.ReadTimeout(), aiohttp.ClientConnectionError(), aiohttp.ServerDisconnectedError()]:
+        assert classify_exception(e) == NETWORK, e
+    for e in [FileNotFoundError('node'), PermissionError(), OSError(errno.ENOSPC, 'No space left on device'),
+              requests.exceptions.InvalidURL(), ValueError()]:
+        assert classify_exception(e) == CLIENT_ERROR, e
+
+
+def test_os_errors_fail_fast():
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise FileNotFoundError('node')
+
+    policy = RetryPolicy(max_retries=3, base_delay=0, max_delay=0)
+    try:
+        policy.call(func)
+    except FileNotFoundError:
+        pass
+    assert len(calls) == 1
+
+
+def test_retry_after_is_honoured():
+    policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=30)
+    assert policy.get_delay(0, 120) == 120
+    assert 1 <= policy.get_delay(0) <= 2
+    assert policy.backoff(THROTTLED, 0, retry_after=120) == 120
+    # 超过 max_retry_after 时不等待, 直接失败
+    policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=30, max_retry_after=60)
+    assert policy.backoff(THROTTLED, 0, retry_after=120) is None
+    assert policy.backoff(THROTTLED, 0, retry_after=10) >= 10
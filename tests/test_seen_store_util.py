@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from xhs_utils.seen_store_util import BloomSeenStore, SeenStore, SeenStoreLockedError
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_generation_error_rate(tmp_path):
+    store = BloomSeenStore(str(tmp_path / 'seen'), capacity=1000, error_rate=0.01, horizon=3600, generations=4)
+    store.add('note', 'a')
+    bloom = store.get_filter('note', store.get_generation())
+    # 查询会查 5 代, 每代的误判率加起来不超过 error_rate
+    assert sum(f.error_rate for f in bloom.filters) <= 0.01 / 5
+    store.close()
+
+    store = BloomSeenStore(str(tmp_path / 'plain'), capacity=1000, error_rate=0.01)
+    store.add('note', 'a')
+    assert sum(f.error_rate for f in store.get_filter('note').filters) <= 0.01
+    assert store.get_filter('note').error_rate == 0.01
+    store.close()
+
+
+def test_false_positive_rate_across_generations(tmp_path, monkeypatch):
+    store = BloomSeenStore(str(tmp_path / 'seen'), capacity=2000, error_rate=0.05, horizon=5, generations=4)
+    now = [0.0]
+    monkeypatch.setattr('xhs_utils.seen_store_util.time.time', lambda: now[0])
+    for generation in range(5):
+        now[0] = generation + 0.5
+        for i in range(2000):
+            store.add('note', f'{generation}-{i}')
+    false_positives = sum(store.contains('note', f'other-{i}') for i in range(20000))
+    assert false_positives / 20000 <= 0.05
+    store.close()
+
+
+def test_single_writer(tmp_path):
+    path = str(tmp_path / 'seen')
+    writer = BloomSeenStore(path)
+    writer.add('note', 'a')
+    writer.flush()
+    # 另一个进程以写入方式打开会失败, 只读打开可以查询
+    code = f'''
+from xhs_utils.seen_store_util import BloomSeenStore, SeenStore, SeenStoreLockedError
+try:
+    BloomSeenStore({path!r})
+except SeenStoreLockedError:
+    reader = BloomSeenStore({path!r}, readonly=True)
+    print(reader.contains('note', 'a'))
+'''
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, timeout=30)
+    assert result.stdout.strip() == 'True', result.stderr
+    with pytest.raises(SeenStoreLockedError):
+        BloomSeenStore(path)
+    writer.close()
+    writer = BloomSeenStore(path)
+    assert writer.contains('note', 'a')
+    writer.close()
+
+
+def test_sqlite_add_and_contains(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    store = SeenStore(path, batch_size=10)
+    assert store.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    store.add('note', 'a')
+    # 没有提交的记录也能查到
+    assert store.contains('note', 'a')
+    assert not store.contains('hash', 'a')
+    assert store.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0] == 0
+    store.flush()
+    assert store.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0] == 1
+    # 攒够 batch_size 条自动提交
+    for i in range(10):
+        store.add('hash', str(i))
+    assert store.pending == {}
+    assert store.count('hash') == 10
+    assert store.count() == 11
+    store.close()
+    store = SeenStore(path)
+    assert store.contains('note', 'a')
+    store.close()
+
+
+def test_sqlite_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    SeenStore(path).close()
+    code = f'''
+import sys
+from xhs_utils.seen_store_util import SeenStore
+store = SeenStore({path!r}, batch_size=7)
+for i in range(200):
+    store.add('note', f'{{sys.argv[1]}}-{{i}}')
+    store.add('note', f'shared-{{i}}')
+store.close()
+'''
+    processes = [subprocess.Popen([sys.executable, '-c', code, str(n)], cwd=ROOT_DIR, stderr=subprocess.PIPE, text=True) for n in range(3)]
+    for process in processes:
+        assert process.wait(timeout=60) == 0, process.stderr.read()
+    store = SeenStore(path)
+    assert store.count('note') == 3 * 200 + 200
+    store.close()
+
+
+def test_sqlite_horizon_and_compaction(tmp_path, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr('xhs_utils.seen_store_util.time.time', lambda: now[0])
+    path = str(tmp_path / 'seen.db')
+    store = SeenStore(path, horizon=100)
+    store.add('note', 'old')
+    store.add('note', 'again')
+    store.flush()
+    now[0] += 60
+    # 再次看到时只刷新最近一次看到的时间
+    store.add('note', 'again')
+    store.add('note', 'new')
+    store.flush()
+    now[0] += 60
+    assert not store.contains('note', 'old')
+    assert store.contains('note', 'again')
+    assert store.count('note') == 2
+    assert store.compact() == 1
+    first_seen, last_seen = store.conn.execute("SELECT first_seen, last_seen FROM seen WHERE key = 'again'").fetchone()
+    assert (first_seen, last_seen) == (1000000.0, 1000060.0)
+    store.close()
+
+
+def test_sqlite_compaction_claimed_once(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    store = SeenStore(path, horizon=100, compact_interval=3600)
+    other = SeenStore(path, horizon=100, compact_interval=3600)
+    assert store.claim_compaction()
+    # 其它进程在间隔内拿不到
+    assert not other.claim_compaction()
+    store.close()
+    other.close()
+
+
+def test_sqlite_upgrades_table_without_last_seen(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE seen (kind TEXT NOT NULL, key TEXT NOT NULL, first_seen REAL NOT NULL, PRIMARY KEY (kind, key))')
+    conn.execute("INSERT INTO seen VALUES ('note', 'a', 123)")
+    conn.commit()
+    conn.close()
+    store = SeenStore(path)
+    assert store.conn.execute("SELECT last_seen FROM seen WHERE key = 'a'").fetchone()[0] == 123
+    assert store.contains('note', 'a')
+    store.close()
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'bloom'])
+def test_migrated_records_survive_horizon(tmp_path, backend):
+    json_path = str(tmp_path / 'xhs_seen_notes.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'seen_ids': ['h1', 'h2'], 'seen_note_ids': ['n1'], 'last_update': '2025-09-15 17:23:25'}, f)
+    horizon = 30 * 24 * 3600
+    if backend == 'sqlite':
+        store = SeenStore(str(tmp_path / 'seen.db'), horizon=horizon)
+    else:
+        store = BloomSeenStore(str(tmp_path / 'seen'), horizon=horizon)
+    assert store.migrate_json(json_path, {'seen_ids': 'hash', 'seen_note_ids': 'note'}) == 3
+    assert os.path.exists(json_path + '.migrated')
+    if backend == 'sqlite':
+        # 首次时间保留文件的 last_update, 从导入时开始计算过期
+        assert store.compact() == 0
+        first_seen = store.conn.execute("SELECT first_seen FROM seen WHERE key = 'h1'").fetchone()[0]
+        assert first_seen == time.mktime(time.strptime('2025-09-15 17:23:25', '%Y-%m-%d %H:%M:%S'))
+    else:
+        store.compact()
+    assert store.contains('hash', 'h1') and store.contains('hash', 'h2') and store.contains('note', 'n1')
+    assert store.count('hash') == 2
+    # 已经导入过的不会再导入
+    assert store.migrate_json(json_path, {'seen_ids': 'hash'}) == 0
+    store.close()
@@ -0,0 +1,72 @@
+import importlib.util
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_sign_bench():
+    spec = importlib.util.spec_from_file_location('sign_bench', os.path.join(ROOT_DIR, 'benchmarks', 'sign_bench.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+sign_bench = load_sign_bench()
+
+
+class FakePool():
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    def call(self, fn, api, data, a1, key=None):
+        self.calls.append((fn, api, a1, key))
+        return {'xs': 'xs', 'xt': 1, 'xs_common': 'common'}
+
+    def stats(self):
+        return [{'pid': None}]
+
+    def close(self):
+        self.closed = True
+
+
+def test_percentiles():
+    result = sign_bench.percentiles([0.001 * i for i in range(1, 101)])
+    assert result['p50_ms'] == 51.0 and result['p99_ms'] == 100.0 and result['max_ms'] == 100.0
+    assert sign_bench.percentiles([]) == {}
+
+
+def test_a1_list():
+    a1_list = sign_bench.get_a1_list(4)
+    assert a1_list[0] == sign_bench.a1
+    assert len(set(a1_list)) == 4 and all(len(a1) == len(sign_bench.a1) for a1 in a1_list)
+
+
+def test_pool_bench_routes_by_a1():
+    pool = FakePool()
+    a1_list = sign_bench.get_a1_list(3)
+    result = sign_bench.bench_impl('pool', lambda: pool, 2, 2, a1_list, sign=sign_bench.sign_pool)
+    assert 'error' not in result
+    assert result['signs'] == 2 * len(sign_bench.cases)
+    assert result['accounts'] == 3
+    # 预热一次加上每次签名, 都按 a1 路由
+    assert len(pool.calls) == result['signs'] + 1
+    assert all(a1 == key for _, _, a1, key in pool.calls)
+    assert {a1 for _, _, a1, _ in pool.calls} == set(a1_list)
+    assert pool.closed
+
+
+def test_request_params_bench(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(sign_bench.xhs_util, 'js', pool)
+    result = sign_bench.bench_impl('generate_request_params', lambda: sign_bench.xhs_util.js, 1, 1, ['a1_x'], sign=sign_bench.sign_request_params)
+    assert 'error' not in result
+    assert all(key == 'a1_x' for _, _, _, key in pool.calls)
+
+
+def test_bench_error_is_reported():
+    def make_ctx():
+        raise RuntimeError('node 没有安装')
+
+    result = sign_bench.bench_impl('daemon', make_ctx, 1, 1, ['a1'])
+    assert result['error'] == 'node 没有安装'
@@ -0,0 +1,62 @@
+from xhs_utils import xhs_util
+from xhs_utils.sign_cache_util import SignCache
+
+
+def test_hit_within_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('xhs_utils.sign_cache_util.time.monotonic', lambda: now[0])
+    cache = SignCache(ttl=30)
+    signs = []
+
+    def sign():
+        signs.append(1)
+        return len(signs)
+
+    assert cache.get_or_sign('a1', '/api', {'k': 'v'}, sign) == 1
+    now[0] += 29
+    assert cache.get_or_sign('a1', '/api', '{"k":"v"}', sign) == 1
+    # 过期后重新签名
+    now[0] += 2
+    assert cache.get_or_sign('a1', '/api', {'k': 'v'}, sign) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_key_keeps_field_order_and_account():
+    assert SignCache.make_key('a1', '/api', {'a': 1, 'b': 2}) != SignCache.make_key('a1', '/api', {'b': 2, 'a': 1})
+    assert SignCache.make_key('a1', '/api', '') == SignCache.make_key('a1', '/api', None)
+    cache = SignCache()
+    assert cache.get_or_sign('a', '/api', '', lambda: 'sign_a') == 'sign_a'
+    assert cache.get_or_sign('b', '/api', '', lambda: 'sign_b') == 'sign_b'
+
+
+def test_lru_eviction():
+    cache = SignCache(max_size=2)
+    cache.get_or_sign('a1', '/1', '', lambda: 1)
+    cache.get_or_sign('a1', '/2', '', lambda: 2)
+    cache.get_or_sign('a1', '/1', '', lambda: 'new')
+    cache.get_or_sign('a1', '/3', '', lambda: 3)
+    # /2 最久没用, 被淘汰
+    assert cache.get_or_sign('a1', '/1', '', lambda: 'new') == 1
+    assert cache.get_or_sign('a1', '/2', '', lambda: 'new') == 'new'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_xhs_util_uses_cache(monkeypatch):
+    calls = []
+
+    class FakePool():
+        def call(self, fn, api, data, a1, key=None):
+            calls.append(api)
+            return {'xs': f'xs{len(calls)}', 'xt': 1, 'xs_common': 'common'}
+
+    monkeypatch.setattr(xhs_util, 'js', FakePool())
+    try:
+        xhs_util.enable_sign_cache(ttl=30)
+        assert xhs_util.generate_xs_xs_common('a1', '/api', '')[0] == 'xs1'
+        assert xhs_util.generate_xs_xs_common('a1', '/api', '')[0] == 'xs1'
+        assert xhs_util.get_sign_cache_stats()['hits'] == 1
+    finally:
+        xhs_util.disable_sign_cache()
+    # 默认关闭, 每次都签名
+    assert xhs_util.generate_xs_xs_common('a1', '/api', '')[0] == 'xs2'
+    assert xhs_util.get_sign_cache_stats() is None
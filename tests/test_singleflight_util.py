@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.retry_util import AUTH_EXPIRED, RetryPolicy, XhsApiError
+from xhs_utils.singleflight_util import SingleFlight, make_request_key
+
+
+def run_concurrently(single_flight, key, funcs, **kwargs):
+    """
+        第一个 func 领头, 其它调用在它返回前加入, 返回每个调用的结果或异常
+    """
+    results = [None] * len(funcs)
+    started = threading.Event()
+
+    def leader_func():
+        started.set()
+        time.sleep(0.1)
+        return funcs[0]()
+
+    def run(index, func):
+        try:
+            results[index] = single_flight.do(key, func, **kwargs)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(0, leader_func))]
+    threads[0].start()
+    started.wait()
+    threads += [threading.Thread(target=run, args=(i, func)) for i, func in enumerate(funcs[1:], 1)]
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_result():
+    single_flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        return {'data': []}
+
+    results = run_concurrently(single_flight, 'key', [func] * 4)
+    assert len(calls) == 1
+    assert all(result == {'data': []} for result in results)
+    # 每个调用方拿到自己的拷贝
+    results[1]['data'].append(1)
+    assert results[2] == {'data': []}
+    assert single_flight.stats()['shared'] == 3
+
+
+def test_reusable_result_within_ttl():
+    single_flight = SingleFlight(ttl=60)
+    assert single_flight.do('key', lambda: {'success': True}, reusable=True) == {'success': True}
+    assert single_flight.do('key', lambda: {'success': 'new'}, reusable=True) == {'success': True}
+    # 失败的结果不保留
+    is_success = lambda res_json: res_json['success']
+    assert single_flight.do('other', lambda: {'success': False}, True, is_success) == {'success': False}
+    assert single_flight.do('other', lambda: {'success': True}, True, is_success) == {'success': True}
+
+
+def test_same_account_shares_error_copies():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise XhsApiError(AUTH_EXPIRED, '登录已过期', 200)
+
+    results = run_concurrently(single_flight, 'key', [fail] * 3)
+    assert all(isinstance(result, XhsApiError) and result.kind == AUTH_EXPIRED and result.status_code == 200 for result in results)
+    assert str(results[1]) == '登录已过期'
+    assert len({id(result) for result in results}) == 3
+
+
+def test_shared_key_does_not_share_errors():
+    single_flight = SingleFlight()
+
+    def expired():
+        raise XhsApiError(AUTH_EXPIRED, '登录已过期')
+
+    results = run_concurrently(single_flight, 'key', [expired, lambda: 'b', lambda: 'c'], share_errors=False)
+    assert isinstance(results[0], XhsApiError)
+    # 其它账号用自己的请求, 不会拿到领头账号的登录失效
+    assert results[1:] == ['b', 'c']
+
+
+def test_feed_failure_does_not_reach_other_accounts(monkeypatch):
+    apis = XHS_Apis(retry_policy=RetryPolicy(0))
+    started = threading.Event()
+
+    def send(method, api, cookies_str, data='', proxies=None):
+        if 'expired' in cookies_str:
+            started.set()
+            time.sleep(0.1)
+            raise XhsApiError(AUTH_EXPIRED, '登录已过期')
+        return {'success': True, 'msg': '成功', 'data': {'items': [cookies_str]}}
+
+    monkeypatch.setattr(apis, '_send', send)
+    data = {'source_note_id': 'n1'}
+    assert make_request_key('POST', '/api/sns/web/v1/feed', data, 'a')[-1] == 'n1'
+    results = {}
+
+    def request(cookies_str):
+        try:
+            results[cookies_str] = apis._request('POST', '/api/sns/web/v1/feed', cookies_str, data)
+        except XhsApiError as e:
+            results[cookies_str] = e
+
+    leader = threading.Thread(target=request, args=('a1=expired', ))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=request, args=('a1=healthy', ))
+    follower.start()
+    leader.join()
+    follower.join()
+    assert results['a1=expired'].kind == AUTH_EXPIRED
+    assert results['a1=healthy']['data']['items'] == ['a1=healthy']
@@ -0,0 +1,115 @@
+import shutil
+import threading
+import time
+
+import pytest
+
+from xhs_utils.traceid_util import TraceIdPool, XrayTraceIdGenerator, check_xray_traceid_parity
+from xhs_utils.xhs_util import generate_x_b3_traceid, generate_x_b3_traceids
+
+SAMPLES = 5000
+
+
+def make_batch(calls):
+    lock = threading.Lock()
+
+    def generate_batch(num):
+        with lock:
+            calls.append(num)
+            start = sum(calls[:-1])
+        return [f'{i:032x}' for i in range(start, start + num)]
+
+    return generate_batch
+
+
+def test_pool_refills_in_batches():
+    calls = []
+    pool = TraceIdPool(make_batch(calls), batch_size=10, low_water=3)
+    ids = [pool.get() for _ in range(25)]
+    # 不重复, 按批生成
+    assert len(set(ids)) == 25
+    deadline = time.monotonic() + 2
+    while pool.refilling and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert all(num == 10 for num in calls)
+    assert len(calls) <= 4
+    stats = pool.stats()
+    assert stats['refill_count'] == len(calls)
+    assert stats['empty_count'] >= 1
+
+
+def test_pool_refills_before_empty():
+    calls = []
+    pool = TraceIdPool(make_batch(calls), batch_size=10, low_water=5)
+    pool.get()
+    for _ in range(5):
+        pool.get()
+    # 低于水位后后台补充, 之后不用同步等待
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 2
+    assert pool.stats()['size'] == 14
+
+
+def test_pool_refill_failure():
+    def generate_batch(num):
+        raise RuntimeError('js 进程启动失败')
+
+    pool = TraceIdPool(generate_batch)
+    with pytest.raises(RuntimeError):
+        pool.get()
+
+
+@pytest.fixture(scope='module')
+def xray_js():
+    if shutil.which('node') is None:
+        pytest.skip('没有安装 node')
+    from xhs_utils.js_util import compile_js
+    ctx = compile_js('xhs_xray.js')
+    yield ctx
+    ctx.close()
+
+
+def test_xray_batch_parity(xray_js):
+    js_ids = xray_js.call('traceIds', SAMPLES)
+    native_ids = XrayTraceIdGenerator().generate_batch(SAMPLES)
+    assert check_xray_traceid_parity(js_ids, native_ids) == []
+
+
+def test_xray_same_timestamp_and_seq(xray_js):
+    # 时间戳和序号相同时, 前 16 位和 js 的 Int.seq 完全一致
+    timestamp = int(time.time() * 1000)
+    js_ids = [xray_js.call('traceId', timestamp) for _ in range(2000)]
+    generator = XrayTraceIdGenerator()
+    generator.seq = int(js_ids[0][:16], 16) & XrayTraceIdGenerator.MAX_SEQ
+    native_ids = [generator.generate(timestamp) for _ in range(2000)]
+    assert [trace_id[:16] for trace_id in native_ids] == [trace_id[:16] for trace_id in js_ids]
+    assert all(len(trace_id) == 32 for trace_id in native_ids + js_ids)
+
+
+def test_xray_seq_wraparound():
+    generator = XrayTraceIdGenerator()
+    generator.seq = XrayTraceIdGenerator.MAX_SEQ - 1
+    ids = generator.generate_batch(4)
+    seqs = [int(trace_id[:16], 16) & XrayTraceIdGenerator.MAX_SEQ for trace_id in ids]
+    assert seqs == [XrayTraceIdGenerator.MAX_SEQ - 1, XrayTraceIdGenerator.MAX_SEQ, 0, 1]
+    assert check_xray_traceid_parity(ids, ids) == []
+
+
+def test_xray_timestamp():
+    ids = XrayTraceIdGenerator().generate_batch(10)
+    assert len({int(trace_id[:16], 16) >> 23 for trace_id in ids}) == 1
+    assert check_xray_traceid_parity(['xyz'], ids)
+
+
+def test_b3_traceids():
+    ids = generate_x_b3_traceids(SAMPLES)
+    assert len(ids) == SAMPLES
+    assert all(len(trace_id) == 16 and int(trace_id, 16) >= 0 for trace_id in ids)
+    assert len(set(ids)) == SAMPLES
+    assert [len(trace_id) for trace_id in generate_x_b3_traceids(3, 32)] == [32, 32, 32]
+    assert generate_x_b3_traceids(0) == []
+    assert generate_x_b3_traceids(2, 0) == ['', '']
+    assert len(generate_x_b3_traceid()) == 16
+    assert generate_x_b3_traceid(0) == ''
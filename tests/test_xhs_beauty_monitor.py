@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import xhs_beauty_monitor
+from main import Data_Spider
+from xhs_beauty_monitor import XHSMonitor
+from xhs_utils.account_util import AccountPool
+from xhs_utils.rate_limit_util import RateLimiter
+from xhs_utils.seen_store_util import SeenStore
+
+
+def make_monitor():
+    # 不加载已看记录和爬虫, 只测意图分析
+    return XHSMonitor.__new__(XHSMonitor)
+
+
+def test_batch_payload():
+    monitor = make_monitor()
+    single = monitor.create_payload('content')
+    batch = monitor.create_payload('content', 10)
+    assert '只输出以下两种结果之一' in single['messages'][0]['content']
+    assert '只输出以下两种结果之一' not in batch['messages'][0]['content']
+    assert 'JSON 数组' in batch['messages'][0]['content']
+    assert batch['model'] == xhs_beauty_monitor.DEEPSEEK_BATCH_MODEL
+    assert batch['max_tokens'] > single['max_tokens'] * 10
+
+
+def test_parse_batch_answer():
+    monitor = make_monitor()
+    answer = '```json\n[{"note_id": "a", "answer": "YES"}, {"note_id": "b", "answer": "no"}, {"note_id": "c", "answer": "MAYBE"}, {"note_id": "x", "answer": "YES"}, "bad"]\n```'
+    assert monitor.parse_batch_answer(answer, {'a', 'b', 'c'}) == {'a': True, 'b': False}
+    assert monitor.parse_batch_answer('YES', {'a'}) == {}
+    assert monitor.parse_batch_answer('[not json]', {'a'}) == {}
+    assert monitor.parse_batch_answer('[{"note_id": "a", "answer": "YES"}', {'a'}) == {}
+
+
+def test_missing_answers_fall_back_to_single(monkeypatch):
+    monkeypatch.setattr(xhs_beauty_monitor, 'DEEPSEEK_API_KEY', 'key')
+    monitor = make_monitor()
+    payloads = []
+    single = []
+
+    def request_deepseek(data, timeout=10):
+        payloads.append(data)
+        return '[{"note_id": "a", "answer": "NO"}, {"note_id": "b", "answer": "YES"}]'
+
+    def analyze_note_intent(note_data):
+        single.append(note_data['note_id'])
+        return False
+
+    monkeypatch.setattr(monitor, 'request_deepseek', request_deepseek)
+    monkeypatch.setattr(monitor, 'analyze_note_intent', analyze_note_intent)
+    notes = [{'note_id': note_id, 'title': note_id} for note_id in ('a', 'b', 'c')]
+    assert monitor.analyze_notes_intent(notes, 3) == [False, True, False]
+    assert len(payloads) == 1
+    assert single == ['c']
+
+
+def test_failed_batch_passes_notes(monkeypatch):
+    monkeypatch.setattr(xhs_beauty_monitor, 'DEEPSEEK_API_KEY', 'key')
+    monitor = make_monitor()
+    monkeypatch.setattr(monitor, 'request_deepseek', lambda data, timeout=10: None)
+    assert monitor.analyze_notes_intent([{'note_id': 'a'}, {'note_id': 'b'}], 2) == [True, True]
+
+
+def make_prefilter_monitor(tmp_path):
+    monitor = make_monitor()
+    monitor.seen_store = SeenStore(str(tmp_path / 'seen.db'))
+    monitor.run_note_ids = set()
+    return monitor
+
+
+def test_should_skip_note(tmp_path):
+    monitor = make_prefilter_monitor(tmp_path)
+    monitor.mark_note_as_seen({'note_id': 'old', 'title': 't'})
+    assert monitor.should_skip_note('old')
+    assert not monitor.should_skip_note('new')
+    # 本次运行已经在获取的不再获取
+    assert monitor.should_skip_note('new')
+    # 没获取成功的放回去, 之后还可以获取
+    monitor.release_note_ids(['new'], [])
+    assert not monitor.should_skip_note('new')
+    monitor.release_note_ids(['new'], [{'note_id': 'new'}])
+    assert monitor.should_skip_note('new')
+    monitor.seen_store.close()
+
+
+def test_search_prefilters_notes_across_keywords(tmp_path):
+    monitor = make_prefilter_monitor(tmp_path)
+    monitor.mark_note_as_seen({'note_id': 'old', 'title': 't'})
+    monitor.account_pool = AccountPool(['a1=x'])
+    results = {
+        'k1': ['old', 'a', 'b', 'failed'],
+        'k2': ['a', 'failed', 'c'],
+    }
+    fetched = []
+
+    class FakeSpider():
+        xhs_apis = SimpleNamespace(rate_limiter=RateLimiter({}))
+
+        def spider_some_search_note(self, query, require_num, cookies_str, skip_note=None, **kwargs):
+            notes = [{'id': note_id, 'model_type': 'note'} for note_id in results[query]]
+            notes, _ = Data_Spider.filter_note_cards(notes, skip_note)
+            fetched.extend(note['id'] for note in notes)
+            # 第一次获取 failed 的详细失败
+            note_data_list = [{'note_id': note['id']} for note in notes if note['id'] != 'failed' or query == 'k2']
+            return note_data_list, True, 'success'
+
+    monitor.data_spider = FakeSpider()
+    success, msg, notes = monitor.search_and_get_notes(['k1', 'k2'], 4)
+    assert success
+    assert fetched == ['a', 'b', 'failed', 'failed', 'c']
+    assert [note['note_id'] for note in notes] == ['a', 'b', 'failed', 'c']
+    monitor.seen_store.close()
@@ -0,0 +1,144 @@
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.retry_util import AUTH_EXPIRED, XhsApiError
+
+URL = 'https://www.xiaohongshu.com/explore/note?xsec_token=token'
+
+
+class FakeApis(XHS_Apis):
+    """
+        一级评论一页返回, 每条一级评论实际还有 sub_total 条二级评论
+    """
+    def __init__(self, comments, sub_total):
+        super().__init__()
+        self.comments = comments
+        self.sub_total = sub_total
+
+    def get_note_out_comment(self, note_id, cursor, xsec_token, cookies_str, proxies=None):
+        return True, 'success', {'data': {'cursor': '', 'has_more': False, 'comments': self.comments}}
+
+    def get_note_inner_comment(self, comment, cursor, xsec_token, cookies_str, proxies=None):
+        start = int(cursor or 0)
+        end = min(start + 10, self.sub_total)
+        items = [{'id': f"{comment['id']}-{i}"} for i in range(start, end)]
+        return True, 'success', {'data': {'cursor': str(end), 'has_more': end < self.sub_total, 'comments': items}}
+
+
+def make_comment(i, sub_comment_count):
+    return {'id': f'c{i}', 'sub_comment_has_more': True, 'sub_comment_cursor': '0', 'sub_comments': [], 'sub_comment_count': sub_comment_count}
+
+
+def test_malformed_sub_comment_count():
+    comments = [make_comment(0, None), make_comment(1, 'abc'), make_comment(2, '5')]
+    for max_workers in (1, 4):
+        for comment in comments:
+            comment['sub_comments'] = []
+        success, msg, result = FakeApis(comments, 5).get_note_all_comment(URL, 'a1=x', max_workers=max_workers, max_sub_comments=100)
+        assert success, msg
+        assert [len(comment['sub_comments']) for comment in result] == [5, 5, 5]
+
+
+def test_unused_budget_is_refunded():
+    # 评论声称有 50 条二级评论, 实际只有 3 条, 没用完的额度给后面的评论
+    for max_workers in (1, 4):
+        comments = [make_comment(i, '50') for i in range(4)]
+        success, msg, result = FakeApis(comments, 3).get_note_all_comment(URL, 'a1=x', max_workers=max_workers, max_sub_comments=60)
+        assert success, msg
+        assert [len(comment['sub_comments']) for comment in result] == [3, 3, 3, 3]
+
+
+def test_total_cap():
+    for max_workers in (1, 4):
+        comments = [make_comment(i, 'x') for i in range(4)]
+        success, msg, result = FakeApis(comments, 20).get_note_all_comment(URL, 'a1=x', max_workers=max_workers, max_sub_comments=30)
+        assert success, msg
+        assert sum(len(comment['sub_comments']) for comment in result) == 30
+
+
+def test_zero_per_comment_cap_skips_sub_comments():
+    for max_sub_comments in (10, None):
+        for max_workers in (1, 4):
+            comments = [make_comment(i, '5') for i in range(3)]
+            apis = FakeApis(comments, 5)
+            success, msg, result = apis.get_note_all_comment(URL, 'a1=x', max_workers=max_workers, max_sub_per_comment=0, max_sub_comments=max_sub_comments)
+            assert success, msg
+            assert [len(comment['sub_comments']) for comment in result] == [0, 0, 0]
+
+
+def test_per_comment_cap_without_total_cap():
+    comments = [make_comment(i, '20') for i in range(3)]
+    success, msg, result = FakeApis(comments, 20).get_note_all_comment(URL, 'a1=x', max_workers=4, max_sub_per_comment=5)
+    assert success, msg
+    assert [len(comment['sub_comments']) for comment in result] == [5, 5, 5]
+
+
+def test_zero_total_cap():
+    comments = [make_comment(i, '5') for i in range(3)]
+    success, msg, result = FakeApis(comments, 5).get_note_all_comment(URL, 'a1=x', max_workers=4, max_sub_comments=0)
+    assert success, msg
+    assert [len(comment['sub_comments']) for comment in result] == [0, 0, 0]
+
+
+class PagedApis(XHS_Apis):
+    """
+        假的 _request, 用户笔记/评论/消息按 cursor 翻 3 页, 搜索按页码翻 3 页
+    """
+    def __init__(self, fail_api=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_api = fail_api
+        self.requests = []
+
+    def _request(self, method, api, cookies_str, data='', proxies=None):
+        path = api.split('?')[0]
+        self.requests.append((path, data))
+        if path == self.fail_api:
+            raise XhsApiError(AUTH_EXPIRED, '登录已过期')
+        if path == '/api/sns/web/v1/search/notes':
+            page = data['page']
+            return {'success': True, 'msg': '成功', 'data': {'items': [f'search-{page}'], 'has_more': page < 3}}
+        page = int(api.split('cursor=')[1].split('&')[0] or 0)
+        key = {'/api/sns/web/v1/user_posted': 'notes', '/api/sns/web/v2/comment/page': 'comments'}.get(path, 'message_list')
+        return {'success': True, 'msg': '成功', 'data': {'cursor': str(page + 1), 'has_more': page < 2, key: [f'{path}-{page}']}}
+
+
+def test_iter_user_all_notes_resume():
+    apis = PagedApis()
+    user_url = 'https://www.xiaohongshu.com/user/profile/u1?xsec_token=t'
+    pages = list(apis.iter_user_all_notes(user_url, 'a1=x'))
+    assert pages == [(['/api/sns/web/v1/user_posted-0'], '1'), (['/api/sns/web/v1/user_posted-1'], '2'), (['/api/sns/web/v1/user_posted-2'], '3')]
+    # 传回 cursor 接着翻
+    assert list(apis.iter_user_all_notes(user_url, 'a1=x', cursor='2')) == pages[2:]
+    assert apis.get_user_all_notes(user_url, 'a1=x') == (True, 'success', [item for items, _ in pages for item in items])
+
+
+def test_iter_is_lazy():
+    apis = PagedApis(page_prefetch=0)
+    for comments, cursor in apis.iter_note_all_out_comment('n1', 't', 'a1=x'):
+        break
+    # 不预取时只请求了 yield 的那一页
+    assert len(apis.requests) == 1
+    assert comments == ['/api/sns/web/v2/comment/page-0']
+
+
+def test_iter_search_note_pages():
+    apis = PagedApis()
+    pages = list(apis.iter_search_note('关键词', 'a1=x'))
+    assert [items for items, _ in pages] == [['search-1'], ['search-2'], ['search-3']]
+    assert [items for items, _ in apis.iter_search_note('关键词', 'a1=x', page=pages[0][1])] == [['search-2'], ['search-3']]
+
+
+def test_iter_search_note_raises_typed_error():
+    apis = PagedApis(fail_api='/api/sns/web/v1/search/notes')
+    with pytest.raises(XhsApiError) as info:
+        list(apis.iter_search_note('关键词', 'a1=x'))
+    assert info.value.kind == AUTH_EXPIRED
+    success, msg, notes = apis.search_some_note('关键词', 10, 'a1=x')
+    assert not success and notes == []
+
+
+def test_iter_all_metions():
+    apis = PagedApis()
+    metions = [items for items, _ in apis.iter_all_metions('a1=x')]
+    assert metions == [[f'/api/sns/web/v1/you/mentions-{i}'] for i in range(3)]
+    assert apis.get_all_likesAndcollects('a1=x')[2] == [f'/api/sns/web/v1/you/likes-{i}' for i in range(3)]
@@ -11,6 +11,7 @@ new Env('小红书成都约妆监控');
 """
 
 import os
+import re
 import sys
 import json
 import time
@@ -29,7 +30,9 @@ sys.path.append(current_dir)
 
 try:
     from main import Data_Spider
-    from xhs_utils.common_util import init
+    from xhs_utils.common_util import init_account_pool
+    from xhs_utils.rate_limit_util import TokenBucket
+    from xhs_utils.seen_store_util import BloomSeenStore, SeenStore, SeenStoreLockedError
 except ImportError as e:
     print(f"导入模块失败: {e}")
     sys.exit(1)
@@ -41,7 +44,13 @@ SEARCH_KEYWORDS = os.getenv('XHS_BEAUTY_KEYWORDS', '').split(',')
 SEARCH_COUNT = int(os.getenv('XHS_BEAUTY_COUNT', '10'))  # 增加搜索数量
 BACKUP_KEYWORDS = os.getenv('XHS_BEAUTY_BACKUP_KEYWORDS', '').split(',')
 XHS_COOKIE = os.getenv('XHS_BEAUTY_COOKIE', os.getenv('XHS_BEAUTY_COOKIE', ''))  # 兼容COOKIES变量名
+# 多账号: XHS_BEAUTY_COOKIES 每行一个账号, 关键词分摊到各个账号
+ACCOUNT_STRATEGY = os.getenv('XHS_ACCOUNT_STRATEGY', 'round_robin')  # round_robin 或 least_loaded
+ACCOUNT_BUDGET = int(os.getenv('XHS_ACCOUNT_BUDGET', '0')) or None  # 每个账号每次运行最多搜索的关键词数
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', '')  # DeepSeek API密钥
+INTENT_BATCH_SIZE = int(os.getenv('XHS_INTENT_BATCH', '10'))  # 每次请求分析的笔记数, 1 为逐条分析
+# 批量分析用的模型, deepseek-reasoner 的思考过程也算在 max_tokens 里, 批量输出 JSON 用 deepseek-chat
+DEEPSEEK_BATCH_MODEL = os.getenv('DEEPSEEK_BATCH_MODEL', 'deepseek-chat')
 
 # 兼容旧版本单个关键词配置 - 只在没有设置新配置时使用
 if os.getenv('XHS_KEYWORD') and not os.getenv('XHS_KEYWORDS'):
@@ -53,39 +62,41 @@ SEEN_NOTES_FILE = os.getenv('XHS_SEEN_FILE', '/ql/data/scripts/xhs_seen_notes.js
 # 如果在非青龙环境中，使用当前目录
 if not os.path.exists(os.path.dirname(SEEN_NOTES_FILE)):
     SEEN_NOTES_FILE = os.path.join(current_dir, 'xhs_seen_notes.json')
+# 已看记录数据库, 旧的 json 记录第一次运行时导入
+SEEN_DB_FILE = os.getenv('XHS_SEEN_DB', os.path.splitext(SEEN_NOTES_FILE)[0] + '.db')
+# sqlite 或 bloom, bloom 占用小但有 XHS_SEEN_ERROR_RATE 的误判, 且只能一个进程写入
+SEEN_BACKEND = os.getenv('XHS_SEEN_BACKEND', 'sqlite')
+SEEN_ERROR_RATE = float(os.getenv('XHS_SEEN_ERROR_RATE', '0.001'))
+# 已看记录保留天数, 超过这么久没在搜索结果里出现的笔记会被清理, 0 为一直保留
+SEEN_HORIZON = float(os.getenv('XHS_SEEN_DAYS', '30')) * 24 * 3600 or None
 
 class XHSMonitor:
     def __init__(self):
-        self.seen_notes = self.load_seen_notes()
+        self.seen_store = self.load_seen_notes()
+        # 本次运行已经交给详细获取的 note_id, 跨关键词去重
+        self.run_note_ids = set()
         self.data_spider = Data_Spider()
+        self.account_pool = None
+        # DeepSeek 请求限速, 小红书接口的限速在 XHS_Apis 内部
+        self.deepseek_limiter = TokenBucket(float(os.getenv('DEEPSEEK_RATE', '1')), 1)  # DEEPSEEK_RATE=0 为不限速
 
     def load_seen_notes(self):
-        """加载已看过的笔记ID"""
+        """打开已看记录数据库, 有旧的 json 记录时先导入"""
+        if SEEN_BACKEND == 'bloom':
+            seen_store = BloomSeenStore(os.path.splitext(SEEN_DB_FILE)[0], error_rate=SEEN_ERROR_RATE, horizon=SEEN_HORIZON)
+        else:
+            seen_store = SeenStore(SEEN_DB_FILE, horizon=SEEN_HORIZON)
         try:
-            if os.path.exists(SEEN_NOTES_FILE):
-                with open(SEEN_NOTES_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return set(data.get('seen_ids', []))
-            return set()
+            seen_store.migrate_json(SEEN_NOTES_FILE, {'seen_ids': 'hash', 'seen_note_ids': 'note'})
         except Exception as e:
-            print(f"加载已看笔记记录失败: {e}")
-            return set()
+            print(f"导入已看笔记记录失败: {e}")
+        return seen_store
 
     def save_seen_notes(self):
-        """保存已看过的笔记ID"""
+        """提交还没有写入的已看记录"""
         try:
-            os.makedirs(os.path.dirname(SEEN_NOTES_FILE), exist_ok=True)
-
-            data = {
-                'seen_ids': list(self.seen_notes),
-                'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'total_count': len(self.seen_notes)
-            }
-
-            with open(SEEN_NOTES_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            print(f"已保存 {len(self.seen_notes)} 个笔记ID")
+            self.seen_store.flush()
+            print(f"已保存 {self.seen_store.count('hash')} 个笔记ID")
         except Exception as e:
             print(f"保存记录失败: {e}")
 
@@ -99,19 +110,40 @@ class XHSMonitor:
     def is_note_seen(self, note_data):
         """检查是否已看过"""
         note_id = self.generate_note_id(note_data)
-        return note_id in self.seen_notes
+        return self.seen_store.contains('hash', note_id)
 
 
 
     def mark_note_as_seen(self, note_data):
         """标记为已看过"""
         note_id = self.generate_note_id(note_data)
-        self.seen_notes.add(note_id)
+        self.seen_store.add('hash', note_id)
+        if note_data.get('note_id'):
+            self.seen_store.add('note', note_data['note_id'])
+
+    def should_skip_note(self, note_id):
+        """搜索结果预过滤: 已看过或本次运行已在获取的笔记不再获取详情"""
+        if note_id in self.run_note_ids:
+            return True
+        if self.seen_store.contains('note', note_id):
+            # 还在搜索结果里出现, 刷新时间, 不会过期
+            self.seen_store.add('note', note_id)
+            return True
+        self.run_note_ids.add(note_id)
+        return False
 
 
 
-    def create_payload(self, content):
-        system_prompt = """你是小红书内容分析专家，专为化妆师筛选潜在客户。你的任务是判断这个笔记是否是普通用户发布的、有化妆服务或化妆教学需求的帖子。
+    def release_note_ids(self, claimed, note_data_list):
+        """详情没有获取成功的笔记放回去, 换账号重试或其它关键词还可以获取"""
+        fetched = {note.get('note_id') for note in note_data_list}
+        for note_id in claimed:
+            if note_id not in fetched:
+                self.run_note_ids.discard(note_id)
+
+    def create_payload(self, content, batch_size=1):
+        """batch_size > 1 时换成批量的提示词, 要求按 note_id 输出 JSON 数组"""
+        criteria = """你是小红书内容分析专家，专为化妆师筛选潜在客户。你的任务是判断这个笔记是否是普通用户发布的、有化妆服务或化妆教学需求的帖子。
 ### 用户需求笔记特征 (回答 YES)
 只要满足以下任一类别，都属于潜在客户：
 1.  **服务需求**: 明确表示需要**找人化妆**。
@@ -128,15 +160,32 @@ class XHSMonitor:
 
 ### 分析要点
 - 核心是判断笔记发布者是在**寻求帮助（无论是服务还是学习）**，还是在**提供服务（广告或合作）**。
-- 作者昵称或简介中包含"化妆师"、"MUA"、"工作室"等关键词的，大概率是广告（回答NO）。
+- 作者昵称或简介中包含"化妆师"、"MUA"、"工作室"等关键词的，大概率是广告（回答NO）。"""
+
+        if batch_size > 1:
+            system_prompt = criteria + """
+
+---
+**本次会给出多条笔记，每条以 note_id 开头。逐条判断，只输出一个 JSON 数组，不要输出其它内容：**
+[{"note_id": "笔记的note_id", "answer": "YES"}, {"note_id": "笔记的note_id", "answer": "NO"}]
+数组必须包含每一条笔记，answer 只能是 YES 或 NO。"""
+            model = DEEPSEEK_BATCH_MODEL
+            # 每条约 30 个token, 留出余量
+            max_tokens = 50 * batch_size + 50
+            if model == "deepseek-reasoner":
+                max_tokens += 4000  # 给思考过程留的额度
+        else:
+            system_prompt = criteria + """
 
 ---
 **你的回答必须简洁，只输出以下两种结果之一：**
 - **YES** (是潜在客户，无论是服务还是教学需求)
 - **NO** (非潜在客户)"""
+            model = "deepseek-reasoner"
+            max_tokens = 10  # 对于YES/NO的回答，10个token足够了
 
         return {
-            "model": "deepseek-reasoner",
+            "model": model,
             "messages": [
                 {
                     "role": "system",
@@ -148,12 +197,40 @@ class XHSMonitor:
                 }
             ],
             "temperature": 0.1,  # 使用较低的温度让输出更稳定、更具确定性
-            "max_tokens": 10     # 对于YES/NO的回答，10个token足够了
+            "max_tokens": max_tokens
         }
 
 
 
 
+    def format_note_content(self, note_data):
+        """构建分析内容"""
+        title = note_data.get('title', '')
+        desc = note_data.get('desc', '')
+        nickname = note_data.get('nickname', '')
+        return f"标题: {title}\n作者: {nickname}\n内容: {desc}"
+
+    def request_deepseek(self, data, timeout=10):
+        """发送DeepSeek请求, 返回回答内容, 失败时返回 None"""
+        headers = {
+            'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
+            'Content-Type': 'application/json'
+        }
+
+        self.deepseek_limiter.acquire()
+        response = requests.post(
+            'https://api.deepseek.com/v1/chat/completions',
+            headers=headers,
+            json=data,
+            timeout=timeout
+        )
+
+        if response.status_code != 200:
+            print(f"DeepSeek API请求失败: {response.status_code}")
+            return None
+        result = response.json()
+        return result['choices'][0]['message']['content'].strip()
+
     def analyze_note_intent(self, note_data):
         """使用DeepSeek分析笔记意图"""
         if not DEEPSEEK_API_KEY:
@@ -161,43 +238,79 @@ class XHSMonitor:
             return True  # 如果没有配置API，默认通过
 
         try:
-            title = note_data.get('title', '')
-            desc = note_data.get('desc', '')
-            nickname = note_data.get('nickname', '')
-
-            # 构建分析内容
-            content = f"标题: {title}\n作者: {nickname}\n内容: {desc}"
-
-            # DeepSeek API请求
-            headers = {
-                'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
-                'Content-Type': 'application/json'
-            }
-
-            data = self.create_payload(content)
-
-            response = requests.post(
-                'https://api.deepseek.com/v1/chat/completions',
-                headers=headers,
-                json=data,
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                answer = result['choices'][0]['message']['content'].strip().upper()
-
-                is_user_demand = answer == 'YES'
-                print(f"AI分析结果: {answer} - {'用户需求' if is_user_demand else '化妆师广告'}")
-                return is_user_demand
-            else:
-                print(f"DeepSeek API请求失败: {response.status_code}")
+            answer = self.request_deepseek(self.create_payload(self.format_note_content(note_data)))
+            if answer is None:
                 return True  # API失败时默认通过
 
+            answer = answer.upper()
+            is_user_demand = answer == 'YES'
+            print(f"AI分析结果: {answer} - {'用户需求' if is_user_demand else '化妆师广告'}")
+            return is_user_demand
+
         except Exception as e:
             print(f"DeepSeek分析异常: {e}")
             return True  # 异常时默认通过
 
+    def parse_batch_answer(self, answer, note_ids):
+        """解析批量分析结果, 返回 {note_id: 是否用户需求}, 格式不对的条目不返回"""
+        # 去掉可能带的 ```json 代码块
+        match = re.search(r'\[.*\]', answer, re.S)
+        if match is None:
+            return {}
+        try:
+            items = json.loads(match.group())
+        except ValueError:
+            return {}
+        results = {}
+        if not isinstance(items, list):
+            return results
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            note_id = str(item.get('note_id', ''))
+            answer = str(item.get('answer', '')).strip().upper()
+            if note_id in note_ids and answer in ('YES', 'NO'):
+                results[note_id] = answer == 'YES'
+        return results
+
+    def analyze_notes_intent(self, note_data_list, batch_size=None):
+        """批量分析笔记意图, 每次请求分析 batch_size 条, 返回与 note_data_list 对应的结果列表
+        批量结果解析失败或缺少的笔记逐条分析"""
+        batch_size = batch_size or INTENT_BATCH_SIZE
+        if not DEEPSEEK_API_KEY or batch_size <= 1:
+            return [self.analyze_note_intent(note_data) for note_data in note_data_list]
+
+        results = []
+        for start in range(0, len(note_data_list), batch_size):
+            batch = note_data_list[start:start + batch_size]
+            if len(batch) == 1:
+                results.append(self.analyze_note_intent(batch[0]))
+                continue
+
+            # 没有 note_id 时用序号
+            note_ids = [str(note_data.get('note_id') or index) for index, note_data in enumerate(batch)]
+            content = "\n\n".join(f"note_id: {note_id}\n{self.format_note_content(note_data)}" for note_id, note_data in zip(note_ids, batch))
+            try:
+                answer = self.request_deepseek(self.create_payload(content, len(batch)), timeout=10 + 3 * len(batch))
+            except Exception as e:
+                print(f"DeepSeek批量分析异常: {e}")
+                answer = None
+            if answer is None:
+                results.extend([True] * len(batch))  # API失败时默认通过
+                continue
+
+            parsed = self.parse_batch_answer(answer, set(note_ids))
+            if len(parsed) < len(batch):
+                print(f"批量分析结果解析失败 {len(batch) - len(parsed)} 条，逐条分析")
+            for note_id, note_data in zip(note_ids, batch):
+                if note_id in parsed:
+                    is_user_demand = parsed[note_id]
+                    print(f"AI分析结果: {note_data.get('title', '')[:20]} - {'用户需求' if is_user_demand else '化妆师广告'}")
+                else:
+                    is_user_demand = self.analyze_note_intent(note_data)
+                results.append(is_user_demand)
+        return results
+
     def search_and_get_notes(self, keywords, count=5):
         """搜索并获取笔记详情 - 支持多关键词"""
         all_notes = []
@@ -205,17 +318,18 @@ class XHSMonitor:
         failed_keywords = []
 
         try:
-            # 初始化cookie
-            try:
-                cookies_str = init()
-            except Exception as e:
-                error_msg = f"Cookie初始化失败: {str(e)}"
-                print(error_msg)
-                QLAPI.systemNotify({"title": "🔑 Cookie错误", "content": error_msg})
-                return False, error_msg, []
+            # 初始化账号池, 同一次运行只校验一次
+            if self.account_pool is None:
+                try:
+                    self.account_pool = init_account_pool(self.data_spider.xhs_apis, ACCOUNT_STRATEGY, ACCOUNT_BUDGET)
+                except Exception as e:
+                    error_msg = f"Cookie初始化失败: {str(e)}"
+                    print(error_msg)
+                    QLAPI.systemNotify({"title": "🔑 Cookie错误", "content": error_msg})
+                    return False, error_msg, []
 
-            if not cookies_str:
-                error_msg = "Cookie未配置或为空，请检查环境变量XHS_COOKIE"
+            if len(self.account_pool) == 0:
+                error_msg = "Cookie未配置或已全部失效，请检查环境变量XHS_BEAUTY_COOKIES/XHS_BEAUTY_COOKIE"
                 print(error_msg)
                 QLAPI.systemNotify({"title": "🔑 Cookie未配置", "content": error_msg})
                 return False, error_msg, []
@@ -239,44 +353,65 @@ class XHSMonitor:
 
                 print(f"搜索参数: 排序={sort_type}, 时间={note_time}")
 
-                try:
-                    note_data_list, success, msg = self.data_spider.spider_some_search_note(
-                        query=keyword,
-                        require_num=per_keyword_count,
-                        cookies_str=cookies_str,
-                        base_path=None,
-                        save_choice='none',
-                        sort_type_choice=sort_type,  # 随机排序
-                        note_type=2,                 # 普通笔记
-                        note_time=note_time,         # 随机时间范围
-                        note_range=2,                # 不限
-                        pos_distance=2,              # 附近
-                        geo={                        # 成都地区
-                            "latitude": 30.539416,
-                            "longitude": 104.070491
-                        }
-                    )
-
-                    if success and note_data_list:
-                        print(f"关键词 '{keyword}' 搜索成功，获取到 {len(note_data_list)} 个笔记")
-                        all_notes.extend(note_data_list)
-                        all_success_keywords.append(keyword)
-                        time.sleep(2)  # 关键词间隔
-                    else:
-                        error_msg = f"关键词 '{keyword}' 搜索失败: {msg}"
+                # 登录失效的账号会被移出账号池, 同一个关键词换下一个账号重试
+                while True:
+                    account = self.account_pool.acquire()
+                    if account is None:
+                        failed_keywords.append(f"{keyword}(无可用账号)")
+                        break
+                    claimed = []
+
+                    def skip_note(note_id):
+                        if self.should_skip_note(note_id):
+                            return True
+                        claimed.append(note_id)
+                        return False
+                    note_data_list = []
+                    try:
+                        note_data_list, success, msg = self.data_spider.spider_some_search_note(
+                            query=keyword,
+                            require_num=per_keyword_count,
+                            cookies_str=account.cookies_str,
+                            base_path=None,
+                            save_choice='none',
+                            sort_type_choice=sort_type,  # 随机排序
+                            note_type=2,                 # 普通笔记
+                            note_time=note_time,         # 随机时间范围
+                            note_range=2,                # 不限
+                            pos_distance=2,              # 附近
+                            geo={                        # 成都地区
+                                "latitude": 30.539416,
+                                "longitude": 104.070491
+                            },
+                            skip_note=skip_note          # 已看过和其它关键词已获取的笔记不再获取详情
+                        )
+                    except Exception as keyword_error:
+                        self.release_note_ids(claimed, note_data_list)
+                        self.account_pool.release(account, False, keyword_error)
+                        error_msg = f"关键词 '{keyword}' 搜索异常: {str(keyword_error)}"
                         print(error_msg)
-                        failed_keywords.append(f"{keyword}({msg})")
+                        failed_keywords.append(f"{keyword}(异常: {str(keyword_error)})")
+                        break  # 继续处理下一个关键词
 
-                        # 检查是否是严重的登录相关错误
-                        if any(err_keyword in msg.lower() for err_keyword in ['登录', 'login', 'cookie', '401', '403', 'unauthorized', 'forbidden']):
-                            print(f"检测到登录相关错误，但继续尝试其他关键词")
-                            # 不立即返回，继续尝试其他关键词
-
-                except Exception as keyword_error:
-                    error_msg = f"关键词 '{keyword}' 搜索异常: {str(keyword_error)}"
+                    self.release_note_ids(claimed, note_data_list)
+                    self.account_pool.release(account, success, msg)
+                    if success:
+                        print(f"关键词 '{keyword}' 搜索成功(账号 {account.a1[:8]})，获取到 {len(note_data_list)} 个新笔记")
+                        all_notes.extend(note_data_list)
+                        all_success_keywords.append(keyword)
+                        break
+                    if not success and account.disabled and len(self.account_pool) > 0:
+                        print(f"账号 {account.a1[:8]} 登录失效，换下一个账号重试关键词 '{keyword}'")
+                        continue
+                    error_msg = f"关键词 '{keyword}' 搜索失败: {msg}"
                     print(error_msg)
-                    failed_keywords.append(f"{keyword}(异常: {str(keyword_error)})")
-                    continue  # 继续处理下一个关键词
+                    failed_keywords.append(f"{keyword}({msg})")
+                    break
+
+            rate_limiter = self.data_spider.xhs_apis.rate_limiter
+            for item in self.account_pool.stats():
+                requests_count = rate_limiter.get_request_count(item['a1'])
+                print(f"账号 {item['a1'][:8]}: 分配关键词 {item['count']} 个, 请求 {requests_count} 次, 失败 {item['failures']} 次{', 已移出: ' + item['disabled_reason'] if item['disabled'] else ''}")
 
             # 去重（基于note_id）
             seen_note_ids = set()
@@ -378,24 +513,25 @@ class XHSMonitor:
             new_notes_count = 0  # 新笔记总数
             filtered_ads_count = 0  # 被过滤的广告数
 
+            unseen_notes = []
             for note_data in note_data_list:
                 if not self.is_note_seen(note_data):
-                    new_notes_count += 1
-                    # 使用DeepSeek分析笔记意图
-                    print(f"分析笔记: {note_data.get('title', '')[:30]}")
-                    is_user_demand = self.analyze_note_intent(note_data)
-
-                    if is_user_demand:
-                        new_notes.append(note_data)
-                        print(f"✅ 用户需求笔记，加入通知队列")
-                    else:
-                        filtered_ads_count += 1
-                        print(f"❌ 化妆师广告笔记，已过滤")
-
-                    self.mark_note_as_seen(note_data)
-                    time.sleep(1)  # API请求间隔
+                    unseen_notes.append(note_data)
                 else:
                     print(f"已看过: {note_data.get('title', '')[:20]}")
+            new_notes_count = len(unseen_notes)
+
+            # 使用DeepSeek批量分析笔记意图
+            print(f"分析笔记: {new_notes_count} 个")
+            for note_data, is_user_demand in zip(unseen_notes, self.analyze_notes_intent(unseen_notes)):
+                if is_user_demand:
+                    new_notes.append(note_data)
+                    print(f"✅ 用户需求笔记，加入通知队列: {note_data.get('title', '')[:30]}")
+                else:
+                    filtered_ads_count += 1
+                    print(f"❌ 化妆师广告笔记，已过滤: {note_data.get('title', '')[:30]}")
+
+                self.mark_note_as_seen(note_data)
 
             # 保存记录
             self.save_seen_notes()
@@ -407,7 +543,7 @@ class XHSMonitor:
 🤖 AI筛选后: {len(new_notes)} 个用户需求
 🚫 过滤广告: {filtered_ads_count} 个化妆师广告
 ⏰ 检查时间: {datetime.now().strftime('%H:%M:%S')}
-📊 历史记录: {len(self.seen_notes)} 个"""
+📊 历史记录: {self.seen_store.count('hash')} 个"""
 
             QLAPI.systemNotify({"title": "📊 小红书监控", "content": summary})
 
@@ -419,17 +555,14 @@ class XHSMonitor:
 
                 backup_success, backup_msg, backup_notes = self.search_and_get_notes([backup_keyword], 5)
                 if backup_success and backup_notes:
-                    for note_data in backup_notes:
-                        if not self.is_note_seen(note_data):
-                            print(f"备用搜索分析: {note_data.get('title', '')[:30]}")
-                            is_user_demand = self.analyze_note_intent(note_data)
-
-                            if is_user_demand:
-                                new_notes.append(note_data)
-                                print(f"✅ 备用搜索找到用户需求笔记")
+                    backup_notes = [note_data for note_data in backup_notes if not self.is_note_seen(note_data)]
+                    print(f"备用搜索分析: {len(backup_notes)} 个")
+                    for note_data, is_user_demand in zip(backup_notes, self.analyze_notes_intent(backup_notes)):
+                        if is_user_demand:
+                            new_notes.append(note_data)
+                            print(f"✅ 备用搜索找到用户需求笔记")
 
-                            self.mark_note_as_seen(note_data)
-                            time.sleep(1)
+                        self.mark_note_as_seen(note_data)
 
                     self.save_seen_notes()
 
@@ -460,8 +593,15 @@ class XHSMonitor:
             return False
 
 def main():
-    monitor = XHSMonitor()
+    try:
+        monitor = XHSMonitor()
+    except SeenStoreLockedError as e:
+        # bloom 记录只能一个进程写入, 上一次运行还没结束时跳过本次
+        print(f"上一次运行还没结束，跳过本次: {e}")
+        return
     success = monitor.run()
+    # 提交剩余记录, 等后台清理完成
+    monitor.seen_store.close()
     if not success:
         exit(1)
 
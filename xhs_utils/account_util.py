@@ -0,0 +1,136 @@
+import threading
+from loguru import logger
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.retry_util import AUTH_EXPIRED, XhsApiError
+
+
+def is_login_error(error):
+    """
+        只有 retry_util 判定为登录失效的 XhsApiError 才算, 代理的 403、验证码等不会移出账号
+    """
+    return isinstance(error, XhsApiError) and error.kind == AUTH_EXPIRED
+
+
+class Account():
+    def __init__(self, cookies_str: str, budget: int = None):
+        self.cookies_str = cookies_str
+        self.a1 = get_cookie_context(cookies_str).a1
+        self.budget = budget
+        # 分配的次数 (监控里是关键词数), 实际请求数见 RateLimiter.get_request_count
+        self.count = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.disabled = False
+        self.disabled_reason = ''
+
+    def available(self):
+        return not self.disabled and (self.budget is None or self.count < self.budget)
+
+    def stats(self):
+        return {
+            'a1': self.a1,
+            'count': self.count,
+            'failures': self.failures,
+            'in_flight': self.in_flight,
+            'budget': self.budget,
+            'disabled': self.disabled,
+            'disabled_reason': self.disabled_reason,
+        }
+
+
+class AccountPool():
+    """
+        多账号 cookie 池, 把请求分摊到多个账号上
+        :param cookies_list: cookies 字符串列表
+        :param strategy: round_robin 轮询, least_loaded 选在途和已用次数最少的账号
+        :param budget: 每个账号最多分配的次数, None 为不限
+    """
+    def __init__(self, cookies_list: list, strategy: str = 'round_robin', budget: int = None):
+        if strategy not in ('round_robin', 'least_loaded'):
+            raise ValueError(f'不支持的分配策略: {strategy}')
+        self.accounts = []
+        a1_set = set()
+        for cookies_str in cookies_list:
+            cookies_str = cookies_str.strip()
+            if not cookies_str:
+                continue
+            try:
+                account = Account(cookies_str, budget)
+            except KeyError:
+                logger.warning('cookie 中缺少 a1, 已跳过')
+                continue
+            if account.a1 in a1_set:
+                continue
+            a1_set.add(account.a1)
+            self.accounts.append(account)
+        self.strategy = strategy
+        self.index = 0
+        self.lock = threading.Lock()
+
+    def validate(self, xhs_apis, proxies=None):
+        """
+            用 xhs_apis.check_login 检查每个账号, 登录失效的账号会被移出
+            返回可用账号数量
+        """
+        for account in self.accounts:
+            if account.disabled:
+                continue
+            try:
+                xhs_apis.check_login(account.cookies_str, proxies)
+            except Exception as e:
+                if is_login_error(e):
+                    self.disable(account, e)
+                else:
+                    logger.warning(f'账号 {account.a1} 校验失败: {e}')
+        return len(self.active_accounts())
+
+    def active_accounts(self):
+        return [account for account in self.accounts if not account.disabled]
+
+    def acquire(self):
+        """
+            分配一个账号, 没有可用账号时返回 None, 用完后调用 release
+        """
+        with self.lock:
+            candidates = [account for account in self.accounts if account.available()]
+            if not candidates:
+                return None
+            if self.strategy == 'least_loaded':
+                account = min(candidates, key=lambda a: (a.in_flight, a.count))
+            else:
+                account = None
+                for _ in range(len(self.accounts)):
+                    item = self.accounts[self.index % len(self.accounts)]
+                    self.index += 1
+                    if item.available():
+                        account = item
+                        break
+            account.count += 1
+            account.in_flight += 1
+            return account
+
+    def release(self, account: Account, success: bool = True, msg=''):
+        """
+            归还账号, 失败且 msg 是登录失效的 XhsApiError 时移出账号
+        """
+        with self.lock:
+            account.in_flight -= 1
+            if not success:
+                account.failures += 1
+        if not success and is_login_error(msg):
+            self.disable(account, msg)
+
+    def disable(self, account: Account, reason: str = ''):
+        with self.lock:
+            if account.disabled:
+                return
+            account.disabled = True
+            account.disabled_reason = str(reason)
+        logger.warning(f'账号 {account.a1} 已移出账号池: {reason}')
+
+    def stats(self):
+        with self.lock:
+            return [account.stats() for account in self.accounts]
+
+    def __len__(self):
+        return len(self.active_accounts())
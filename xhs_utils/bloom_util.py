@@ -0,0 +1,167 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+"""
+    保存在 mmap 文件里的 Bloom filter, 打开时不用解析, 只读打开可以多个进程共享
+    同一个文件同时只能有一个进程写入
+"""
+
+MAGIC = b'XHSBLOOM'
+# magic, 容量, 位数, 哈希个数, 已写入数量, 误判率
+HEADER = struct.Struct('<8sQQIQd')
+COUNT_OFFSET = struct.calcsize('<8sQQI')
+
+
+def _hashes(key: str, num_hashes: int, num_bits: int):
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    h1, h2 = struct.unpack('<QQ', digest)
+    h2 |= 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+class BloomFilter():
+    """
+        固定容量的 Bloom filter
+        :param path: 文件路径, 不存在时按 capacity 和 error_rate 创建
+        :param capacity: 预计写入的数量, 超过后误判率会上升
+        :param error_rate: 误判率
+        :param readonly: 只读打开
+    """
+    def __init__(self, path: str, capacity: int = 100000, error_rate: float = 0.001, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+            num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+            dir_path = os.path.dirname(os.path.abspath(path))
+            if not os.path.exists(dir_path):
+                os.makedirs(dir_path)
+            # 先写到临时文件再改名, 其它进程不会打开写了一半的文件
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, capacity, num_bits, num_hashes, 0, error_rate))
+                f.truncate(HEADER.size + (num_bits + 7) // 8)
+            os.replace(tmp_path, path)
+        self.file = open(path, 'rb' if readonly else 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        magic, self.capacity, self.num_bits, self.num_hashes, _, self.error_rate = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} 不是 Bloom filter 文件')
+
+    @property
+    def count(self):
+        return HEADER.unpack_from(self.mm, 0)[4]
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def __contains__(self, key: str):
+        mm = self.mm
+        for bit in _hashes(key, self.num_hashes, self.num_bits):
+            if not mm[HEADER.size + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def add(self, key: str):
+        """
+            写入 key, 已经存在(或误判为存在) 时返回 False
+        """
+        mm = self.mm
+        added = False
+        for bit in _hashes(key, self.num_hashes, self.num_bits):
+            pos = HEADER.size + (bit >> 3)
+            byte = mm[pos]
+            if not byte & (1 << (bit & 7)):
+                mm[pos] = byte | (1 << (bit & 7))
+                added = True
+        if added:
+            struct.pack_into('<Q', mm, COUNT_OFFSET, self.count + 1)
+        return added
+
+    def flush(self):
+        if not self.readonly:
+            self.mm.flush()
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+        self.file.close()
+
+
+class ScalableBloomFilter():
+    """
+        可扩容的 Bloom filter, 写满后新建一个容量 growth 倍、误判率 ratio 倍的分片
+        总误判率不超过 error_rate, 分片保存为 {path}.{序号}.bloom
+        :param path: 文件路径前缀
+        :param capacity: 第一个分片的容量
+        :param error_rate: 总误判率
+        :param readonly: 只读打开, 写入进程新建的分片在 reload() 后可见
+    """
+    def __init__(self, path: str, capacity: int = 100000, error_rate: float = 0.001, growth: int = 2, ratio: float = 0.5, readonly: bool = False):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.ratio = ratio
+        self.readonly = readonly
+        self.filters = []
+        self.reload()
+
+    def slice_path(self, index: int):
+        return f'{self.path}.{index}.bloom'
+
+    def reload(self):
+        """
+            打开新出现的分片
+        """
+        while os.path.exists(self.slice_path(len(self.filters))):
+            self.filters.append(BloomFilter(self.slice_path(len(self.filters)), readonly=self.readonly))
+        if not self.filters and not self.readonly:
+            self.add_slice()
+
+    def add_slice(self):
+        index = len(self.filters)
+        capacity = self.capacity * self.growth ** index
+        # 各分片误判率 error_rate * (1 - ratio) * ratio^i, 加起来不超过 error_rate
+        error_rate = self.error_rate * (1 - self.ratio) * self.ratio ** index
+        self.filters.append(BloomFilter(self.slice_path(index), capacity, error_rate))
+
+    @property
+    def count(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key: str):
+        # 新的分片容量大, 命中的可能更高, 倒着查
+        return any(key in bloom for bloom in reversed(self.filters))
+
+    def add(self, key: str):
+        if key in self:
+            return False
+        if self.filters[-1].is_full():
+            self.add_slice()
+        return self.filters[-1].add(key)
+
+    def size(self):
+        """
+            占用的字节数
+        """
+        return sum(os.path.getsize(bloom.path) for bloom in self.filters)
+
+    def flush(self):
+        for bloom in self.filters:
+            bloom.flush()
+
+    def close(self):
+        for bloom in self.filters:
+            bloom.close()
+        self.filters = []
+
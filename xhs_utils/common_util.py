@@ -1,12 +1,32 @@
 import os
 from loguru import logger
 from dotenv import load_dotenv
+from xhs_utils.account_util import AccountPool
 
 def load_env():
     load_dotenv()
     cookies_str = os.getenv('XHS_BEAUTY_COOKIE')
     return cookies_str
 
+def load_cookies_list():
+    # XHS_BEAUTY_COOKIES 中多个账号用换行分隔 (cookie 的值里可能有 &), 没有配置时退回单账号 XHS_BEAUTY_COOKIE
+    load_dotenv()
+    cookies_env = os.getenv('XHS_BEAUTY_COOKIES')
+    if not cookies_env:
+        cookies_str = (os.getenv('XHS_BEAUTY_COOKIE') or '').strip()
+        return [cookies_str] if cookies_str else []
+    return [cookies_str.strip() for cookies_str in cookies_env.splitlines() if cookies_str.strip()]
+
+def init_account_pool(xhs_apis=None, strategy='round_robin', budget=None, proxies=None):
+    """
+        加载所有账号组成账号池, 传入 xhs_apis 时先校验并移出登录失效的账号
+    """
+    account_pool = AccountPool(load_cookies_list(), strategy, budget)
+    if xhs_apis is not None:
+        account_pool.validate(xhs_apis, proxies)
+    logger.info(f'账号池可用账号 {len(account_pool)} 个')
+    return account_pool
+
 def init():
     # media_base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/media_datas'))
     # excel_base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/excel_datas'))
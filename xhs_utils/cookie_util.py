@@ -1,6 +1,25 @@
+import functools
+
+
 def trans_cookies(cookies_str):
     if '; ' in cookies_str:
         ck = {i.split('=')[0]: '='.join(i.split('=')[1:]) for i in cookies_str.split('; ')}
     else:
         ck = {i.split('=')[0]: '='.join(i.split('=')[1:]) for i in cookies_str.split(';')}
     return ck
+
+
+class CookieContext():
+    """
+        一个账号解析后的 cookie, 每个 cookies_str 只解析一次
+        :param cookies_str: 你的cookies
+    """
+    def __init__(self, cookies_str: str):
+        self.cookies_str = cookies_str
+        self.cookies = trans_cookies(cookies_str)
+        self.a1 = self.cookies['a1']
+
+
+@functools.lru_cache(maxsize=256)
+def get_cookie_context(cookies_str: str):
+    return CookieContext(cookies_str)
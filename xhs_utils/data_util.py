@@ -2,10 +2,9 @@ import json
 import os
 import re
 import time
-import openpyxl
 import requests
 from loguru import logger
-from retry import retry
+from xhs_utils.retry_util import RetryPolicy, XhsApiError, classify_response
 
 
 def norm_str(str):
@@ -176,6 +175,8 @@ def handle_comment_info(data):
         'pictures': pictures,
     }
 def save_to_xlsx(datas, file_path, type='note'):
+    # openpyxl 只在保存 excel 时才用到, 不在 import 时加载
+    import openpyxl
     wb = openpyxl.Workbook()
     ws = wb.active
     if type == 'note':
@@ -191,13 +192,22 @@ def save_to_xlsx(datas, file_path, type='note'):
     wb.save(file_path)
     logger.info(f'数据保存至 {file_path}')
 
-def download_media(path, name, url, type):
+# 媒体下载只重试 5xx、限流和网络错误, 404 等直接失败; 每个文件单独重试, 已下载的文件不会重下
+# 重试后仍然失败的文件记录日志后跳过, 不影响同一篇笔记的其它文件和其它笔记
+media_retry_policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=10.0)
+
+def _download_media(path, name, url, type):
     if type == 'image':
-        content = requests.get(url).content
+        res = requests.get(url)
+        if res.status_code >= 400:
+            raise XhsApiError(classify_response(res.status_code), f'下载 {url} 失败: HTTP {res.status_code}', res.status_code)
+        content = res.content
         with open(path + '/' + name + '.jpg', mode="wb") as f:
             f.write(content)
     elif type == 'video':
         res = requests.get(url, stream=True)
+        if res.status_code >= 400:
+            raise XhsApiError(classify_response(res.status_code), f'下载 {url} 失败: HTTP {res.status_code}', res.status_code)
         size = 0
         chunk_size = 1024 * 1024
         with open(path + '/' + name + '.mp4', mode="wb") as f:
@@ -205,6 +215,20 @@ def download_media(path, name, url, type):
                 f.write(data)
                 size += len(data)
 
+def download_media(path, name, url, type):
+    """
+        下载一个图片或视频, 失败时删除写了一半的文件, 返回是否成功
+    """
+    try:
+        media_retry_policy.call(lambda: _download_media(path, name, url, type))
+        return True
+    except Exception as e:
+        logger.warning(f'下载 {name} 失败, 已跳过: {e}')
+        file_path = path + '/' + name + ('.mp4' if type == 'video' else '.jpg')
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        return False
+
 def save_user_detail(user, path):
     with open(f'{path}/detail.txt', mode="w", encoding="utf-8") as f:
         # 逐行输出到txt里
@@ -246,7 +270,6 @@ def save_note_detail(note, path):
 
 
 
-@retry(tries=3, delay=1)
 def download_note(note_info, path, save_choice):
     note_id = note_info['note_id']
     user_id = note_info['user_id']
@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+# 各类数据默认的有效期(秒)
+DEFAULT_TTLS = {
+    'note': 24 * 3600,
+    'user': 6 * 3600,
+}
+
+
+class DiskCache():
+    """
+        SQLite 本地缓存, 保存处理后的笔记详细和用户信息, 多次运行之间共享
+        :param path: 数据库文件路径
+        :param ttls: {类型: 有效期(秒)}, 没有配置的类型用 default_ttl
+        :param default_ttl: 默认有效期(秒)
+        :param max_entries: 最多保存的条数, 超过时按最近访问时间淘汰
+        :param stale_while_revalidate: 过期的数据先返回, 同时在后台重新获取
+        :param max_stale: 过期超过这么久(秒) 的数据不再先返回
+    """
+    def __init__(self, path: str, ttls: dict = None, default_ttl: float = 3600, max_entries: int = 50000, stale_while_revalidate: bool = False, max_stale: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self.lock = threading.Lock()
+        self.revalidating = set()
+        self.executor = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        dir_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)')
+        # 条数只在打开和淘汰时数一次, 写入时按新增 / 删除的行数维护
+        self.size = self.conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def get_ttl(self, kind: str):
+        return self.ttls.get(kind, self.default_ttl)
+
+    def get(self, kind: str, key: str):
+        """
+            返回 (value, fresh), 没有缓存时返回 (None, False)
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute('SELECT value, updated FROM cache WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+            if row is None:
+                return None, False
+            self.conn.execute('UPDATE cache SET accessed = ? WHERE kind = ? AND key = ?', (now, kind, key))
+        value, updated = json.loads(row[0]), row[1]
+        fresh = now - updated < self.get_ttl(kind)
+        if not fresh and now - updated > self.get_ttl(kind) + self.max_stale:
+            return None, False
+        return value, fresh
+
+    def set(self, kind: str, key: str, value):
+        now = time.time()
+        with self.lock:
+            value = json.dumps(value, ensure_ascii=False)
+            cursor = self.conn.execute('UPDATE cache SET value = ?, updated = ?, accessed = ? WHERE kind = ? AND key = ?', (value, now, now, kind, key))
+            if cursor.rowcount == 0:
+                self.conn.execute('INSERT OR REPLACE INTO cache (kind, key, value, updated, accessed) VALUES (?, ?, ?, ?, ?)', (kind, key, value, now, now))
+                self.size += 1
+            if self.size > self.max_entries:
+                # 其它进程也可能写入, 淘汰前重新数一次
+                self.size = self.conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+                if self.size > self.max_entries:
+                    # 一次多删 10%, 避免每次写入都触发淘汰
+                    evict = self.size - self.max_entries + self.max_entries // 10
+                    self.size -= self.conn.execute('DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed LIMIT ?)', (evict, )).rowcount
+
+    def delete(self, kind: str, key: str):
+        with self.lock:
+            self.size -= self.conn.execute('DELETE FROM cache WHERE kind = ? AND key = ?', (kind, key)).rowcount
+
+    def revalidate(self, kind: str, key: str, fetch):
+        """
+            后台重新获取, 同一个 key 同时只有一个
+        """
+        with self.lock:
+            if (kind, key) in self.revalidating:
+                return
+            self.revalidating.add((kind, key))
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(2)
+
+        def task():
+            try:
+                success, msg, value = fetch()
+                if success and value is not None:
+                    self.set(kind, key, value)
+                else:
+                    logger.warning(f'后台更新缓存 {kind}:{key} 失败: {msg}')
+            finally:
+                with self.lock:
+                    self.revalidating.discard((kind, key))
+        self.executor.submit(task)
+
+    def get_or_fetch(self, kind: str, key: str, fetch):
+        """
+            先查缓存, 没有时调用 fetch, fetch 返回 (success, msg, value), 成功的结果写入缓存
+            返回 (success, msg, value)
+        """
+        value, fresh = self.get(kind, key)
+        if value is not None and fresh:
+            self.hits += 1
+            return True, '缓存', value
+        if value is not None and self.stale_while_revalidate:
+            self.stale_hits += 1
+            self.revalidate(kind, key, fetch)
+            return True, '缓存(后台更新中)', value
+        self.misses += 1
+        success, msg, value = fetch()
+        if success and value is not None:
+            self.set(kind, key, value)
+        return success, msg, value
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+        }
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        with self.lock:
+            self.conn.close()
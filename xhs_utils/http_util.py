@@ -0,0 +1,73 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from xhs_utils.proxy_util import resolve_proxies
+
+
+class SessionPool():
+    """
+        keep-alive 连接池, 每个代理一个 session, 复用 TCP/TLS 连接
+        session 被多个账号共用, 不保存响应里的 Set-Cookie, 每次请求只带传入的 cookies
+        :param pool_size: 每个 session 的连接数
+        :param http2: 是否使用 HTTP/2 (需要安装 httpx[http2])
+        :param timeout: 请求超时时间(秒), None 为不限制
+        :param verify: 是否校验证书
+    """
+    def __init__(self, pool_size: int = 10, http2: bool = False, timeout: float = None, verify: bool = True):
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.timeout = timeout
+        self.verify = verify
+        self.sessions = {}
+        self.lock = threading.Lock()
+        if http2:
+            import httpx
+            self.httpx = httpx
+
+    @staticmethod
+    def proxy_key(proxies: dict = None):
+        return tuple(sorted(proxies.items())) if proxies else None
+
+    def _create_session(self, proxies: dict = None):
+        if self.http2:
+            proxy = (proxies.get('https') or proxies.get('http')) if proxies else None
+            limits = self.httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            client = self.httpx.Client(http2=True, proxy=proxy, limits=limits, verify=self.verify, timeout=self.timeout)
+            client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            return client
+        session = requests.Session()
+        # 不保存服务端下发的 cookie, 否则 A 账号的 cookie 会随 B 账号的请求发出
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = self.verify
+        if proxies:
+            session.proxies.update(proxies)
+        return session
+
+    def get_session(self, proxies: dict = None):
+        key = self.proxy_key(proxies)
+        session = self.sessions.get(key)
+        if session is None:
+            with self.lock:
+                session = self.sessions.get(key)
+                if session is None:
+                    session = self._create_session(proxies)
+                    self.sessions[key] = session
+        return session
+
+    def request(self, method: str, url: str, headers: dict = None, cookies: dict = None, data=None, proxies: dict = None, **kwargs):
+        # 传入 ProxyPool 时用当前最健康的代理, 需要上报结果的调用方应自己 acquire/release
+        session = self.get_session(resolve_proxies(proxies))
+        if self.http2:
+            return session.request(method, url, headers=headers, cookies=cookies, content=data, **kwargs)
+        kwargs.setdefault('timeout', self.timeout)
+        return session.request(method, url, headers=headers, cookies=cookies, data=data, **kwargs)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
@@ -0,0 +1,220 @@
+import json
+import os
+import subprocess
+import threading
+import time
+import zlib
+from collections import deque
+from loguru import logger
+
+static_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static'))
+server_path = os.path.join(static_dir, 'xhs_js_server.js')
+
+
+class JsCallError(Exception):
+    pass
+
+
+class NodeJsContext():
+    """
+        常驻的 node 进程, 脚本只加载一次, 调用方式和 execjs 的 context 一致 (ctx.call)
+        进程崩溃或者管道断开时自动重启
+        :param script_path: js 脚本路径
+        :param node: node 可执行文件
+    """
+    def __init__(self, script_path: str, node: str = 'node'):
+        self.script_path = os.path.abspath(script_path)
+        self.node = node
+        self.process = None
+        self.seq = 0
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            [self.node, server_path, self.script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(self.script_path),
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        line = self.process.stdout.readline()
+        ready = json.loads(line) if line else {'ready': False, 'error': 'node 进程启动失败'}
+        if not ready.get('ready'):
+            self.close()
+            raise JsCallError(f'加载 {self.script_path} 失败: {ready.get("error")}')
+        logger.debug(f'js 进程已启动 {os.path.basename(self.script_path)} pid: {ready["pid"]}')
+
+    def _restart(self):
+        self.restarts += 1
+        logger.warning(f'js 进程异常退出, 重启 {os.path.basename(self.script_path)} 第 {self.restarts} 次')
+        self.close()
+        self._start()
+
+    def _send(self, fn, args):
+        self.seq += 1
+        self.process.stdin.write(json.dumps({'id': self.seq, 'fn': fn, 'args': args}, ensure_ascii=False) + '\n')
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise BrokenPipeError('js 进程没有返回')
+        return json.loads(line)
+
+    def call(self, fn: str, *args):
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._restart()
+            try:
+                res = self._send(fn, list(args))
+            except (BrokenPipeError, OSError, ValueError):
+                self._restart()
+                res = self._send(fn, list(args))
+        if 'error' in res:
+            raise JsCallError(res['error'])
+        return res['result']
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process is not None else None
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=3)
+        except Exception:
+            self.process.kill()
+        self.process = None
+
+
+class JsWorker():
+    def __init__(self, index: int, factory):
+        self.index = index
+        self.factory = factory
+        self.ctx = None
+        self.lock = threading.Lock()
+        self.count_lock = threading.Lock()
+        self.pending = 0
+        self.calls = 0
+        self.latencies = deque(maxlen=2000)
+
+    def call(self, fn, *args):
+        with self.count_lock:
+            self.pending += 1
+        try:
+            with self.lock:
+                if self.ctx is None:
+                    self.ctx = self.factory()
+                start = time.perf_counter()
+                try:
+                    return self.ctx.call(fn, *args)
+                finally:
+                    self.latencies.append(time.perf_counter() - start)
+                    self.calls += 1
+        finally:
+            with self.count_lock:
+                self.pending -= 1
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        return {
+            'worker': self.index,
+            'started': self.ctx is not None,
+            'pid': getattr(self.ctx, 'pid', None),
+            'queue_depth': self.pending,
+            'calls': self.calls,
+            'p50_ms': percentile(0.5),
+            'p99_ms': percentile(0.99),
+        }
+
+
+class JsContextPool():
+    """
+        多个 js 进程组成的池, 按 key (a1) 的哈希固定路由到同一个进程, 保持每个账号的 jsdom 状态
+        进程在第一次被路由到时才启动, 可以多线程同时调用
+        :param factory: 创建 js context 的函数
+        :param workers: 进程数量, 默认 cpu 核数
+    """
+    def __init__(self, factory, workers: int = None):
+        workers = workers or os.cpu_count() or 1
+        self.workers = [JsWorker(i, factory) for i in range(workers)]
+
+    def get_worker(self, key: str = None):
+        if key is None:
+            # 没有 key 时选排队最少的
+            return min(self.workers, key=lambda worker: worker.pending)
+        return self.workers[zlib.crc32(key.encode('utf-8')) % len(self.workers)]
+
+    def call(self, fn: str, *args, key: str = None):
+        return self.get_worker(key).call(fn, *args)
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers]
+
+    def close(self):
+        for worker in self.workers:
+            with worker.lock:
+                if worker.ctx is not None and hasattr(worker.ctx, 'close'):
+                    worker.ctx.close()
+                worker.ctx = None
+
+
+class LazyJsContext():
+    """
+        第一次 call 时才编译的 js context, 避免 import 时就启动 js 进程
+        :param name: static 目录下的脚本文件名
+    """
+    def __init__(self, name: str, backend: str = None):
+        self.name = name
+        self.backend = backend
+        self.ctx = None
+        self.lock = threading.Lock()
+
+    def get_ctx(self):
+        if self.ctx is None:
+            with self.lock:
+                if self.ctx is None:
+                    self.ctx = compile_js(self.name, self.backend)
+        return self.ctx
+
+    def call(self, fn: str, *args):
+        return self.get_ctx().call(fn, *args)
+
+    @property
+    def pid(self):
+        return getattr(self.ctx, 'pid', None)
+
+    def close(self):
+        if self.ctx is not None and hasattr(self.ctx, 'close'):
+            self.ctx.close()
+        self.ctx = None
+
+
+def get_static_path(name: str):
+    return os.path.join(static_dir, name)
+
+
+def compile_js(name: str, backend: str = None):
+    """
+        编译 static 目录下的 js 脚本
+        :param name: 脚本文件名
+        :param backend: daemon 常驻 node 进程(默认), execjs 每次调用都新起进程
+        返回可以 call 的 js context
+    """
+    backend = backend or os.getenv('XHS_JS_BACKEND', 'daemon')
+    path = get_static_path(name)
+    if backend == 'execjs':
+        import execjs
+        return execjs.compile(open(path, 'r', encoding='utf-8').read(), cwd=static_dir)
+    return NodeJsContext(path)
@@ -0,0 +1,166 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+    响应解码和字段裁剪
+    有 orjson 时用 orjson 解码; 裁剪按下面声明的字段只保留用到的部分, 整页的原始 dict 解码后马上释放
+    字段声明: True 表示整个值保留, dict 表示只保留其中的 key, 遇到 list 时对每个元素按同样的声明裁剪
+"""
+
+USER_FIELDS = {
+    'user_id': True,
+    'nickname': True,
+    'nick_name': True,
+    'avatar': True,
+    'image': True,
+    'xsec_token': True,
+}
+
+INTERACT_FIELDS = {
+    'liked': True,
+    'liked_count': True,
+    'collected': True,
+    'collected_count': True,
+    'comment_count': True,
+    'share_count': True,
+}
+
+# 搜索结果、主页推荐里的笔记卡片
+NOTE_CARD_FIELDS = {
+    'id': True,
+    'model_type': True,
+    'xsec_token': True,
+    'note_card': {
+        'type': True,
+        'display_title': True,
+        'user': USER_FIELDS,
+        'interact_info': INTERACT_FIELDS,
+        'cover': {'url_default': True, 'url': True},
+    },
+}
+
+# 用户主页、喜欢、收藏里的笔记
+USER_NOTE_FIELDS = {
+    'note_id': True,
+    'xsec_token': True,
+    'type': True,
+    'display_title': True,
+    'user': USER_FIELDS,
+    'interact_info': INTERACT_FIELDS,
+    'cover': {'url_default': True, 'url': True},
+}
+
+# 笔记详细, 包含 handle_note_info 用到的全部字段
+NOTE_DETAIL_FIELDS = {
+    'id': True,
+    'model_type': True,
+    'note_card': {
+        'note_id': True,
+        'type': True,
+        'title': True,
+        'desc': True,
+        'user': USER_FIELDS,
+        'interact_info': INTERACT_FIELDS,
+        'image_list': {'info_list': {'image_scene': True, 'url': True}, 'url_default': True},
+        'video': {'consumer': {'origin_video_key': True}},
+        'tag_list': {'id': True, 'name': True, 'type': True},
+        'time': True,
+        'last_update_time': True,
+        'ip_location': True,
+    },
+}
+
+COMMENT_FIELDS = {
+    'id': True,
+    'note_id': True,
+    'content': True,
+    'show_tags': True,
+    'create_time': True,
+    'ip_location': True,
+    'like_count': True,
+    'liked': True,
+    'user_info': USER_FIELDS,
+    'target_comment': {'id': True, 'user_info': USER_FIELDS},
+    'pictures': {'url_default': True, 'info_list': {'image_scene': True, 'url': True}},
+    'sub_comment_count': True,
+    'sub_comment_cursor': True,
+    'sub_comment_has_more': True,
+}
+# 一级评论自带的二级评论用同样的字段
+COMMENT_FIELDS = dict(COMMENT_FIELDS, sub_comments=dict(COMMENT_FIELDS))
+
+SEARCH_USER_FIELDS = {
+    'id': True,
+    'name': True,
+    'red_id': True,
+    'xsec_token': True,
+    'image': True,
+    'desc': True,
+    'sub_title': True,
+    'fans': True,
+    'note_count': True,
+    'followed': True,
+    'red_official_verified': True,
+}
+
+PAGE_FIELDS = {
+    'has_more': True,
+    'cursor': True,
+    'cursor_score': True,
+    'current_time': True,
+    'page': True,
+}
+
+
+def page_projection(**items):
+    return {'success': True, 'msg': True, 'code': True, 'data': dict(PAGE_FIELDS, **items)}
+
+
+# 接口路径 -> 响应的裁剪声明, 没有声明的接口返回完整响应
+RESPONSE_PROJECTIONS = {
+    '/api/sns/web/v1/search/notes': page_projection(items=NOTE_CARD_FIELDS),
+    '/api/sns/web/v1/homefeed': page_projection(items=NOTE_CARD_FIELDS),
+    '/api/sns/web/v1/feed': page_projection(items=NOTE_DETAIL_FIELDS),
+    '/api/sns/web/v1/user_posted': page_projection(notes=USER_NOTE_FIELDS),
+    '/api/sns/web/v1/note/like/page': page_projection(notes=USER_NOTE_FIELDS),
+    '/api/sns/web/v2/note/collect/page': page_projection(notes=USER_NOTE_FIELDS),
+    '/api/sns/web/v2/comment/page': page_projection(comments=COMMENT_FIELDS),
+    '/api/sns/web/v2/comment/sub/page': page_projection(comments=COMMENT_FIELDS),
+    '/api/sns/web/v1/search/usersearch': page_projection(users=SEARCH_USER_FIELDS),
+}
+
+
+def loads(content):
+    """
+        解码 json, 有 orjson 时用 orjson
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def project(obj, fields):
+    """
+        按字段声明裁剪 obj
+    """
+    if fields is True:
+        return obj
+    if isinstance(obj, list):
+        return [project(item, fields) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    return {key: project(obj[key], sub_fields) for key, sub_fields in fields.items() if key in obj}
+
+
+def project_response(api: str, res_json):
+    """
+        按接口路径裁剪响应, 没有声明的接口原样返回
+    """
+    fields = RESPONSE_PROJECTIONS.get(api.split('?')[0])
+    if fields is None or not isinstance(res_json, dict):
+        return res_json
+    return project(res_json, fields)
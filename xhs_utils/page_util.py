@@ -0,0 +1,155 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Done():
+    # 不预取时直接在当前线程执行, 和 Future 一样用 result() 取结果
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def result(self):
+        return self.func(*self.args)
+
+    def cancel(self):
+        return True
+
+
+def iter_numbered_pages(fetch_page, parse, start_page: int = 1, require_num: int = None, prefetch: int = 0, page_size: int = None):
+    """
+        按页码翻页 (搜索等接口), 下一页不依赖当前页的响应, 可以提前签名并发出
+        :param fetch_page: fetch_page(page) 返回 (success, msg, res_json)
+        :param parse: parse(res_json) 返回 (items, has_more), items 为 None 时直接结束
+        :param start_page: 起始页码
+        :param require_num: 需要的数量, 够了就停, 也不会再预取多余的页
+        :param prefetch: 提前发出的页数, 0 为逐页请求
+        :param page_size: 每页数量的估计值, 用来避免预取超过 require_num 的页
+        每页 yield (items, next_page), 失败时抛出异常, 之前 yield 的页不受影响
+    """
+    executor = ThreadPoolExecutor(prefetch + 1) if prefetch > 0 else None
+    pending = deque()
+    next_page = start_page
+    count = 0
+    try:
+        while True:
+            # 预取窗口: 在途页数不超过 prefetch + 1, 预计已经够数时不再多发
+            while len(pending) < prefetch + 1:
+                if pending and require_num and page_size and count + len(pending) * page_size >= require_num:
+                    break
+                if executor is None:
+                    pending.append(_Done(fetch_page, next_page))
+                else:
+                    pending.append(executor.submit(fetch_page, next_page))
+                next_page += 1
+            success, msg, res_json = pending.popleft().result()
+            if not success:
+                raise Exception(msg)
+            items, has_more = parse(res_json)
+            if items is None:
+                return
+            count += len(items)
+            page_size = page_size or len(items)
+            yield items, next_page - len(pending)
+            if not has_more or (require_num and count >= require_num):
+                return
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def iter_cursor_pages(fetch_page, parse, cursor: str = '', require_num: int = None, prefetch: int = 0):
+    """
+        按 cursor 翻页, 下一页的 cursor 在当前页的响应里
+        prefetch > 0 时拿到 cursor 后先发出下一页, 再把当前页交给调用方处理
+        :param fetch_page: fetch_page(cursor) 返回 (success, msg, res_json)
+        :param parse: parse(res_json) 返回 (items, next_cursor, has_more), items 为 None 时直接结束
+        :param cursor: 起始 cursor, 传入上次 yield 的 cursor 可以接着翻
+        :param require_num: 需要的数量, 够了就停
+        每页 yield (items, next_cursor), 失败时抛出异常, 之前 yield 的页不受影响
+    """
+    executor = ThreadPoolExecutor(1) if prefetch > 0 else None
+    future = _Done(fetch_page, cursor) if executor is None else executor.submit(fetch_page, cursor)
+    count = 0
+    try:
+        while True:
+            success, msg, res_json = future.result()
+            future = None
+            if not success:
+                raise Exception(msg)
+            items, cursor, has_more = parse(res_json)
+            if items is None:
+                return
+            count += len(items)
+            has_more = has_more and not (require_num and count >= require_num)
+            if has_more:
+                future = _Done(fetch_page, cursor) if executor is None else executor.submit(fetch_page, cursor)
+            yield items, cursor
+            if not has_more:
+                return
+    finally:
+        if future is not None:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+async def async_iter_numbered_pages(fetch_page, parse, start_page: int = 1, require_num: int = None, prefetch: int = 0, page_size: int = None):
+    """
+        iter_numbered_pages 的异步版本, fetch_page(page) 为协程, 预取的页作为 task 并发执行
+    """
+    pending = deque()
+    next_page = start_page
+    count = 0
+    try:
+        while True:
+            while len(pending) < prefetch + 1:
+                if pending and require_num and page_size and count + len(pending) * page_size >= require_num:
+                    break
+                pending.append(asyncio.ensure_future(fetch_page(next_page)))
+                next_page += 1
+            success, msg, res_json = await pending.popleft()
+            if not success:
+                raise Exception(msg)
+            items, has_more = parse(res_json)
+            if items is None:
+                return
+            count += len(items)
+            page_size = page_size or len(items)
+            yield items, next_page - len(pending)
+            if not has_more or (require_num and count >= require_num):
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def async_iter_cursor_pages(fetch_page, parse, cursor: str = '', require_num: int = None, prefetch: int = 0):
+    """
+        iter_cursor_pages 的异步版本, prefetch > 0 时下一页作为 task 在调用方处理当前页时发出
+    """
+    task = asyncio.ensure_future(fetch_page(cursor))
+    count = 0
+    try:
+        while True:
+            success, msg, res_json = await task
+            task = None
+            if not success:
+                raise Exception(msg)
+            items, cursor, has_more = parse(res_json)
+            if items is None:
+                return
+            count += len(items)
+            has_more = has_more and not (require_num and count >= require_num)
+            if has_more and prefetch > 0:
+                task = asyncio.ensure_future(fetch_page(cursor))
+            yield items, cursor
+            if not has_more:
+                return
+            if task is None:
+                task = asyncio.ensure_future(fetch_page(cursor))
+    finally:
+        if task is not None:
+            task.cancel()
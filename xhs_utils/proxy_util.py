@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+
+# 被风控拦截的状态码
+BLOCK_STATUS_CODES = (403, 461)
+
+
+class ProxyState():
+    def __init__(self, proxies: dict):
+        self.proxies = proxies
+        self.name = proxies.get('https') or proxies.get('http') or str(proxies)
+        self.successes = 0
+        self.failures = 0
+        self.latency_ewma = None
+        self.blocks = deque(maxlen=20)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+
+    def success_rate(self):
+        # 加一平滑, 新代理默认成功率较高, 能被选到
+        return (self.successes + 1) / (self.successes + self.failures + 1)
+
+    def recent_blocks(self, window: float):
+        now = time.monotonic()
+        return sum(1 for t in self.blocks if now - t < window)
+
+    def stats(self):
+        return {
+            'proxy': self.name,
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': round(self.success_rate(), 4),
+            'latency_ewma_ms': round(self.latency_ewma * 1000, 3) if self.latency_ewma is not None else None,
+            'recent_blocks': len(self.blocks),
+            'in_flight': self.in_flight,
+            'cooldown_s': round(max(0.0, self.cooldown_until - time.monotonic()), 3),
+        }
+
+
+class ProxyPool():
+    """
+        代理池, 可以代替 proxies 字典传给 XHS_Apis 的各个方法
+        记录每个代理的成功率、延迟 EWMA 和最近的 461/403, 每次请求选最健康的代理
+        失败的代理按指数退避隔离一段时间
+        :param proxies_list: 代理列表, 元素为 requests 格式的 proxies 字典或代理 url
+        :param alpha: 延迟 EWMA 的权重
+        :param base_cooldown: 第一次失败的隔离时间(秒), 之后每次翻倍
+        :param max_cooldown: 最长隔离时间(秒)
+        :param block_window: 统计 461/403 的时间窗口(秒)
+    """
+    def __init__(self, proxies_list: list, alpha: float = 0.3, base_cooldown: float = 5, max_cooldown: float = 600, block_window: float = 300):
+        self.states = []
+        for proxies in proxies_list:
+            if isinstance(proxies, str):
+                proxies = {'http': proxies, 'https': proxies}
+            self.states.append(ProxyState(proxies))
+        if not self.states:
+            raise ValueError('代理列表不能为空')
+        self.alpha = alpha
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.block_window = block_window
+        self.lock = threading.Lock()
+
+    def score(self, state: ProxyState):
+        if state.latency_ewma is None:
+            # 还没有延迟数据的代理优先试一次
+            return float('inf') if state.in_flight == 0 else 0.0
+        latency = state.latency_ewma
+        # 在途请求越多分数越低, 使负载分散到多个代理
+        return state.success_rate() / (latency * (1 + state.in_flight)) / (1 + state.recent_blocks(self.block_window))
+
+    def acquire(self):
+        """
+            选择一个代理, 用完后需要调用 release 上报结果
+        """
+        with self.lock:
+            now = time.monotonic()
+            healthy = [state for state in self.states if state.cooldown_until <= now]
+            if healthy:
+                state = max(healthy, key=self.score)
+            else:
+                # 全部被隔离时选最快解除隔离的
+                state = min(self.states, key=lambda s: s.cooldown_until)
+            state.in_flight += 1
+            return state
+
+    def release(self, state: ProxyState, success: bool, latency: float = None, status_code: int = None):
+        with self.lock:
+            state.in_flight -= 1
+            blocked = status_code in BLOCK_STATUS_CODES
+            if success and not blocked:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.cooldown_until = 0.0
+                if latency is not None:
+                    state.latency_ewma = latency if state.latency_ewma is None else self.alpha * latency + (1 - self.alpha) * state.latency_ewma
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            if blocked:
+                state.blocks.append(time.monotonic())
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (state.consecutive_failures - 1))
+            state.cooldown_until = time.monotonic() + cooldown
+
+    def best_proxies(self):
+        """
+            只接受代理字典的地方用, 返回当前最健康的代理, 不计入在途和结果
+        """
+        with self.lock:
+            now = time.monotonic()
+            healthy = [state for state in self.states if state.cooldown_until <= now]
+            if healthy:
+                return max(healthy, key=self.score).proxies
+            return min(self.states, key=lambda s: s.cooldown_until).proxies
+
+    def stats(self):
+        with self.lock:
+            return [state.stats() for state in self.states]
+
+
+def resolve_proxies(proxies):
+    """
+        把 ProxyPool 换成代理字典, 其它原样返回
+    """
+    if isinstance(proxies, ProxyPool):
+        return proxies.best_proxies()
+    return proxies
+
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+# 各类接口默认的限速 (每秒请求数, 突发数)
+# XHS_Apis / AsyncXHS_Apis 默认就会按这个限速, 搜索每个账号约 2 秒一次, 不需要时传 RateLimiter({})
+DEFAULT_RATES = {
+    'search': (0.5, 2),
+    'feed': (2, 4),
+    'comment': (2, 4),
+    'user': (1, 3),
+    'other': (2, 4),
+}
+
+
+def get_endpoint_family(api: str):
+    """
+        根据接口路径归类: search / feed / comment / user / other
+    """
+    path = api.split('?')[0]
+    if '/search/' in path:
+        return 'search'
+    if '/comment/' in path:
+        return 'comment'
+    if path.endswith('/feed') or '/homefeed' in path:
+        return 'feed'
+    if '/user' in path or '/note/like/' in path or '/note/collect/' in path:
+        return 'user'
+    return 'other'
+
+
+class TokenBucket():
+    """
+        令牌桶, 线程安全; reserve 只计算需要等待的时间, 由调用方 sleep 或 await
+        :param rate: 每秒补充的令牌数, <= 0 为不限速
+        :param burst: 桶容量
+    """
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.count = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def reserve(self):
+        with self.lock:
+            if self.rate <= 0:
+                self.count += 1
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 令牌可以预支成负数, 后来的请求排在后面等待
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.count += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'count': self.count,
+            'total_wait_s': round(self.wait_seconds, 3),
+            'avg_wait_ms': round(self.wait_seconds * 1000 / self.count, 3) if self.count else 0.0,
+            'max_wait_ms': round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+class RateLimiter():
+    """
+        按 (账号 a1, 接口类别) 分别限速
+        :param rates: {类别: (每秒请求数, 突发数)}, 没有配置或每秒请求数 <= 0 的类别不限速
+            不传时用 DEFAULT_RATES, 默认是开启限速的 (搜索 0.5 次/秒), RateLimiter({}) 为全部不限速
+        每个账号实际发出的请求数 (含重试) 用 get_request_count 查看, 不限速的类别也会计入
+    """
+    def __init__(self, rates: dict = None):
+        self.rates = DEFAULT_RATES if rates is None else rates
+        self.buckets = {}
+        self.request_counts = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, a1: str, api: str):
+        family = get_endpoint_family(api)
+        if family not in self.rates:
+            return None
+        key = (a1, family)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    rate, burst = self.rates[family]
+                    bucket = TokenBucket(rate, burst)
+                    self.buckets[key] = bucket
+        return bucket
+
+    def add_request(self, a1: str):
+        with self.lock:
+            self.request_counts[a1] = self.request_counts.get(a1, 0) + 1
+
+    def get_request_count(self, a1: str):
+        return self.request_counts.get(a1, 0)
+
+    def acquire(self, a1: str, api: str):
+        self.add_request(a1)
+        bucket = self.get_bucket(a1, api)
+        return bucket.acquire() if bucket is not None else 0.0
+
+    async def async_acquire(self, a1: str, api: str):
+        self.add_request(a1)
+        bucket = self.get_bucket(a1, api)
+        return await bucket.async_acquire() if bucket is not None else 0.0
+
+    def stats(self):
+        return {f'{a1}:{family}': bucket.stats() for (a1, family), bucket in list(self.buckets.items())}
+
+
+default_rate_limiter = RateLimiter()
@@ -0,0 +1,187 @@
+import asyncio
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from loguru import logger
+
+# 响应分类
+OK = 'ok'
+THROTTLED = 'throttled'            # 访问频次过高
+CAPTCHA = 'captcha'                # 461/471 等需要验证
+AUTH_EXPIRED = 'auth_expired'      # 登录失效, 重试没有意义
+SERVER_ERROR = 'server_error'      # 5xx
+NETWORK = 'network'                # 连接失败、超时
+CLIENT_ERROR = 'client_error'      # 其它 4xx 或无法解析的响应
+
+RETRYABLE_KINDS = (THROTTLED, CAPTCHA, SERVER_ERROR, NETWORK)
+
+THROTTLE_CODES = (300013, )
+AUTH_CODES = (-100, -101, -104)
+CAPTCHA_STATUS_CODES = (461, 471)
+
+# 可以重试的传输层异常 {模块: 类名}, 只检查已经加载的模块, 不为此导入 aiohttp/httpx
+TRANSPORT_ERRORS = {
+    'requests.exceptions': ('ConnectionError', 'Timeout', 'ChunkedEncodingError'),
+    'urllib3.exceptions': ('ProtocolError', 'TimeoutError', 'NewConnectionError'),
+    'httpx': ('TransportError', ),
+    'aiohttp': ('ClientConnectionError', 'ClientPayloadError'),
+}
+
+
+class XhsApiError(Exception):
+    """
+        重试用尽或者不可重试时抛出, 消息会作为接口的 msg 返回
+    """
+    def __init__(self, kind: str, msg: str, status_code: int = None, retry_after: float = None):
+        super().__init__(msg)
+        self.kind = kind
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers):
+    """
+        解析 Retry-After 响应头, 支持秒数和 HTTP 日期, 返回需要等待的秒数
+    """
+    if not headers:
+        return None
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(status_code: int, res_json=None):
+    """
+        根据状态码和返回的 json 给响应分类
+    """
+    if status_code in CAPTCHA_STATUS_CODES:
+        return CAPTCHA
+    if status_code == 429:
+        return THROTTLED
+    if status_code == 401:
+        return AUTH_EXPIRED
+    if status_code >= 500:
+        return SERVER_ERROR
+    if not isinstance(res_json, dict):
+        return CLIENT_ERROR
+    if res_json.get('success', True):
+        return OK
+    code = res_json.get('code')
+    msg = str(res_json.get('msg', ''))
+    if code in THROTTLE_CODES or '频次' in msg or '频繁' in msg:
+        return THROTTLED
+    if code in AUTH_CODES or '登录' in msg:
+        return AUTH_EXPIRED
+    if status_code >= 400:
+        return CLIENT_ERROR
+    # 其它业务错误(参数错误、笔记不存在等) 原样交给调用方
+    return OK
+
+
+def classify_exception(e):
+    """
+        给请求过程中的异常分类, 连接失败、超时等网络异常可以重试
+        其它 OSError (找不到 node、没有权限、磁盘满等) 重试也没用, 直接失败
+    """
+    if isinstance(e, XhsApiError):
+        return e.kind
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return NETWORK
+    for module_name, class_names in TRANSPORT_ERRORS.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        classes = tuple(getattr(module, name) for name in class_names if hasattr(module, name))
+        if classes and isinstance(e, classes):
+            return NETWORK
+    return CLIENT_ERROR
+
+
+def check_response(status_code: int, res_json, headers=None):
+    """
+        正常响应原样返回 json, 其它抛出 XhsApiError (登录失效也抛出, 调用方据此移出账号)
+    """
+    kind = classify_response(status_code, res_json)
+    if kind == OK:
+        return res_json
+    msg = res_json.get('msg', '') if isinstance(res_json, dict) else ''
+    raise XhsApiError(kind, f'{kind}: HTTP {status_code} {msg}'.strip(), status_code, parse_retry_after(headers))
+
+
+class RetryPolicy():
+    """
+        只对可重试的分类做带随机抖动的指数退避, 服务端给了 Retry-After 时至少等这么久
+        :param max_retries: 最多重试次数
+        :param base_delay: 第一次重试的退避基数(秒)
+        :param max_delay: 退避等待的上限(秒), 不限制服务端给的 Retry-After
+        :param retry_kinds: 需要重试的分类
+        :param max_retry_after: Retry-After 超过这么久时不再等待, 直接失败, None 为不限
+    """
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0, retry_kinds=RETRYABLE_KINDS, max_retry_after: float = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_kinds = retry_kinds
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, kind: str, attempt: int, retry_after: float = None):
+        if self.max_retry_after is not None and retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        return kind in self.retry_kinds and attempt < self.max_retries
+
+    def get_delay(self, attempt: int, retry_after: float = None):
+        delay = random.uniform(self.base_delay, min(self.max_delay, self.base_delay * 2 ** (attempt + 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def backoff(self, kind: str, attempt: int, retry_after: float = None, detail=''):
+        """
+            可以重试时返回需要等待的秒数, 否则返回 None
+        """
+        if not self.should_retry(kind, attempt, retry_after):
+            return None
+        delay = self.get_delay(attempt, retry_after)
+        logger.warning(f'请求失败 ({kind}) {detail}, {delay:.2f}s 后第 {attempt + 1} 次重试')
+        return delay
+
+    def call(self, func, classify=None):
+        """
+            同步执行 func, 出现异常时按 classify(e) 的分类决定是否重试, 默认用 classify_exception
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                kind = (classify or classify_exception)(e)
+                delay = self.backoff(kind, attempt, getattr(e, 'retry_after', None), e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def async_call(self, func, classify=None):
+        attempt = 0
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                kind = (classify or classify_exception)(e)
+                delay = self.backoff(kind, attempt, getattr(e, 'retry_after', None), e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+default_retry_policy = RetryPolicy()
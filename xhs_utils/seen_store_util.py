@@ -0,0 +1,393 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from xhs_utils.bloom_util import ScalableBloomFilter
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl, 不加写入锁
+    fcntl = None
+
+
+class SeenStoreLockedError(Exception):
+    """
+        已经有其它进程以写入方式打开
+    """
+    pass
+
+
+def load_json_records(json_path: str, kinds: dict):
+    """
+        读取旧的 json 记录, 返回 [(kind, key, first_seen)], 文件不存在时返回 None
+        旧记录没有每条的时间, 首次时间都按文件的 last_update 算
+    """
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        # 没有旧记录, 或者其它进程已经导入
+        return None
+    first_seen = time.time()
+    if data.get('last_update'):
+        try:
+            first_seen = time.mktime(time.strptime(data['last_update'], '%Y-%m-%d %H:%M:%S'))
+        except ValueError:
+            pass
+    return [(kind, key, first_seen) for field, kind in kinds.items() for key in data.get(field, [])]
+
+
+def finish_migration(json_path: str, count: int):
+    try:
+        os.replace(json_path, json_path + '.migrated')
+    except FileNotFoundError:
+        pass
+    logger.info(f'已从 {json_path} 导入 {count} 条记录')
+
+
+class SeenStore():
+    """
+        SQLite 已看过记录, 每条记录保存首次和最近一次看到的时间
+        WAL 模式下多个进程可以同时读写, 写入先放在内存里, 够 batch_size 条或 flush() 时一次提交
+        设置 horizon 后超过这么久没再看到的记录视为没看过, 后台每 compact_interval 秒删除一次
+        :param path: 数据库文件路径
+        :param batch_size: 攒够多少条提交一次
+        :param timeout: 其它进程写入时等待锁的时间(秒)
+        :param horizon: 记录保留时间(秒), None 为一直保留
+        :param compact_interval: 删除过期记录的间隔(秒), 多个进程共用
+    """
+    def __init__(self, path: str, batch_size: int = 100, timeout: float = 30, horizon: float = None, compact_interval: float = 3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.horizon = horizon
+        self.compact_interval = compact_interval
+        self.lock = threading.Lock()
+        # (kind, key) -> (first_seen, last_seen), 还没有提交的记录
+        self.pending = {}
+        self.executor = None
+        self.next_compact_check = 0
+        dir_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        # 只对新建的数据库生效, 删除后的空间可以还给文件系统
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS seen (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID
+        ''')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(seen)')]
+        if 'last_seen' not in columns:
+            # 旧版本的表没有 last_seen
+            self.conn.execute('ALTER TABLE seen ADD COLUMN last_seen REAL NOT NULL DEFAULT 0')
+            self.conn.execute('UPDATE seen SET last_seen = first_seen')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_first_seen ON seen (first_seen)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_last_seen ON seen (last_seen)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL)')
+
+    def get_cutoff(self):
+        # 最近一次看到早于这个时间的记录已过期
+        return 0 if self.horizon is None else time.time() - self.horizon
+
+    def contains(self, kind: str, key: str):
+        with self.lock:
+            if (kind, key) in self.pending:
+                return True
+            row = self.conn.execute('SELECT 1 FROM seen WHERE kind = ? AND key = ? AND last_seen >= ?', (kind, key, self.get_cutoff())).fetchone()
+        return row is not None
+
+    def add(self, kind: str, key: str, first_seen: float = None):
+        """
+            写入记录, 已经有的记录更新最近一次看到的时间
+        """
+        now = time.time()
+        with self.lock:
+            first_seen = self.pending.get((kind, key), (first_seen or now, ))[0]
+            self.pending[(kind, key)] = (first_seen, now)
+            if len(self.pending) < self.batch_size:
+                return
+        self.flush()
+
+    def add_many(self, items):
+        """
+            items: [(kind, key, first_seen)], 一次提交
+            最近一次看到的时间按写入时算, 导入的旧记录从导入时开始计算 horizon, 不会一导入就过期
+        """
+        now = time.time()
+        with self.lock:
+            self._write([(kind, key, first_seen, now) for kind, key, first_seen in items])
+
+    def flush(self):
+        with self.lock:
+            items = [(kind, key, first_seen, last_seen) for (kind, key), (first_seen, last_seen) in self.pending.items()]
+            self._write(items)
+            self.pending.clear()
+        self.maybe_compact()
+
+    def _write(self, items):
+        if not items:
+            return
+        # 其它进程已经写入的记录保留较早的首次时间和较晚的最近时间
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany('''
+                INSERT INTO seen (kind, key, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (kind, key) DO UPDATE SET
+                    first_seen = min(first_seen, excluded.first_seen),
+                    last_seen = max(last_seen, excluded.last_seen)
+            ''', items)
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def count(self, kind: str = None):
+        """
+            没有过期的记录数
+        """
+        self.flush()
+        with self.lock:
+            if kind is None:
+                return self.conn.execute('SELECT COUNT(*) FROM seen WHERE last_seen >= ?', (self.get_cutoff(), )).fetchone()[0]
+            return self.conn.execute('SELECT COUNT(*) FROM seen WHERE kind = ? AND last_seen >= ?', (kind, self.get_cutoff())).fetchone()[0]
+
+    def claim_compaction(self):
+        """
+            距离上次删除(任意进程) 超过 compact_interval 时返回 True, 同一时间只有一个进程拿到
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute("SELECT value FROM meta WHERE name = 'last_compact'").fetchone()
+                if row is not None and now - row[0] < self.compact_interval:
+                    self.conn.execute('ROLLBACK')
+                    return False
+                self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('last_compact', ?)", (now, ))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return True
+
+    def maybe_compact(self):
+        """
+            到时间时在后台删除过期记录
+        """
+        if self.horizon is None or time.time() < self.next_compact_check:
+            return
+        self.next_compact_check = time.time() + self.compact_interval
+        if not self.claim_compaction():
+            return
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(1)
+        self.executor.submit(self.compact)
+
+    def compact(self, batch_size: int = 1000):
+        """
+            删除过期记录, 分批提交, 不会长时间占用写锁
+            :return: 删除的条数
+        """
+        if self.horizon is None:
+            return 0
+        cutoff = self.get_cutoff()
+        removed = 0
+        try:
+            while True:
+                with self.lock:
+                    cursor = self.conn.execute('''
+                        DELETE FROM seen WHERE (kind, key) IN (
+                            SELECT kind, key FROM seen WHERE last_seen < ? LIMIT ?
+                        )
+                    ''', (cutoff, batch_size))
+                removed += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+            with self.lock:
+                self.conn.execute('PRAGMA incremental_vacuum')
+                self.conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        except Exception as e:
+            logger.warning(f'删除过期已看记录失败: {e}')
+        if removed:
+            logger.info(f'已删除 {removed} 条过期已看记录')
+        return removed
+
+    def migrate_json(self, json_path: str, kinds: dict):
+        """
+            从旧的 json 记录导入, 导入后把文件改名为 .migrated, 只会执行一次
+            :param kinds: {json 里的字段: kind}
+            :return: 导入的条数
+        """
+        items = load_json_records(json_path, kinds)
+        if items is None:
+            return 0
+        self.add_many(items)
+        finish_migration(json_path, len(items))
+        return len(items)
+
+    def close(self):
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown()
+        with self.lock:
+            self.conn.close()
+
+
+class BloomSeenStore():
+    """
+        Bloom filter 已看记录, 和 SeenStore 接口相同, 每条只占十几个 bit
+        有误判: 少量没看过的笔记会被当成看过; 不保存首次时间, 只能有一个进程写入
+        写入方式打开时对 {path}.lock 加排它锁, 已经被其它进程锁住时抛出 SeenStoreLockedError
+        每个 kind 一组 mmap 文件 {path}.{kind}.{序号}.bloom, 其它进程可以用 readonly 打开
+        设置 horizon 后按时间分成 generations 代, 每代一组文件 {path}.{kind}.g{代}.{序号}.bloom,
+        写入和再次看到的记录放进当前代, 超过 horizon 的代整组删除
+        :param path: 文件路径前缀
+        :param capacity: 第一个分片的容量, 写满后自动扩容
+        :param error_rate: 误判率, 分代时查询要查 generations + 1 代, 每代按 error_rate / (generations + 1) 建
+        :param horizon: 记录保留时间(秒), 实际保留 horizon 到 horizon * (1 + 1 / generations)
+        :param generations: horizon 分成的代数
+    """
+    def __init__(self, path: str, capacity: int = 100000, error_rate: float = 0.001, readonly: bool = False, horizon: float = None, generations: int = 4):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.readonly = readonly
+        self.horizon = horizon
+        self.generations = generations
+        self.lock = threading.Lock()
+        self.filters = {}
+        self.lock_file = None
+        if not readonly:
+            self.acquire_writer_lock()
+
+    def acquire_writer_lock(self):
+        if fcntl is None:
+            return
+        dir_path = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        lock_file = open(f'{self.path}.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise SeenStoreLockedError(f'{self.path} 正在被其它进程写入, 可以用 readonly 打开')
+        self.lock_file = lock_file
+
+    def get_generation(self):
+        if self.horizon is None:
+            return None
+        return int(time.time() // (self.horizon / self.generations))
+
+    def live_generations(self):
+        generation = self.get_generation()
+        if generation is None:
+            return [None]
+        # 新的代在前
+        return list(range(generation, generation - self.generations - 1, -1))
+
+    def get_filter(self, kind: str, generation: int = None, create: bool = True):
+        """
+            create 为 False 时还没有文件的返回 None, 查询时不新建文件
+        """
+        name = kind if generation is None else f'{kind}.g{generation}'
+        bloom = self.filters.get(name)
+        if bloom is None and not create and not os.path.exists(f'{self.path}.{name}.0.bloom'):
+            return None
+        if bloom is None:
+            error_rate = self.error_rate if generation is None else self.error_rate / (self.generations + 1)
+            bloom = ScalableBloomFilter(f'{self.path}.{name}', self.capacity, error_rate, readonly=self.readonly)
+            self.filters[name] = bloom
+        return bloom
+
+    def contains(self, kind: str, key: str):
+        with self.lock:
+            for generation in self.live_generations():
+                bloom = self.get_filter(kind, generation, create=False)
+                if bloom is None:
+                    continue
+                if self.readonly:
+                    bloom.reload()
+                if key in bloom:
+                    return True
+            return False
+
+    def add(self, kind: str, key: str, first_seen: float = None):
+        with self.lock:
+            self.get_filter(kind, self.get_generation()).add(key)
+
+    def add_many(self, items):
+        with self.lock:
+            generation = self.get_generation()
+            for kind, key, _ in items:
+                self.get_filter(kind, generation).add(key)
+
+    def flush(self):
+        with self.lock:
+            for bloom in self.filters.values():
+                bloom.flush()
+        self.compact()
+
+    def count(self, kind: str = None):
+        """
+            写入的数量, 误判为已存在的不计入, 跨代再次看到的记录会重复计入
+        """
+        with self.lock:
+            if kind is not None:
+                return sum(bloom.count for bloom in (self.get_filter(kind, generation, create=False) for generation in self.live_generations()) if bloom is not None)
+            return sum(bloom.count for bloom in self.filters.values())
+
+    def compact(self):
+        """
+            删除超过 horizon 的代, 只有一组文件的删除, 开销很小, 不用放到后台
+            :return: 删除的文件数
+        """
+        generation = self.get_generation()
+        if generation is None or self.readonly:
+            return 0
+        oldest = generation - self.generations
+        removed = 0
+        with self.lock:
+            for name in list(self.filters):
+                _, _, suffix = name.rpartition('.g')
+                if suffix.isdigit() and int(suffix) < oldest:
+                    self.filters.pop(name).close()
+            for slice_path in glob.glob(glob.escape(self.path) + '.*.g*.*.bloom'):
+                suffix = slice_path[len(self.path):].split('.')[-3]
+                if suffix[1:].isdigit() and int(suffix[1:]) < oldest:
+                    os.remove(slice_path)
+                    removed += 1
+        if removed:
+            logger.info(f'已删除 {removed} 个过期的 Bloom filter 文件')
+        return removed
+
+    def migrate_json(self, json_path: str, kinds: dict):
+        items = load_json_records(json_path, kinds)
+        if items is None:
+            return 0
+        self.add_many(items)
+        self.flush()
+        finish_migration(json_path, len(items))
+        return len(items)
+
+    def close(self):
+        with self.lock:
+            for bloom in self.filters.values():
+                bloom.close()
+            self.filters = {}
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
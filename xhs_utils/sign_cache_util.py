@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class SignCache():
+    """
+        签名结果的短时缓存, 相同 (a1, api, data) 在有效期内直接复用签名
+        :param ttl: 有效期(秒), 需要小于服务端对 x-t 时间戳的容忍范围
+        :param max_size: 最多缓存的数量, 超过后淘汰最久未使用的
+    """
+    def __init__(self, ttl: float = 30, max_size: int = 2048):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(a1, api, data):
+        # 签名依赖字段顺序, 所以按实际发送的 body 序列化, 不排序 key
+        if data and not isinstance(data, str):
+            data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        return a1, api, data or ''
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            item = self.cache.get(key)
+            if item is not None and now - item[0] < self.ttl:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self.cache[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.cache[key] = (time.monotonic(), value)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_sign(self, a1, api, data, sign):
+        key = self.make_key(a1, api, data)
+        value = self.get(key)
+        if value is None:
+            value = sign()
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.cache),
+            'ttl': self.ttl,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,131 @@
+import copy
+import json
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+# 结果与账号无关、短时间内不会变的接口, 完成后的结果在 ttl 内可以直接复用
+# 其它接口只合并同时在途的相同请求
+REUSABLE_APIS = (
+    '/api/sns/web/v1/feed',
+    '/api/sns/web/v1/user/otherinfo',
+    '/api/sns/web/v2/comment/page',
+    '/api/sns/web/v2/comment/sub/page',
+)
+# 与账号无关的接口, key 里不带账号
+SHARED_APIS = (
+    '/api/sns/web/v1/feed',
+)
+# 规范化参数时忽略的字段 (同一资源在不同入口拿到的 token 不同)
+IGNORED_PARAMS = ('xsec_token', 'xsec_source')
+
+
+def make_request_key(method: str, api: str, data, a1: str):
+    """
+        按 接口 + 规范化参数 生成 key, 笔记详细按 note_id
+    """
+    path, _, query = api.partition('?')
+    if path == '/api/sns/web/v1/feed':
+        body = json.loads(data) if isinstance(data, str) else data
+        return path, body['source_note_id']
+    params = tuple(sorted((k, v) for k, v in urllib.parse.parse_qsl(query, keep_blank_values=True) if k not in IGNORED_PARAMS))
+    if isinstance(data, str) and data:
+        data = json.loads(data)
+    if isinstance(data, dict):
+        data = json.dumps({k: v for k, v in data.items() if k not in IGNORED_PARAMS}, sort_keys=True, separators=(',', ':'))
+    owner = None if path in SHARED_APIS else a1
+    return method, path, params, data or '', owner
+
+
+def _copy_error(error):
+    # 每个等待的调用方拿到自己的异常对象, XhsApiError 的参数和 args 不一致, 不能用 copy.copy
+    new_error = type(error).__new__(type(error))
+    new_error.args = error.args
+    new_error.__dict__.update(error.__dict__)
+    return new_error
+
+
+class _Call():
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """
+        相同 key 的请求同时只发一次, 其它调用等待并共享结果; 可复用的结果在 ttl 内直接返回
+        共享出去的结果是深拷贝, 调用方修改返回值 (比如追加二级评论) 不会互相影响
+        失败时等待的调用方拿到异常的拷贝; share_errors 为 False 时 (不同账号共用的 key) 不共享失败, 各自重新请求
+        :param ttl: 完成后的结果保留时间(秒), 0 为只合并在途的请求
+        :param max_size: 最多保留的结果数量
+    """
+    def __init__(self, ttl: float = 300, max_size: int = 4096):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.results = OrderedDict()
+        self.executed = 0
+        self.shared = 0
+        self.reused = 0
+
+    def do(self, key, func, reusable: bool = False, is_success=None, share_errors: bool = True):
+        """
+            执行 func 或共享相同 key 的结果
+            :param reusable: 结果是否可以在 ttl 内复用
+            :param is_success: 判断结果能否保留, 默认都保留
+            :param share_errors: 领头的调用失败时, 等待的调用方是否也直接失败
+        """
+        with self.lock:
+            if reusable and key in self.results:
+                expire, result = self.results[key]
+                if expire > time.monotonic():
+                    self.results.move_to_end(key)
+                    self.reused += 1
+                    return copy.deepcopy(result)
+                del self.results[key]
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                if not share_errors:
+                    # 领头的可能是别的账号 (登录失效、验证码), 用自己的账号重新请求
+                    with self.lock:
+                        self.executed += 1
+                    return func()
+                raise _copy_error(call.error) from call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # 先保存拷贝再唤醒等待的调用, 之后领头的调用方才可能修改结果
+            if call.error is None:
+                call.result = copy.deepcopy(call.result)
+            with self.lock:
+                del self.calls[key]
+                if reusable and self.ttl > 0 and call.error is None and (is_success is None or is_success(call.result)):
+                    self.results[key] = (time.monotonic() + self.ttl, call.result)
+                    while len(self.results) > self.max_size:
+                        self.results.popitem(last=False)
+            call.event.set()
+
+    def stats(self):
+        return {
+            'executed': self.executed,
+            'shared': self.shared,
+            'reused': self.reused,
+            'size': len(self.results),
+        }
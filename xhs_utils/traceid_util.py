@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from collections import deque
+from loguru import logger
+
+
+class TraceIdPool():
+    """
+        x-xray-traceid 预生成池, 一次 js 调用批量生成, 低于水位时后台补充
+        :param generate_batch: 批量生成函数, 参数为数量, 返回 traceid 列表
+        :param batch_size: 每次补充的数量
+        :param low_water: 池内剩余数量低于该值时后台补充
+    """
+    def __init__(self, generate_batch, batch_size: int = 500, low_water: int = 100):
+        self.generate_batch = generate_batch
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.pool = deque()
+        self.refill_lock = threading.Lock()
+        self.refilling = False
+        self.refill_count = 0
+        self.refill_seconds = 0.0
+        self.last_refill_seconds = 0.0
+        self.empty_count = 0
+
+    def _refill(self):
+        with self.refill_lock:
+            try:
+                if len(self.pool) >= self.low_water:
+                    return
+                start = time.perf_counter()
+                ids = self.generate_batch(self.batch_size)
+                cost = time.perf_counter() - start
+                self.pool.extend(ids)
+                self.refill_count += 1
+                self.refill_seconds += cost
+                self.last_refill_seconds = cost
+            except Exception as e:
+                logger.warning(f'补充 traceid 失败: {e}')
+            finally:
+                self.refilling = False
+
+    def _refill_background(self):
+        if self.refilling:
+            return
+        self.refilling = True
+        threading.Thread(target=self._refill, daemon=True).start()
+
+    def get(self):
+        while True:
+            try:
+                trace_id = self.pool.popleft()
+                break
+            except IndexError:
+                # 池空了只能同步等待补充
+                self.empty_count += 1
+                self.refilling = True
+                self._refill()
+                if not self.pool:
+                    raise RuntimeError('traceid 池补充失败')
+        if len(self.pool) < self.low_water:
+            self._refill_background()
+        return trace_id
+
+    def stats(self):
+        return {
+            'size': len(self.pool),
+            'batch_size': self.batch_size,
+            'low_water': self.low_water,
+            'refill_count': self.refill_count,
+            'empty_count': self.empty_count,
+            'last_refill_ms': round(self.last_refill_seconds * 1000, 3),
+            'avg_refill_ms': round(self.refill_seconds * 1000 / self.refill_count, 3) if self.refill_count else 0.0,
+        }
+
+
+class XrayTraceIdGenerator():
+    """
+        x-xray-traceid 的 python 实现, 与 static/xhs_xray.js 中的 traceId 算法一致
+        前 16 位: (毫秒时间戳 << 23) | 自增序号, 后 16 位: 64 位随机数
+    """
+    MAX_SEQ = 2 ** 23 - 1
+
+    def __init__(self):
+        self.seq = random.getrandbits(23)
+        self.lock = threading.Lock()
+
+    def next_seq(self):
+        with self.lock:
+            if self.seq > self.MAX_SEQ:
+                self.seq = 0
+            seq = self.seq
+            self.seq += 1
+            return seq
+
+    def generate(self, timestamp: int = None):
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        high = ((timestamp << 23) | self.next_seq()) & 0xFFFFFFFFFFFFFFFF
+        return '%016x%016x' % (high, random.getrandbits(64))
+
+    def generate_batch(self, num: int):
+        timestamp = int(time.time() * 1000)
+        return [self.generate(timestamp) for _ in range(num)]
+
+
+def check_xray_traceid_parity(js_ids: list, native_ids: list, max_skew_ms: int = 60000):
+    """
+        对比 js 和 python 生成的 traceid 格式和结构
+        :param js_ids: js 生成的 traceid 列表
+        :param native_ids: python 生成的 traceid 列表
+        :param max_skew_ms: 两边时间戳允许的最大差值
+        返回不一致的描述列表, 为空表示一致
+    """
+    errors = []
+    now = int(time.time() * 1000)
+    for name, ids in (('js', js_ids), ('native', native_ids)):
+        seqs = []
+        for trace_id in ids:
+            if len(trace_id) != 32 or any(c not in '0123456789abcdef' for c in trace_id):
+                errors.append(f'{name} 格式错误: {trace_id}')
+                continue
+            high = int(trace_id[:16], 16)
+            if abs((high >> 23) - now) > max_skew_ms:
+                errors.append(f'{name} 时间戳错误: {trace_id}')
+            seqs.append(high & XrayTraceIdGenerator.MAX_SEQ)
+        # 同一批内序号连续自增 (允许在 2^23 处回绕)
+        for prev, cur in zip(seqs, seqs[1:]):
+            if cur != (prev + 1) & XrayTraceIdGenerator.MAX_SEQ:
+                errors.append(f'{name} 序号不连续: {prev} -> {cur}')
+                break
+        low_bits = {trace_id[16:] for trace_id in ids}
+        if len(low_bits) != len(ids):
+            errors.append(f'{name} 随机部分重复')
+    return errors
+
@@ -1,11 +1,8 @@
 import json
 
-import execjs
+from xhs_utils.js_util import LazyJsContext
 
-try:
-    js = execjs.compile(open(r'../static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
+js = LazyJsContext('xhs_creator_xs.js')
 
 
 def generate_xs(a1, api, data=''):
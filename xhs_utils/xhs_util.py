@@ -1,37 +1,81 @@
 import json
-import math
+import os
 import random
-import execjs
-from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.cookie_util import get_cookie_context
+from xhs_utils.js_util import compile_js, JsContextPool, LazyJsContext
+from xhs_utils.sign_cache_util import SignCache
+from xhs_utils.traceid_util import TraceIdPool, XrayTraceIdGenerator
 
-try:
-    js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
+# 签名进程池, 按 a1 路由, XHS_SIGN_WORKERS 默认 cpu 核数
+js = JsContextPool(lambda: compile_js('xhs_xs_xsc_56.js'), int(os.getenv('XHS_SIGN_WORKERS', '0')) or None)
 
-try:
-    xray_js = execjs.compile(open(r'../static/xhs_xray.js', 'r', encoding='utf-8').read())
-except:
-    xray_js = execjs.compile(open(r'static/xhs_xray.js', 'r', encoding='utf-8').read())
+xray_js = LazyJsContext('xhs_xray.js')
+
+xray_traceid_pool = TraceIdPool(lambda num: xray_js.call('traceIds', num))
+
+xray_traceid_generator = XrayTraceIdGenerator()
+
+# 签名缓存, 默认关闭, XHS_SIGN_CACHE_TTL 大于 0 或调用 enable_sign_cache 开启
+sign_cache = None
+
+# x-xray-traceid 生成方式: native python 实现(默认), js 调用 xhs_xray.js
+xray_traceid_backend = os.getenv('XHS_TRACEID_BACKEND', 'native')
 
 def generate_x_b3_traceid(len=16):
-    x_b3_traceid = ""
-    for t in range(len):
-        x_b3_traceid += "abcdef0123456789"[math.floor(16 * random.random())]
-    return x_b3_traceid
+    if len <= 0:
+        return ''
+    return '%0*x' % (len, random.getrandbits(4 * len))
+
+def generate_x_b3_traceids(num, len=16):
+    # 一次取出全部随机位再按长度切分
+    if num <= 0 or len <= 0:
+        return [''] * max(num, 0)
+    bits = '%0*x' % (num * len, random.getrandbits(4 * len * num))
+    return [bits[i:i + len] for i in range(0, num * len, len)]
+
+def enable_sign_cache(ttl=30, max_size=2048):
+    """
+        开启签名缓存
+        :param ttl: 签名有效期(秒), 不要超过服务端对 x-t 的容忍时间
+        :param max_size: 最多缓存的签名数量
+    """
+    global sign_cache
+    sign_cache = SignCache(ttl, max_size)
+    return sign_cache
+
+def disable_sign_cache():
+    global sign_cache
+    sign_cache = None
+
+def get_sign_cache_stats():
+    return sign_cache.stats() if sign_cache is not None else None
+
+def _sign_xs_xs_common(a1, api, data):
+    ret = js.call('get_request_headers_params', api, data, a1, key=a1)
+    return ret['xs'], ret['xt'], ret['xs_common']
 
 def generate_xs_xs_common(a1, api, data=''):
-    ret = js.call('get_request_headers_params', api, data, a1)
-    xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
-    return xs, xt, xs_common
+    cache = sign_cache
+    if cache is not None:
+        return cache.get_or_sign(a1, api, data, lambda: _sign_xs_xs_common(a1, api, data))
+    return _sign_xs_xs_common(a1, api, data)
 
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_xs', api, data, a1)
+    ret = js.call('get_xs', api, data, a1, key=a1)
     xs, xt = ret['X-s'], ret['X-t']
     return xs, xt
 
 def generate_xray_traceid():
-    return xray_js.call('traceId')
+    if xray_traceid_backend == 'js':
+        return xray_traceid_pool.get()
+    return xray_traceid_generator.generate()
+
+def get_sign_stats():
+    return js.stats()
+
+def get_xray_traceid_stats():
+    return xray_traceid_pool.stats()
+
 def get_common_headers():
     return {
         "authority": "www.xiaohongshu.com",
@@ -75,6 +119,9 @@ def get_request_headers_template():
         "x-xray-traceid": generate_xray_traceid()
     }
 
+if float(os.getenv('XHS_SIGN_CACHE_TTL', '0')) > 0:
+    enable_sign_cache(float(os.getenv('XHS_SIGN_CACHE_TTL')))
+
 def generate_headers(a1, api, data=''):
     xs, xt, xs_common = generate_xs_xs_common(a1, api, data)
     x_b3_traceid = generate_x_b3_traceid()
@@ -88,10 +135,9 @@ def generate_headers(a1, api, data=''):
     return headers, data
 
 def generate_request_params(cookies_str, api, data=''):
-    cookies = trans_cookies(cookies_str)
-    a1 = cookies['a1']
-    headers, data = generate_headers(a1, api, data)
-    return headers, cookies, data
+    context = get_cookie_context(cookies_str)
+    headers, data = generate_headers(context.a1, api, data)
+    return headers, context.cookies, data
 
 def splice_str(api, params):
     url = api + '?'